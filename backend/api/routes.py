@@ -1,12 +1,125 @@
 # backend/api/routes.py
 
-from flask import Blueprint, jsonify, request, session
-from backend.azure.cost import CostAnalyzer
-from backend.azure.subscriptions import SubscriptionManager
-from backend.azure.resource_groups import ResourceGroupManager
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, Response, copy_current_request_context, jsonify, make_response, request, session, stream_with_context
+from config import COST_FANOUT_CONCURRENCY
+from backend.azure.store import cost_store
+import asyncio
 import datetime
+import functools
+import hashlib
+import itertools
+import json
+import logging
+
+# The Azure SDK modules (backend.azure.cost, clients, aio) are imported inside
+# the views that use them, so workers start and pass health checks without
+# loading them.
 
 api_bp = Blueprint("api_bp", __name__)
+logger = logging.getLogger(__name__)
+
+def _parse_date_range():
+    """Read ``start``/``end`` (YYYY-MM-DD) from the query string, defaulting to last month."""
+    from backend.azure.cost import previous_month
+    default_start, default_end = previous_month()
+    try:
+        start = datetime.date.fromisoformat(request.args.get('start', default_start.isoformat()))
+        end = datetime.date.fromisoformat(request.args.get('end', default_end.isoformat()))
+    except ValueError:
+        raise ValueError("start and end must be dates in YYYY-MM-DD format")
+    if end < start:
+        raise ValueError("end must not be before start")
+    if (end - start).days > 365:
+        raise ValueError("date range must not exceed one year")
+    return start, end
+
+def _parse_granularity():
+    """Read ``granularity`` (daily|monthly) from the query string, defaulting to daily."""
+    from backend.azure.cost import QUERY_GRANULARITIES
+    granularity = request.args.get('granularity', 'daily').capitalize()
+    if granularity not in QUERY_GRANULARITIES:
+        raise ValueError("granularity must be daily or monthly")
+    return granularity
+
+def _parse_group_by(dimensions):
+    """Read ``group_by`` (up to two of ``dimensions``, or one ``tag:<name>``) from the query string."""
+    group_by = [g.strip() for g in request.args.get('group_by', '').split(',') if g.strip()]
+    if len(group_by) > 2:
+        raise ValueError("group_by accepts at most two dimensions")
+    tags = [g for g in group_by if g.startswith('tag:') and len(g) > 4]
+    if len(tags) > 1 or any(g not in dimensions for g in group_by if g not in tags):
+        raise ValueError(f"group_by must be one of {', '.join(dimensions)} or a single tag:<name>")
+    return group_by
+
+def _error_response(e):
+    """Turn an exception into a JSON error, passing Azure throttling through as 429."""
+    from azure.core.exceptions import HttpResponseError
+    if isinstance(e, HttpResponseError) and e.status_code == 429:
+        response = jsonify({"error": "Azure is throttling requests, please retry shortly"})
+        response.status_code = 429
+        if e.response is not None:
+            retry_after = e.response.headers.get("Retry-After")
+        else:
+            # Raised by the client-side limiter before anything was sent
+            retry_after = getattr(e, "retry_after", None)
+        response.headers["Retry-After"] = str(retry_after or 30)
+        return response
+    return jsonify({"error": str(e)}), 500
+
+@api_bp.after_request
+def add_cache_validators(response):
+    """Let browsers revalidate JSON responses instead of downloading them again."""
+    if request.method != "GET" or response.status_code != 200 or response.is_streamed:
+        return response
+    if response.mimetype != "application/json":
+        return response
+    response.headers.setdefault("Cache-Control", "private, no-cache")
+    if response.get_etag()[0] is None:
+        response.add_etag()
+    return response.make_conditional(request)
+
+def _store_etag(subscription_id, groupings):
+    """ETag for last month's stored costs, or None while the store still needs a fetch."""
+    from backend.azure.cost import previous_month
+    from backend.azure.credentials import current_identity
+    start, end = previous_month()
+    scope = f"subscriptions/{subscription_id}"
+    if any(cost_store.stale_ranges(scope, g, start, end) for g in groupings):
+        return None, None
+    version = cost_store.version(scope, groupings, start, end)
+    # The query string carries the response format, which changes the body
+    key = f"{current_identity()}|{scope}|{','.join(groupings)}|{start}|{end}|{version}|{request.full_path}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32], version
+
+def store_validated(*groupings):
+    """Answer conditional GETs for store-backed cost views without querying Azure.
+
+    The ETag is derived from the user, subscription, period and the time the
+    stored rows last changed, so an unchanged dashboard revalidates with a
+    304 straight from the local store.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            subscription_id = request.args.get('subscription_id')
+            if not subscription_id:
+                return await view(*args, **kwargs)
+            etag, _ = _store_etag(subscription_id, groupings)
+            if etag and request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                response.headers["Cache-Control"] = "private, no-cache"
+                return response
+            response = make_response(await view(*args, **kwargs))
+            if response.status_code == 200:
+                etag, version = _store_etag(subscription_id, groupings)
+                if etag:
+                    response.set_etag(etag)
+                    response.last_modified = datetime.datetime.fromtimestamp(version, datetime.timezone.utc)
+            return response
+        return wrapper
+    return decorator
 
 @api_bp.route("/health")
 def health_check():
@@ -113,8 +226,13 @@ def debug_cost_query():
         }), 500
 
 @api_bp.route("/costs/last-month")
-def get_last_month_costs():
-    """Get daily cost data for the previous month."""
+@store_validated("")
+async def get_last_month_costs():
+    """Get daily cost data for the previous month.
+
+    With ``format=columnar`` the rows become ``dates`` (every day of the
+    month) and a parallel ``costs`` array.
+    """
     try:
         # For now, we'll use a default subscription ID
         # In a real app, this would come from user's session or selection
@@ -122,95 +240,546 @@ def get_last_month_costs():
         if not subscription_id:
             return jsonify({"error": "subscription_id parameter is required"}), 400
         
-        analyzer = CostAnalyzer(subscription_id)
-        costs = analyzer.actual_cost_last_month()
-        return jsonify({"costs": costs})
+        from backend.azure.aio.cost import AsyncCostAnalyzer
+
+        async with AsyncCostAnalyzer(subscription_id) as analyzer:
+            if request.args.get('format') == 'columnar':
+                costs = await analyzer.daily_cost_columns()
+            else:
+                costs = {"costs": await analyzer.actual_cost_last_month()}
+        cost_store.record_view(f"subscriptions/{subscription_id}")
+        return jsonify(costs)
     except Exception as e:
-        import traceback
-        print(f"Error in get_last_month_costs: {str(e)}")
-        print(f"Traceback: {traceback.format_exc()}")
-        return jsonify({"error": str(e)}), 500
+        logger.exception("Error in get_last_month_costs")
+        return _error_response(e)
 
 @api_bp.route("/costs/by-resource-group")
-def get_costs_by_resource_group():
-    """Get cost breakdown by resource group for the previous month."""
+@store_validated("ResourceGroupName")
+async def get_costs_by_resource_group():
+    """Get cost breakdown by resource group for the previous month.
+
+    With ``format=columnar`` the rows become a shared ``dates`` axis, the
+    resource ``groups`` (most expensive first) and one ``costs`` array per
+    group, so names and keys are not repeated for every day.
+    """
     try:
         subscription_id = request.args.get('subscription_id')
         if not subscription_id:
             return jsonify({"error": "subscription_id parameter is required"}), 400
         
-        analyzer = CostAnalyzer(subscription_id)
-        costs = analyzer.cost_per_resource_group()
-        return jsonify({"costs": costs})
+        from backend.azure.aio.cost import AsyncCostAnalyzer
+
+        async with AsyncCostAnalyzer(subscription_id) as analyzer:
+            if request.args.get('format') == 'columnar':
+                costs = await analyzer.resource_group_cost_columns()
+            else:
+                costs = {"costs": await analyzer.cost_per_resource_group()}
+        cost_store.record_view(f"subscriptions/{subscription_id}")
+        return jsonify(costs)
     except Exception as e:
-        import traceback
-        print(f"Error in get_costs_by_resource_group: {str(e)}")
-        print(f"Traceback: {traceback.format_exc()}")
-        return jsonify({"error": str(e)}), 500
+        logger.exception("Error in get_costs_by_resource_group")
+        return _error_response(e)
 
 @api_bp.route("/subscriptions")
-def get_subscriptions():
-    """Get list of available subscriptions."""
+async def get_subscriptions():
+    """Get list of available subscriptions (from the inventory cache)."""
     try:
-        manager = SubscriptionManager()
-        subscriptions = manager.list_subscriptions()
-        return jsonify({"subscriptions": subscriptions})
+        from backend.azure.inventory import inventory
+
+        return jsonify({"subscriptions": await inventory.asubscriptions()})
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @api_bp.route("/resource-groups")
-def get_resource_groups():
-    """Get list of resource groups for a subscription."""
+async def get_resource_groups():
+    """Get list of resource groups for a subscription (from the inventory cache)."""
     try:
         subscription_id = request.args.get('subscription_id')
         if not subscription_id:
             return jsonify({"error": "subscription_id parameter is required"}), 400
         
-        manager = ResourceGroupManager(subscription_id)
-        resource_groups = manager.list_resource_groups()
-        return jsonify({"resource_groups": resource_groups})
+        from backend.azure.inventory import inventory
+
+        return jsonify({"resource_groups": await inventory.aresource_groups(subscription_id)})
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _error_response(e)
 
 @api_bp.route("/costs/summary")
-def get_cost_summary():
+@store_validated("", "ResourceGroupName")
+async def get_cost_summary():
     """Get a summary of costs including total, by resource group, and trends."""
     try:
         subscription_id = request.args.get('subscription_id')
         if not subscription_id:
             return jsonify({"error": "subscription_id parameter is required"}), 400
         
-        analyzer = CostAnalyzer(subscription_id)
-        
-        # Get daily costs
-        daily_costs = analyzer.actual_cost_last_month()
-        
-        # Get resource group costs
-        rg_costs = analyzer.cost_per_resource_group()
-        
-        # Calculate summary statistics
-        total_cost = sum(float(cost.get('Cost', 0)) for cost in daily_costs)
-        avg_daily_cost = total_cost / len(daily_costs) if daily_costs else 0
-        
-        # Group by resource group
-        rg_summary = {}
-        for cost in rg_costs:
-            rg_name = cost.get('resource_group', 'Unknown')
-            if rg_name not in rg_summary:
-                rg_summary[rg_name] = 0
-            rg_summary[rg_name] += float(cost.get('cost', 0))
-        
-        summary = {
-            "total_cost": round(total_cost, 2),
-            "avg_daily_cost": round(avg_daily_cost, 2),
-            "period_days": len(daily_costs),
-            "resource_groups": rg_summary,
-            "daily_costs": daily_costs[:10]  # Last 10 days for chart
-        }
-        
+        from backend.azure.aio.cost import AsyncCostAnalyzer
+
+        async with AsyncCostAnalyzer(subscription_id) as analyzer:
+            summary = await analyzer.cost_summary()
+        cost_store.record_view(f"subscriptions/{subscription_id}")
         return jsonify(summary)
     except Exception as e:
-        import traceback
-        print(f"Error in get_cost_summary: {str(e)}")
-        print(f"Traceback: {traceback.format_exc()}")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        logger.exception("Error in get_cost_summary")
+        return _error_response(e)
+
+@api_bp.route("/costs/trend")
+async def get_cost_trend():
+    """Get monthly totals with month-over-month change and a rolling daily average.
+
+    Query parameters: ``subscription_id``, ``months`` (1-12, default 12) and
+    ``window`` (rolling average days, default 7). Computed from the local
+    store, so only days not stored yet are fetched from Azure.
+    """
+    try:
+        subscription_id = request.args.get('subscription_id')
+        if not subscription_id:
+            return jsonify({"error": "subscription_id parameter is required"}), 400
+        months = request.args.get('months', 12, type=int)
+        window = request.args.get('window', 7, type=int)
+        if not 1 <= months <= 12:
+            return jsonify({"error": "months must be between 1 and 12"}), 400
+        if not 1 <= window <= 90:
+            return jsonify({"error": "window must be between 1 and 90"}), 400
+
+        from backend.azure.aio.cost import AsyncCostAnalyzer
+
+        async with AsyncCostAnalyzer(subscription_id) as analyzer:
+            trend = await analyzer.cost_trend(months, window)
+        cost_store.record_view(f"subscriptions/{subscription_id}")
+        return jsonify(trend)
+    except Exception as e:
+        logger.exception("Error in get_cost_trend")
+        return _error_response(e)
+
+@api_bp.route("/costs/forecast")
+async def get_cost_forecast():
+    """Get month-to-date cost and its projection to the end of the month.
+
+    Query parameters: ``subscription_id``, ``method`` (seasonal|linear,
+    default seasonal) and ``history_days`` (7-365, default 90).
+    """
+    try:
+        subscription_id = request.args.get('subscription_id')
+        if not subscription_id:
+            return jsonify({"error": "subscription_id parameter is required"}), 400
+        method = request.args.get('method', 'seasonal')
+        history_days = request.args.get('history_days', 90, type=int)
+        if method not in ('seasonal', 'linear'):
+            return jsonify({"error": "method must be seasonal or linear"}), 400
+        if not 7 <= history_days <= 365:
+            return jsonify({"error": "history_days must be between 7 and 365"}), 400
+
+        from backend.azure.aio.cost import AsyncCostAnalyzer
+
+        async with AsyncCostAnalyzer(subscription_id) as analyzer:
+            forecast = await analyzer.cost_forecast(method, history_days)
+        cost_store.record_view(f"subscriptions/{subscription_id}")
+        return jsonify(forecast)
+    except Exception as e:
+        logger.exception("Error in get_cost_forecast")
+        return _error_response(e)
+
+@api_bp.route("/costs/anomalies")
+async def get_cost_anomalies():
+    """Get resource group days whose cost breaks from their trailing baseline.
+
+    Query parameters: ``subscription_id`` or comma-separated
+    ``subscription_ids`` (default: every subscription the user can see) and
+    ``days`` (1-90, default 30). Each day is scored against the median and
+    median absolute deviation of the ``ANOMALY_WINDOW_DAYS`` before it;
+    failures are reported per subscription.
+    """
+    try:
+        from backend.azure.aio.cost import AsyncCostAnalyzer
+        from backend.azure.inventory import inventory
+
+        days = request.args.get('days', 30, type=int)
+        if not 1 <= days <= 90:
+            return jsonify({"error": "days must be between 1 and 90"}), 400
+        ids_param = request.args.get('subscription_ids') or request.args.get('subscription_id', '')
+        subscription_ids = [s.strip() for s in ids_param.split(',') if s.strip()]
+        if not subscription_ids:
+            subscriptions = await inventory.asubscriptions()
+            subscription_ids = [sub["subscription_id"] for sub in subscriptions]
+
+        limit = asyncio.Semaphore(COST_FANOUT_CONCURRENCY)
+
+        async def detect(subscription_id):
+            async with limit, AsyncCostAnalyzer(subscription_id) as analyzer:
+                return await analyzer.cost_anomalies(days)
+
+        results = await asyncio.gather(*(detect(s) for s in subscription_ids), return_exceptions=True)
+        anomalies = []
+        errors = {}
+        for subscription_id, result in zip(subscription_ids, results):
+            if isinstance(result, BaseException):
+                logger.error("Error detecting anomalies for subscription %s", subscription_id, exc_info=result)
+                errors[subscription_id] = str(result)
+            else:
+                anomalies.extend(result)
+        anomalies.sort(key=lambda a: abs(a["score"]), reverse=True)
+        return jsonify({"days": days, "anomalies": anomalies, "errors": errors})
+    except Exception as e:
+        logger.exception("Error in get_cost_anomalies")
+        return _error_response(e)
+
+@api_bp.route("/dashboard")
+async def get_dashboard():
+    """Get everything the dashboard renders in one response.
+
+    Always returns the auth status and, when signed in, the subscription
+    list. With ``subscription_id`` it adds the cost summary, daily costs,
+    resource group costs and resource group list. Panels are fetched
+    concurrently from one daily and one per-resource-group query; a panel
+    that fails is reported under ``errors`` without failing the rest.
+    ``format=columnar`` returns the chart panels as parallel arrays.
+    """
+    try:
+        authenticated = "user" in session and "access_token" in session
+        dashboard = {"authenticated": authenticated, "user": session.get("user") if authenticated else None}
+        if not authenticated:
+            return jsonify(dashboard)
+
+        from backend.azure.aio.cost import AsyncCostAnalyzer
+        from backend.azure.inventory import inventory
+
+        subscription_id = request.args.get('subscription_id')
+
+        async def subscriptions():
+            return {"subscriptions": await inventory.asubscriptions()}
+
+        async def cost_panels():
+            async with AsyncCostAnalyzer(subscription_id) as analyzer:
+                costs = await analyzer.dashboard_panels(request.args.get('format') == 'columnar')
+            cost_store.record_view(f"subscriptions/{subscription_id}")
+            return costs
+
+        async def resource_groups():
+            return {"resource_groups": await inventory.aresource_groups(subscription_id)}
+
+        panels = {"subscriptions": subscriptions()}
+        if subscription_id:
+            panels["costs"] = cost_panels()
+            panels["resource_groups"] = resource_groups()
+
+        results = await asyncio.gather(*panels.values(), return_exceptions=True)
+        errors = {}
+        for name, result in zip(panels, results):
+            if isinstance(result, BaseException):
+                logger.error("Error loading dashboard panel %s", name, exc_info=result)
+                errors[name] = str(result)
+            else:
+                dashboard.update(result)
+        dashboard["errors"] = errors
+        return jsonify(dashboard)
+    except Exception as e:
+        logger.exception("Error in get_dashboard")
+        return _error_response(e)
+
+@api_bp.route("/costs/summary/all")
+def get_cost_summary_all():
+    """Get cost summaries for several subscriptions at once.
+
+    Takes an optional comma-separated ``subscription_ids`` parameter and
+    defaults to every subscription the user can see. Subscriptions are
+    queried concurrently, at most ``COST_FANOUT_CONCURRENCY`` at a time;
+    failures are reported per subscription instead of failing the request.
+    """
+    try:
+        from backend.azure.clients import ARM_SCOPE
+        from backend.azure.cost import CostAnalyzer
+        from backend.azure.credentials import StaticTokenCredential, get_flask_credential
+        from backend.azure.inventory import inventory
+
+        ids_param = request.args.get('subscription_ids', '')
+        subscription_ids = list(dict.fromkeys(s.strip() for s in ids_param.split(',') if s.strip()))
+        if not subscription_ids:
+            subscription_ids = [sub["subscription_id"] for sub in inventory.subscriptions()]
+
+        # A copied request context cannot be entered by two threads at once, so
+        # the user's token and identity are captured here and the workers run
+        # without one
+        credential = StaticTokenCredential(get_flask_credential().get_token(ARM_SCOPE))
+        analyzers = {sid: CostAnalyzer(sid, credential) for sid in subscription_ids}
+
+        def summarize(subscription_id):
+            try:
+                return subscription_id, analyzers[subscription_id].cost_summary(), None
+            except Exception as e:
+                logger.exception("Error summarizing subscription %s", subscription_id)
+                return subscription_id, None, str(e)
+
+        workers = max(1, min(COST_FANOUT_CONCURRENCY, len(subscription_ids)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(summarize, subscription_ids))
+
+        subscriptions = {}
+        errors = {}
+        for subscription_id, summary, error in results:
+            if error is None:
+                subscriptions[subscription_id] = summary
+            else:
+                errors[subscription_id] = error
+
+        return jsonify({
+            "total_cost": round(sum(s["total_cost"] for s in subscriptions.values()), 2),
+            "by_subscription": {
+                sub_id: s["total_cost"] for sub_id, s in subscriptions.items()
+            },
+            "subscriptions": subscriptions,
+            "errors": errors,
+        })
+    except Exception as e:
+        logger.exception("Error in get_cost_summary_all")
+        return _error_response(e)
+
+@api_bp.route("/costs/query")
+def query_costs():
+    """Get cost series aggregated by Cost Management for an arbitrary range and grouping.
+
+    Query parameters: ``subscription_id``, ``start``/``end`` (YYYY-MM-DD,
+    default previous month), ``granularity`` (daily|monthly) and
+    ``group_by`` (up to two of the supported dimensions, or ``tag:<name>``).
+    With ``format=ndjson`` the raw rows are streamed page by page instead,
+    one JSON object per line.
+    """
+    try:
+        subscription_id = request.args.get('subscription_id')
+        if not subscription_id:
+            return jsonify({"error": "subscription_id parameter is required"}), 400
+
+        from backend.azure.cost import CostAnalyzer, QUERY_DIMENSIONS
+
+        try:
+            start, end = _parse_date_range()
+            granularity = _parse_granularity()
+            group_by = _parse_group_by(QUERY_DIMENSIONS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        analyzer = CostAnalyzer(subscription_id)
+        if request.args.get('format') == 'ndjson':
+            # Fetch the first page before answering, so access and throttling
+            # errors still become a JSON error response
+            frames = analyzer.iter_query_frames(start, end, granularity, group_by)
+            first = next(frames, None)
+            if first is not None:
+                frames = itertools.chain([first], frames)
+            return Response(
+                stream_with_context(_ndjson_rows(frames, subscription_id, group_by)),
+                mimetype="application/x-ndjson",
+            )
+        series = analyzer.query_costs(start, end, granularity, group_by)
+        cost_store.record_view(f"subscriptions/{subscription_id}")
+        return jsonify({
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "granularity": granularity.lower(),
+            "group_by": group_by,
+            "series": series,
+        })
+    except Exception as e:
+        logger.exception("Error in query_costs")
+        return _error_response(e)
+
+@api_bp.route("/costs/rollup")
+async def get_cost_rollup():
+    """Get the most expensive groups of one dimension over any date range.
+
+    Query parameters: ``subscription_id``, ``start``/``end`` (default
+    previous month), ``group_by`` (one of the supported dimensions or
+    ``tag:<name>``, default ResourceGroupName) and ``top`` (1-1000, default
+    10). Totals come from in-memory prefix sums over the local store, so
+    changing the range or paging through groups does not rescan rows.
+    """
+    try:
+        subscription_id = request.args.get('subscription_id')
+        if not subscription_id:
+            return jsonify({"error": "subscription_id parameter is required"}), 400
+        try:
+            start, end = _parse_date_range()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        top = request.args.get('top', 10, type=int)
+        if not 1 <= top <= 1000:
+            return jsonify({"error": "top must be between 1 and 1000"}), 400
+
+        from backend.azure.aio.cost import AsyncCostAnalyzer
+        from backend.azure.cost import QUERY_DIMENSIONS
+
+        group_by = request.args.get('group_by', 'ResourceGroupName').strip()
+        if group_by not in QUERY_DIMENSIONS and not (group_by.startswith('tag:') and len(group_by) > 4):
+            return jsonify({
+                "error": f"group_by must be one of {', '.join(QUERY_DIMENSIONS)} or tag:<name>"
+            }), 400
+
+        async with AsyncCostAnalyzer(subscription_id) as analyzer:
+            rollup = await analyzer.cost_rollup(start, end, group_by, top)
+        cost_store.record_view(f"subscriptions/{subscription_id}")
+        return jsonify(rollup)
+    except Exception as e:
+        logger.exception("Error in get_cost_rollup")
+        return _error_response(e)
+
+@api_bp.route("/costs/resources")
+def get_resource_costs():
+    """Get per-resource cost joined with the resource inventory, most expensive first.
+
+    Query parameters: ``subscription_id``, ``start``/``end`` (default
+    previous month), optional ``resource_group``, and ``limit`` (1-1000,
+    default 50) / ``offset`` for paging. Costs and the (cached) inventory
+    are fetched concurrently; only the requested page is joined and sent.
+    """
+    try:
+        subscription_id = request.args.get('subscription_id')
+        if not subscription_id:
+            return jsonify({"error": "subscription_id parameter is required"}), 400
+        try:
+            start, end = _parse_date_range()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        limit = request.args.get('limit', 50, type=int)
+        offset = request.args.get('offset', 0, type=int)
+        if not 1 <= limit <= 1000 or offset < 0:
+            return jsonify({"error": "limit must be between 1 and 1000 and offset must not be negative"}), 400
+        resource_group = request.args.get('resource_group') or None
+
+        from backend.azure.cost import CostAnalyzer
+        from backend.azure.inventory import inventory
+
+        analyzer = CostAnalyzer(subscription_id)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            costs = pool.submit(copy_current_request_context(lambda: analyzer.resource_costs(start, end)))
+            index = pool.submit(copy_current_request_context(lambda: inventory.resource_index(subscription_id)))
+            ids, totals = costs.result()
+            page = analyzer.resource_page(ids, totals, index.result(), resource_group, offset, limit)
+        cost_store.record_view(f"subscriptions/{subscription_id}")
+        page.update({"start": start.isoformat(), "end": end.isoformat()})
+        return jsonify(page)
+    except Exception as e:
+        logger.exception("Error in get_resource_costs")
+        return _error_response(e)
+
+@api_bp.route("/costs/export")
+def export_costs():
+    """Stream cost rows for any range, grouping and set of subscriptions as a download.
+
+    Query parameters: ``subscription_ids`` (comma-separated, default every
+    subscription the user can see), ``start``/``end`` (default previous
+    month), ``granularity`` (daily|monthly), ``group_by`` (up to two of the
+    query dimensions or ResourceId, or ``tag:<name>``) and ``format``
+    (csv|ndjson|parquet, default csv). Rows are fetched a month and a page
+    (or store batch) at a time and encoded as they arrive, so memory stays
+    bounded however long the export is. Access to every subscription is
+    checked before the download starts; ones the user cannot read are left
+    out and listed in the ``X-Skipped-Subscriptions`` header.
+    """
+    try:
+        from backend.azure.clients import ARM_SCOPE
+        from backend.azure.cost import CostAnalyzer, EXPORT_DIMENSIONS
+        from backend.azure.credentials import StaticTokenCredential, get_flask_credential
+        from backend.azure.inventory import inventory
+        from backend.azure.throttle import PRIORITY_BACKGROUND
+        from backend.web import export_formats
+        from backend.web.compression import compress_stream, negotiate_encoding
+        from config import EXPORT_BATCH_ROWS
+
+        try:
+            start, end = _parse_date_range()
+            granularity = _parse_granularity()
+            group_by = _parse_group_by(EXPORT_DIMENSIONS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format not in export_formats.ENCODERS:
+            return jsonify({"error": "format must be csv, ndjson or parquet"}), 400
+        if export_format == 'parquet' and export_formats.pa is None:
+            return jsonify({"error": "Parquet export requires pyarrow on the server"}), 400
+
+        ids_param = request.args.get('subscription_ids') or request.args.get('subscription_id', '')
+        subscription_ids = list(dict.fromkeys(s.strip() for s in ids_param.split(',') if s.strip()))
+        if not subscription_ids:
+            subscription_ids = [sub["subscription_id"] for sub in inventory.subscriptions()]
+
+        # Once the headers are sent a failure can only cut the download short,
+        # so every subscription is checked up front, concurrently as in
+        # get_cost_summary_all
+        credential = StaticTokenCredential(get_flask_credential().get_token(ARM_SCOPE))
+        analyzers = {sid: CostAnalyzer(sid, credential) for sid in subscription_ids}
+
+        def check(subscription_id):
+            try:
+                analyzers[subscription_id].check_access()
+                return None
+            except Exception as e:
+                logger.warning("Skipping subscription %s in export: %s", subscription_id, e)
+                return e
+
+        workers = max(1, min(COST_FANOUT_CONCURRENCY, len(subscription_ids)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            failures = dict(zip(subscription_ids, pool.map(check, subscription_ids)))
+        skipped = [sid for sid, error in failures.items() if error is not None]
+        # Throttling says nothing about access: let the client retry instead
+        throttled = [failures[sid] for sid in skipped if getattr(failures[sid], "status_code", None) == 429]
+        if throttled or (skipped and len(skipped) == len(subscription_ids)):
+            return _error_response((throttled or [failures[skipped[0]]])[0])
+        subscription_ids = [sid for sid in subscription_ids if failures[sid] is None]
+
+        def batches():
+            for subscription_id in subscription_ids:
+                # Bulk work; the dashboard's own queries keep the rate limit headroom
+                analyzer = CostAnalyzer(subscription_id, priority=PRIORITY_BACKGROUND)
+                frames = analyzer.iter_export_frames(start, end, granularity, group_by, EXPORT_BATCH_ROWS)
+                for frame in frames:
+                    yield subscription_id, frame
+
+        # Fetch the first batch before answering, so access and throttling
+        # errors still become a JSON error response
+        rows = batches()
+        first = next(rows, None)
+        if first is not None:
+            rows = itertools.chain([first], rows)
+        body = _export_body(export_formats.ENCODERS[export_format](rows, group_by), export_format)
+
+        encoding = negotiate_encoding() if export_format != 'parquet' else None
+        if encoding is not None:
+            body = compress_stream(body, encoding)
+        response = Response(stream_with_context(body), mimetype=export_formats.EXPORT_MIMETYPES[export_format])
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Content-Disposition"] = f'attachment; filename="costs-{start}-{end}.{export_format}"'
+        response.headers["Cache-Control"] = "private, no-store"
+        if skipped:
+            response.headers["X-Skipped-Subscriptions"] = ",".join(skipped)
+        return response
+    except Exception as e:
+        logger.exception("Error in export_costs")
+        return _error_response(e)
+
+def _export_body(chunks, export_format):
+    """Pass encoded chunks through, reporting a failure after the headers were sent.
+
+    NDJSON gets the error as its last line; CSV and Parquet have no way to
+    carry one, so the transfer is aborted and the client sees a truncated
+    download instead of a silently short file.
+    """
+    try:
+        yield from chunks
+    except Exception as e:
+        logger.exception("Error streaming export_costs")
+        if export_format != 'ndjson':
+            raise
+        yield (json.dumps({"error": str(e)}) + "\n").encode()
+
+def _ndjson_rows(frames, subscription_id, group_by):
+    """Yield query rows as NDJSON lines while later pages are still being fetched."""
+    try:
+        for frame in frames:
+            records = frame.records("date", "cost", {g: g for g in group_by})
+            yield "".join(json.dumps(record) + "\n" for record in records)
+        cost_store.record_view(f"subscriptions/{subscription_id}")
+    except Exception as e:
+        # Headers are already sent; report the failure in-band as the last line
+        logger.exception("Error streaming query_costs")
+        yield json.dumps({"error": str(e)}) + "\n"
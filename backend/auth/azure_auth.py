@@ -1,18 +1,20 @@
-from flask import Blueprint, redirect, url_for, session, request, jsonify
-import msal
+from flask import Blueprint, current_app, redirect, url_for, session, request, jsonify
 import uuid
 import time
-from config import CLIENT_ID, CLIENT_SECRET, AUTHORITY, REDIRECT_PATH, SCOPE
+from config import AUTHORITY, REDIRECT_PATH, SCOPE
+from backend.auth.token_cache import bound_msal_app, get_msal_app, observe_token, token_cache_store
 
 auth_bp = Blueprint("auth_bp", __name__, url_prefix="/auth")
 
-def _build_msal_app(cache=None):
-    return msal.ConfidentialClientApplication(
-        CLIENT_ID, authority=AUTHORITY,
-        client_credential=CLIENT_SECRET, token_cache=cache)
+def _start_session():
+    """Clear the pre-login session and, for server-side sessions, give it a new id."""
+    session.clear()
+    regenerate = getattr(current_app.session_interface, "regenerate", None)
+    if regenerate is not None:
+        regenerate(session)
 
 def _build_auth_url(state=None):
-    return _build_msal_app().get_authorization_request_url(
+    return get_msal_app().get_authorization_request_url(
         SCOPE,
         state=state or str(uuid.uuid4()),
         redirect_uri=url_for("auth_bp.callback", _external=True)
@@ -20,6 +22,16 @@ def _build_auth_url(state=None):
 
 @auth_bp.route("/login")
 def login():
+    from backend.azure.credentials import static_token
+
+    token = static_token()
+    if token is not None:
+        # Offline against a local stand-in for Azure: no MSAL, one fixed user
+        _start_session()
+        session["user"] = {"name": "Local user", "preferred_username": "local@localhost", "oid": "local", "tid": "local"}
+        session["access_token"] = token
+        session["token_expires"] = int(time.time()) + 86400
+        return redirect(url_for('home'))
     session["state"] = str(uuid.uuid4())
     auth_url = _build_auth_url(session["state"])
     return redirect(auth_url)
@@ -32,13 +44,23 @@ def callback():
         return f"Error: {request.args['error']}", 400
 
     code = request.args.get("code")
-    result = _build_msal_app().acquire_token_by_authorization_code(
-        code,
-        scopes=SCOPE,
-        redirect_uri=url_for("auth_bp.callback", _external=True)
-    )
+    started = time.perf_counter()
+    with bound_msal_app() as app:
+        result = app.acquire_token_by_authorization_code(
+            code,
+            scopes=SCOPE,
+            redirect_uri=url_for("auth_bp.callback", _external=True)
+        )
+        accounts = app.get_accounts()
+        account_id = accounts[0]["home_account_id"] if accounts else None
+        if "access_token" in result and account_id:
+            # Keep the refresh token server-side for silent renewal
+            token_cache_store.save(account_id, app.token_cache)
+    observe_token("authorization_code", started, result)
     if "access_token" in result:
+        _start_session()
         session["user"] = result.get("id_token_claims")
+        session["account_id"] = account_id
         session["access_token"] = result["access_token"]
         if "expires_in" in result:
             session["token_expires"] = int(time.time()) + int(result["expires_in"])
@@ -49,6 +71,8 @@ def callback():
 
 @auth_bp.route("/logout")
 def logout():
+    if session.get("account_id"):
+        token_cache_store.delete(session["account_id"])
     session.clear()
     return redirect(
         f"{AUTHORITY}/oauth2/v2.0/logout"
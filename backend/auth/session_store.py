@@ -0,0 +1,175 @@
+"""Server-side Flask sessions: the cookie only carries a signed session id."""
+
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask import Flask, Request, Response
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+_serializer = TaggedJSONSerializer()
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict that tracks modification and remembers its id."""
+
+    def __init__(self, initial: dict | None = None, sid: str | None = None) -> None:
+        def on_update(self: "ServerSideSession") -> None:
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid or secrets.token_urlsafe(32)
+        self.modified = False
+
+
+class MemorySessionStore:
+    """Per-process session store; sessions are lost on restart and not shared."""
+
+    def __init__(self) -> None:
+        self._data: dict[str, tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, sid: str) -> str | None:
+        with self._lock:
+            entry = self._data.get(sid)
+            if entry is None or entry[0] <= time.time():
+                self._data.pop(sid, None)
+                return None
+            return entry[1]
+
+    def save(self, sid: str, payload: str, expires_at: float) -> None:
+        with self._lock:
+            self._data[sid] = (expires_at, payload)
+
+    def delete(self, sid: str) -> None:
+        with self._lock:
+            self._data.pop(sid, None)
+
+
+class SQLiteSessionStore:
+    """Session store in a local SQLite file, shared by every worker on the host."""
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions"
+            " (sid TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_expiry ON sessions (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid: str) -> str | None:
+        row = self._connect().execute(
+            "SELECT payload FROM sessions WHERE sid = ? AND expires_at > ?", (sid, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def save(self, sid: str, payload: str, expires_at: float) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (sid, payload, expires_at) VALUES (?, ?, ?)",
+                (sid, payload, expires_at),
+            )
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, sid: str) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keep session data in ``store`` and only a signed, opaque id in the cookie.
+
+    The store is only written when the session changes, so ordinary API and
+    asset requests cost one indexed lookup.
+    """
+
+    def __init__(self, store: MemorySessionStore | SQLiteSessionStore, lifetime: int) -> None:
+        self._store = store
+        self._lifetime = lifetime
+
+    def _signer(self, app: Flask) -> Signer:
+        return Signer(app.secret_key, salt="server-side-session")
+
+    def open_session(self, app: Flask, request: Request) -> ServerSideSession:
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            payload = self._store.load(sid) if sid else None
+            if payload is not None:
+                return ServerSideSession(_serializer.loads(payload), sid)
+        return ServerSideSession()
+
+    def regenerate(self, session: ServerSideSession) -> None:
+        """Move ``session`` to a new id and delete the record held under the old one.
+
+        Called on sign-in, so an id planted before login never carries the
+        signed-in user's tokens.
+        """
+
+        self._store.delete(session.sid)
+        session.sid = secrets.token_urlsafe(32)
+        session.modified = True
+
+    def save_session(self, app: Flask, session: ServerSideSession, response: Response) -> None:
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified:
+                self._store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not session.modified:
+            return
+
+        self._store.save(session.sid, _serializer.dumps(dict(session)), time.time() + self._lifetime)
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode(),
+            max_age=self._lifetime,
+            httponly=self.get_cookie_httponly(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+            domain=domain,
+            path=path,
+        )
+
+
+def build_session_interface(session_type: str) -> SessionInterface | None:
+    """Return the session interface for ``SESSION_TYPE``, or ``None`` for cookie sessions."""
+
+    from config import SESSION_FILE_PATH, SESSION_LIFETIME_SECONDS
+
+    if session_type == "memory":
+        return ServerSideSessionInterface(MemorySessionStore(), SESSION_LIFETIME_SECONDS)
+    if session_type in ("filesystem", "sqlite"):
+        return ServerSideSessionInterface(SQLiteSessionStore(SESSION_FILE_PATH), SESSION_LIFETIME_SECONDS)
+    if session_type == "cookie":
+        return None
+    raise ValueError(f"Unsupported SESSION_TYPE: {session_type}")
@@ -0,0 +1,149 @@
+"""Process-wide MSAL application and server-side per-user token caches."""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator
+
+from backend.metrics import token_seconds
+from config import AUTHORITY, CLIENT_ID, CLIENT_SECRET, SCOPE, TOKEN_CACHE_PATH
+
+if TYPE_CHECKING:
+    import msal
+
+# msal (and requests under it) is imported on first use, not at worker start
+_app: "msal.ConfidentialClientApplication | None" = None
+_app_lock = threading.Lock()
+
+
+class TokenCacheStore:
+    """Serialized MSAL token caches keyed by account, shared by workers on the host."""
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS token_caches"
+            " (account_id TEXT PRIMARY KEY, blob TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, account_id: str) -> str | None:
+        """Return the serialized token cache for ``account_id``, if any."""
+
+        row = self._connect().execute(
+            "SELECT blob FROM token_caches WHERE account_id = ?", (account_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def save(self, account_id: str, cache: "msal.SerializableTokenCache") -> None:
+        """Persist ``cache`` if MSAL changed it."""
+
+        if not cache.has_state_changed:
+            return
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO token_caches (account_id, blob, updated_at) VALUES (?, ?, ?)",
+                (account_id, cache.serialize(), time.time()),
+            )
+
+    def delete(self, account_id: str) -> None:
+        """Forget every token held for ``account_id``."""
+
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM token_caches WHERE account_id = ?", (account_id,))
+
+
+token_cache_store = TokenCacheStore(TOKEN_CACHE_PATH)
+
+
+def get_msal_app() -> "msal.ConfidentialClientApplication":
+    """Return the process-wide confidential client (authority discovery runs once)."""
+
+    global _app
+    if _app is None:
+        import msal
+
+        with _app_lock:
+            if _app is None:
+                _app = msal.ConfidentialClientApplication(
+                    CLIENT_ID, authority=AUTHORITY, client_credential=CLIENT_SECRET,
+                )
+    return _app
+
+
+class _SharedHttpClient:
+    """Send a per-user app's requests through the process-wide app's HTTP client.
+
+    That client keeps MSAL's response cache, so the discovery requests a new
+    app makes are answered from memory and its connections are reused.
+    """
+
+    def __init__(self, http_client) -> None:
+        self._http_client = http_client
+
+    def get(self, *args, **kwargs):
+        return self._http_client.get(*args, **kwargs)
+
+    def post(self, *args, **kwargs):
+        return self._http_client.post(*args, **kwargs)
+
+    def close(self) -> None:
+        """The shared client outlives every per-user app."""
+
+
+@contextmanager
+def bound_msal_app(account_id: str | None = None) -> Iterator["msal.ConfidentialClientApplication"]:
+    """Yield an MSAL app holding only ``account_id``'s token cache.
+
+    MSAL binds one token cache to an application, so each call gets a
+    lightweight app of its own on top of the shared one's HTTP client; no
+    lock is held while it talks to Entra ID. Callers persist changes with
+    ``token_cache_store.save(account_id, app.token_cache)``.
+    """
+
+    import msal
+
+    shared = get_msal_app()
+    cache = msal.SerializableTokenCache()
+    if account_id:
+        cache.deserialize(token_cache_store.load(account_id))
+    yield msal.ConfidentialClientApplication(
+        CLIENT_ID, authority=AUTHORITY, client_credential=CLIENT_SECRET,
+        token_cache=cache, http_client=_SharedHttpClient(shared.http_client),
+    )
+
+
+def observe_token(flow: str, started: float, result: dict | None) -> None:
+    """Record how long an MSAL ``flow`` took since ``started`` and whether it succeeded."""
+
+    outcome = "ok" if result and "access_token" in result else "error"
+    token_seconds.observe(time.perf_counter() - started, flow, outcome)
+
+
+def acquire_token_silent(account_id: str) -> dict | None:
+    """Return a fresh token result for ``account_id`` using its cached refresh token."""
+
+    started = time.perf_counter()
+    with bound_msal_app(account_id) as app:
+        account = next(
+            (a for a in app.get_accounts() if a.get("home_account_id") == account_id), None
+        )
+        result = app.acquire_token_silent(SCOPE, account=account) if account else None
+        token_cache_store.save(account_id, app.token_cache)
+    observe_token("silent", started, result)
+    return result
@@ -0,0 +1 @@
+# Async Azure integration package
@@ -0,0 +1,170 @@
+"""Async cost analytics helpers using Azure Cost Management."""
+
+import asyncio
+import datetime as _dt
+
+from azure.core.rest import AsyncHttpResponse, HttpRequest
+from azure.mgmt.costmanagement.models import QueryResult
+
+from backend.metrics import cache_requests
+
+from ..anomalies import anomaly_detector
+from ..cache import QueryCache, query_cache
+from ..clients import async_clients
+from ..cost import CostAnalyzer, _month_chunks, previous_month, trailing_months
+from ..credentials import StaticTokenCredential
+from ..frame import CostFrame
+from ..rollup import rollup_cube
+from ..store import cost_store
+from ..throttle import PRIORITY_INTERACTIVE
+from .credentials import get_async_flask_credential, session_token_credential
+
+
+class AsyncCostAnalyzer(CostAnalyzer):
+    """Async counterpart of :class:`~backend.azure.cost.CostAnalyzer`.
+
+    Shares the query cache, local store and normalization with the sync
+    analyzer; only the upstream calls are awaited, on the process-wide
+    clients of :data:`~backend.azure.clients.async_clients`.
+    """
+
+    def __init__(self, subscription_id: str, priority: str = PRIORITY_INTERACTIVE) -> None:
+        super().__init__(subscription_id, get_async_flask_credential(), priority)
+        self._call_credential: StaticTokenCredential | None = None
+
+    async def __aenter__(self) -> "AsyncCostAnalyzer":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self._credential.close()
+
+    async def _token(self) -> StaticTokenCredential:
+        # The shared clients run outside this request, so they get the token itself
+        if self._call_credential is None:
+            self._call_credential = await session_token_credential()
+        return self._call_credential
+
+    async def _usage(self, query: dict[str, object]) -> QueryResult:
+        key = QueryCache.make_key(self._identity, self._scope, query)
+        return await query_cache.aget_or_compute(key, lambda: self._fetch_all_pages(query))
+
+    async def _fetch_all_pages(self, query: dict[str, object]) -> QueryResult:
+        credential = await self._token()
+
+        # Pages are only read on the shared loop; they are decoded here, off it
+        async def first_page(client) -> AsyncHttpResponse:
+            response = await client.query.usage(
+                scope=self._scope,
+                parameters=query,
+                stream=True,
+                cls=lambda pipeline_response, *_: pipeline_response.http_response,
+                credential=credential,
+                priority=self._priority,
+            )
+            await response.read()
+            return response
+
+        async def next_page(client, link: str) -> AsyncHttpResponse:
+            response = await client.send_request(
+                HttpRequest("POST", link, json=query), credential=credential, priority=self._priority
+            )
+            response.raise_for_status()
+            await response.read()
+            return response
+
+        pages = [self._page_result((await async_clients.call("cost", first_page)).json())]
+        while pages[-1].next_link:
+            link = pages[-1].next_link
+            response = await async_clients.call("cost", lambda client: next_page(client, link))
+            pages.append(self._page_result(response.json()))
+        return self._merge_pages(pages)
+
+    async def check_access(self) -> None:
+        credential = await self._token()
+
+        async def fetch():
+            return await async_clients.call(
+                "subscriptions",
+                lambda client: client.subscriptions.get(
+                    self._subscription_id, credential=credential, priority=self._priority
+                ),
+            )
+
+        key = QueryCache.make_key(self._identity, self._scope, "access")
+        await query_cache.aget_or_compute(key, fetch)
+
+    async def daily_costs(self, start: _dt.date, end: _dt.date, grouping: str = "") -> CostFrame:
+        await self.ensure_stored(start, end, grouping)
+        return CostFrame.from_rows(cost_store.rows(self._scope, grouping, start, end))
+
+    async def ensure_stored(self, start: _dt.date, end: _dt.date, grouping: str = "") -> None:
+        stale = cost_store.stale_ranges(self._scope, grouping, start, end)
+        cache_requests.inc("cost_store", "miss" if stale else "hit")
+        if not stale:
+            await self.check_access()
+        group_spec = [self._grouping_spec(grouping)] if grouping else None
+        chunks = [chunk for lo, hi in stale for chunk in _month_chunks(lo, hi)]
+        results = await asyncio.gather(
+            *(self._usage(self._usage_query(lo, hi, group_spec)) for lo, hi in chunks)
+        )
+        for (lo, hi), result in zip(chunks, results):
+            self._store_chunk(grouping, lo, hi, result)
+
+    async def group_totals(self, start: _dt.date, end: _dt.date, grouping: str) -> dict[str, float]:
+        await self.ensure_stored(start, end, grouping)
+        return rollup_cube.totals(self._scope, grouping, start, end)
+
+    async def cost_rollup(self, start: _dt.date, end: _dt.date, grouping: str, top: int = 10) -> dict:
+        await self.ensure_stored(start, end, grouping)
+        return self._rollup(start, end, grouping, top)
+
+    async def actual_cost_last_month(self) -> list[dict]:
+        start, end = previous_month()
+        return self._daily_records(await self.daily_costs(start, end))
+
+    async def cost_per_resource_group(self) -> list[dict]:
+        start, end = previous_month()
+        return self._resource_group_records(
+            await self.daily_costs(start, end, "ResourceGroupName")
+        )
+
+    async def daily_cost_columns(self) -> dict:
+        start, end = previous_month()
+        return self._daily_columns(await self.daily_costs(start, end), start, end)
+
+    async def resource_group_cost_columns(self) -> dict:
+        start, end = previous_month()
+        return self._resource_group_columns(
+            await self.daily_costs(start, end, "ResourceGroupName"), start, end
+        )
+
+    async def cost_summary(self) -> dict:
+        """Return the previous month's summary, running both queries concurrently."""
+
+        start, end = previous_month()
+        daily, resource_groups = await asyncio.gather(
+            self.daily_costs(start, end), self.group_totals(start, end, "ResourceGroupName")
+        )
+        return self._summarize(daily, resource_groups)
+
+    async def dashboard_panels(self, columnar: bool = False) -> dict:
+        start, end = previous_month()
+        daily, resource_groups = await asyncio.gather(
+            self.daily_costs(start, end), self.group_totals(start, end, "ResourceGroupName")
+        )
+        return self._panels(daily, resource_groups, start, end, columnar)
+
+    async def cost_trend(self, months: int = 12, window: int = 7) -> dict:
+        start, end = trailing_months(months)
+        return self._trend(await self.daily_costs(start, end), start, end, window)
+
+    async def cost_forecast(self, method: str = "seasonal", history_days: int = 90) -> dict:
+        today = _dt.date.today()
+        start = today - _dt.timedelta(days=history_days)
+        end = today - _dt.timedelta(days=1)
+        return self._forecast(await self.daily_costs(start, end), start, today, method)
+
+    async def cost_anomalies(self, days: int = 30) -> list[dict]:
+        start, end = self._anomaly_range(days)
+        await self.ensure_stored(start - _dt.timedelta(days=anomaly_detector.window), end, "ResourceGroupName")
+        return self._anomaly_records(start, end)
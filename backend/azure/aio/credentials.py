@@ -0,0 +1,52 @@
+"""Async credential helpers for Azure SDK integration with Flask sessions."""
+
+import asyncio
+import time
+from flask import session
+from typing import Sequence
+from azure.core.credentials import AccessToken
+from azure.core.credentials_async import AsyncTokenCredential
+from ..clients import ARM_SCOPE
+from ..credentials import _REFRESH_MARGIN, StaticTokenCredential, refresh_session_token
+
+
+class AsyncFlaskSessionCredential(AsyncTokenCredential):
+    """An :class:`~azure.core.credentials_async.AsyncTokenCredential` using Flask session."""
+
+    def __init__(self, scope: Sequence[str]) -> None:
+        self._scope = scope
+
+    async def get_token(self, *scopes: str, **kwargs: object) -> AccessToken:  # type: ignore[override]
+        """Return the :class:`~azure.core.credentials.AccessToken` stored in session."""
+
+        if session.get("token_expires", 0) - time.time() < _REFRESH_MARGIN:
+            await asyncio.to_thread(refresh_session_token)
+
+        token: str | None = session.get("access_token")
+        expires_at: int | None = session.get("token_expires")
+
+        if token is None or expires_at is None or expires_at <= time.time():
+            raise RuntimeError("User is not authenticated")
+
+        return AccessToken(token, expires_at)
+
+    async def close(self) -> None:
+        """Nothing to release; the token lives in the session."""
+
+
+def get_async_flask_credential() -> AsyncFlaskSessionCredential:
+    """Create an :class:`AsyncFlaskSessionCredential` from the current session."""
+
+    from config import SCOPE
+
+    return AsyncFlaskSessionCredential(SCOPE)
+
+
+async def session_token_credential() -> StaticTokenCredential:
+    """Capture the signed-in user's current token as a plain credential.
+
+    The shared async clients run on their own event loop, outside the
+    request and its session, so calls made there carry this instead.
+    """
+
+    return StaticTokenCredential(await get_async_flask_credential().get_token(ARM_SCOPE))
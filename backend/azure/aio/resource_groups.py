@@ -0,0 +1,42 @@
+"""Async Azure Resource Group management helpers."""
+from azure.core.credentials import TokenCredential
+
+from ..clients import async_clients
+from ..throttle import PRIORITY_INTERACTIVE
+from .credentials import session_token_credential
+
+
+class AsyncResourceGroupManager:
+    """Async counterpart of :class:`backend.azure.resource_groups.ResourceGroupManager`.
+
+    Lists through the shared async clients; without a ``credential`` it
+    acts as the signed-in user.
+    """
+
+    def __init__(
+        self,
+        subscription_id: str,
+        credential: TokenCredential | None = None,
+        priority: str = PRIORITY_INTERACTIVE,
+    ) -> None:
+        self._subscription_id = subscription_id
+        self._credential = credential
+        self._priority = priority
+
+    async def list_resource_groups(self) -> list[dict]:
+        """Return resource groups for the subscription."""
+
+        credential = self._credential or await session_token_credential()
+
+        async def collect(client) -> list[dict]:
+            groups = client.resource_groups.list(credential=credential, priority=self._priority)
+            return [
+                {
+                    "id": g.id,
+                    "name": g.name,
+                    "location": g.location,
+                }
+                async for g in groups
+            ]
+
+        return await async_clients.call("resources", collect, self._subscription_id)
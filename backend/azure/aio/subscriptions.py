@@ -0,0 +1,38 @@
+"""Async Azure subscription management utilities."""
+from azure.core.credentials import TokenCredential
+
+from ..clients import async_clients
+from ..throttle import PRIORITY_INTERACTIVE
+from .credentials import session_token_credential
+
+
+class AsyncSubscriptionManager:
+    """Async counterpart of :class:`backend.azure.subscriptions.SubscriptionManager`.
+
+    Lists through the shared async clients; without a ``credential`` it
+    acts as the signed-in user.
+    """
+
+    def __init__(
+        self, credential: TokenCredential | None = None, priority: str = PRIORITY_INTERACTIVE
+    ) -> None:
+        self._credential = credential
+        self._priority = priority
+
+    async def list_subscriptions(self) -> list[dict]:
+        """Return all subscriptions available for the signed-in user."""
+
+        credential = self._credential or await session_token_credential()
+
+        async def collect(client) -> list[dict]:
+            subs = client.subscriptions.list(credential=credential, priority=self._priority)
+            return [
+                {
+                    "subscription_id": sub.subscription_id,
+                    "display_name": sub.display_name,
+                    "state": str(sub.state),
+                }
+                async for sub in subs
+            ]
+
+        return await async_clients.call("subscriptions", collect)
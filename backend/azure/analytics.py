@@ -0,0 +1,131 @@
+"""Vectorized trend and forecast computations over stored daily costs."""
+
+import datetime as _dt
+
+import numpy as np
+
+from .frame import CostFrame
+
+
+def to_days(dates: np.ndarray) -> np.ndarray:
+    """Convert ``YYYYMMDD`` int64 dates to ``datetime64[D]``."""
+
+    dates = np.asarray(dates, dtype=np.int64)
+    months = (dates // 10000 - 1970) * 12 + dates // 100 % 100 - 1
+    return months.astype("datetime64[M]").astype("datetime64[D]") + (dates % 100 - 1)
+
+
+def from_days(days: np.ndarray) -> np.ndarray:
+    """Inverse of :func:`to_days`."""
+
+    months = days.astype("datetime64[M]")
+    day = (days - months.astype("datetime64[D]")).astype(np.int64) + 1
+    month = months.astype(np.int64)
+    return (month // 12 + 1970) * 10000 + (month % 12 + 1) * 100 + day
+
+
+def daily_totals(frame: CostFrame, start: _dt.date, end: _dt.date) -> tuple[np.ndarray, np.ndarray]:
+    """Return every day in [start, end] and its total cost, zero where nothing was billed."""
+
+    first = np.datetime64(start, "D")
+    days = np.arange(first, np.datetime64(end, "D") + 1)
+    totals = np.zeros(len(days))
+    if len(frame):
+        offsets = (to_days(frame.dates) - first).astype(np.int64)
+        keep = (offsets >= 0) & (offsets < len(days))
+        totals = np.bincount(offsets[keep], weights=frame.costs[keep], minlength=len(days))
+    return days, totals
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over ``window`` values (shorter at the start of the series)."""
+
+    sums = np.cumsum(np.concatenate(([0.0], values)))
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (sums[ends] - sums[starts]) / (ends - starts)
+
+
+def monthly_totals(days: np.ndarray, costs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return each calendar month present in ``days`` and its total cost."""
+
+    months = days.astype("datetime64[M]")
+    unique, inverse = np.unique(months, return_inverse=True)
+    return unique, np.bincount(inverse, weights=costs, minlength=len(unique))
+
+
+def month_over_month(totals: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return absolute and relative change from the previous month (NaN for the first)."""
+
+    previous = np.concatenate(([np.nan], totals[:-1]))
+    delta = totals - previous
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(previous > 0, delta / previous * 100, np.nan)
+    return delta, pct
+
+
+def weekday_factors(days: np.ndarray, costs: np.ndarray) -> np.ndarray:
+    """Return each weekday's cost relative to the overall daily mean (Monday first)."""
+
+    weekdays = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    counts = np.bincount(weekdays, minlength=7)
+    sums = np.bincount(weekdays, weights=costs, minlength=7)
+    mean = costs.mean() if len(costs) else 0.0
+    if mean <= 0:
+        return np.ones(7)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factors = np.where(counts > 0, sums / counts / mean, 1.0)
+    return factors
+
+
+def project(days: np.ndarray, costs: np.ndarray, future: np.ndarray, method: str = "seasonal") -> np.ndarray:
+    """Project daily cost for ``future`` days from history ``days``/``costs``.
+
+    ``linear`` extends a least-squares line through the history; ``seasonal``
+    scales the trailing four-week level by each weekday's usual share.
+    """
+
+    if len(future) == 0:
+        return np.zeros(0)
+    if len(costs) == 0:
+        return np.zeros(len(future))
+    if method == "linear":
+        if len(costs) < 2:
+            return np.full(len(future), costs[-1])
+        x = (days - days[0]).astype(np.float64)
+        slope, intercept = np.polyfit(x, costs, 1)
+        projected = intercept + slope * (future - days[0]).astype(np.float64)
+    else:
+        level = costs[-28:].mean()
+        projected = level * weekday_factors(days, costs)[(future.astype(np.int64) + 3) % 7]
+    return np.maximum(projected, 0.0)
+
+
+def robust_scores(
+    matrix: np.ndarray, first: int, window: int, block: int = 1024
+) -> tuple[np.ndarray, np.ndarray]:
+    """Score columns ``first:`` of a (series x day) matrix against their trailing window.
+
+    Each value is compared with the median of the ``window`` days before it,
+    scaled by the median absolute deviation (a rolling robust z-score), so
+    ``first`` must be at least ``window``. Returns the baselines and scores.
+    Rows are processed in blocks to bound memory.
+    """
+
+    rows, columns = matrix.shape
+    baseline = np.zeros((rows, columns - first))
+    scores = np.zeros((rows, columns - first))
+    for lo in range(0, rows, block):
+        # history[:, t, :] holds the window days before column first + t
+        history = np.lib.stride_tricks.sliding_window_view(
+            matrix[lo:lo + block, first - window:columns - 1], window, axis=1
+        )
+        values = matrix[lo:lo + block, first:]
+        median = np.median(history, axis=2)
+        mad = np.median(np.abs(history - median[..., None]), axis=2)
+        # 1.4826 * MAD estimates the standard deviation of normal data; the floor
+        # keeps flat series (MAD 0) from flagging every cent of change
+        scale = np.maximum(1.4826 * mad, np.maximum(0.05 * np.abs(median), 0.01))
+        baseline[lo:lo + block] = median
+        scores[lo:lo + block] = (values - median) / scale
+    return baseline, scores
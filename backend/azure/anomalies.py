@@ -0,0 +1,160 @@
+"""Incremental cost anomaly detection over stored daily per-group costs."""
+
+import datetime as _dt
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from . import analytics
+from .store import cost_store
+
+
+class _ScopeState:
+    """Dense (group x day) costs and scores for one scope, reused between calls."""
+
+    def __init__(self, days: np.ndarray, window: int) -> None:
+        self.days = days
+        self.groups: list[str] = []
+        self.index: dict[str, int] = {}
+        self.matrix = np.zeros((0, len(days)))
+        self.fetched = np.full(len(days), np.nan)
+        # Days before `window` have no full history and are never scored
+        self.baseline = np.zeros((0, len(days) - window))
+        self.scores = np.zeros((0, len(days) - window))
+
+    def add_groups(self, names: list[str]) -> None:
+        new = [name for name in dict.fromkeys(names) if name not in self.index]
+        if not new:
+            return
+        for name in new:
+            self.index[name] = len(self.groups)
+            self.groups.append(name)
+        self.matrix = np.vstack((self.matrix, np.zeros((len(new), self.matrix.shape[1]))))
+
+
+class AnomalyDetector:
+    """Flag days whose cost departs from the group's trailing median.
+
+    Keeps each scope's matrix and scores in memory. A call only reloads the
+    days whose ``fetched_at`` changed in the store and re-scores from the
+    earliest of them, so as new days arrive only the tail is recomputed.
+    At most ``max_states`` scopes are kept, least recently used first out.
+    """
+
+    def __init__(self, window: int, threshold: float, min_delta: float, max_states: int) -> None:
+        self._window = window
+        self._threshold = threshold
+        self._min_delta = min_delta
+        self._max_states = max_states
+        self._states: OrderedDict[tuple[str, str], _ScopeState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def window(self) -> int:
+        """Days of history each scored day is compared with."""
+
+        return self._window
+
+    def detect(self, scope: str, grouping: str, start: _dt.date, end: _dt.date) -> list[dict]:
+        """Return anomalies in [start, end] for rows already in the store."""
+
+        with self._lock:
+            state = self._update(scope, grouping, start - _dt.timedelta(days=self._window), end)
+            return self._flagged(state)
+
+    def _update(self, scope: str, grouping: str, start: _dt.date, end: _dt.date) -> _ScopeState:
+        days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+        state = self._realign(self._states.get((scope, grouping)), days)
+        self._states[(scope, grouping)] = state
+        self._states.move_to_end((scope, grouping))
+        while len(self._states) > self._max_states:
+            self._states.popitem(last=False)
+
+        fetched_at = cost_store.fetched_days(scope, grouping, start, end)
+        fetched = np.array([fetched_at.get(d, np.nan) for d in analytics.from_days(days).tolist()])
+        dirty = np.flatnonzero(~((fetched == state.fetched) | (np.isnan(fetched) & np.isnan(state.fetched))))
+        if len(dirty) == 0:
+            return state
+
+        lo, hi = int(dirty[0]), int(dirty[-1])
+        rows = cost_store.rows(
+            scope, grouping, start + _dt.timedelta(days=lo), start + _dt.timedelta(days=hi)
+        )
+        state.add_groups([group for _, group, _ in rows])
+        state.matrix[:, lo:hi + 1] = 0.0
+        if rows:
+            dates, groups, costs = zip(*rows)
+            columns = (analytics.to_days(np.asarray(dates)) - days[0]).astype(np.int64)
+            index = state.index
+            cells = np.fromiter((index[g] for g in groups), np.int64, len(groups)) * len(days) + columns
+            state.matrix += np.bincount(cells, weights=costs, minlength=state.matrix.size).reshape(state.matrix.shape)
+        state.fetched = fetched
+
+        # A changed day shifts the baseline of the days after it; new groups need every day
+        shape = (len(state.groups), len(days) - self._window)
+        first = max(self._window, lo)
+        if state.scores.shape != shape:
+            state.baseline, state.scores = np.zeros(shape), np.zeros(shape)
+            first = self._window
+        baseline, scores = analytics.robust_scores(state.matrix, first, self._window)
+        state.baseline[:, first - self._window:] = baseline
+        state.scores[:, first - self._window:] = scores
+        return state
+
+    def _realign(self, state: _ScopeState | None, days: np.ndarray) -> _ScopeState:
+        """Move ``state`` onto the ``days`` axis, keeping the days both share."""
+
+        if state is not None and len(state.days) == len(days) and state.days[0] == days[0]:
+            return state
+        aligned = _ScopeState(days, self._window)
+        if state is None:
+            return aligned
+        shift = int((days[0] - state.days[0]).astype(np.int64))
+        aligned.groups, aligned.index = state.groups, state.index
+        aligned.matrix = self._shift(state.matrix, shift, len(days))
+        aligned.fetched = self._shift(state.fetched[None, :], shift, len(days), np.nan)[0]
+        if state.scores.shape[0] == len(state.groups):
+            # Scores start `window` days into the axis; shift them along with it
+            pad = np.zeros((len(state.groups), self._window))
+            aligned.baseline = self._shift(np.hstack((pad, state.baseline)), shift, len(days))[:, self._window:]
+            aligned.scores = self._shift(np.hstack((pad, state.scores)), shift, len(days))[:, self._window:]
+        return aligned
+
+    @staticmethod
+    def _shift(array: np.ndarray, shift: int, length: int, fill: float = 0.0) -> np.ndarray:
+        """Return ``array``'s columns moved left by ``shift`` into ``length`` columns."""
+
+        shifted = np.full((array.shape[0], length), fill)
+        src = slice(max(shift, 0), min(array.shape[1], shift + length))
+        if src.start < src.stop:
+            shifted[:, src.start - shift:src.stop - shift] = array[:, src]
+        return shifted
+
+    def _flagged(self, state: _ScopeState) -> list[dict]:
+        values = state.matrix[:, self._window:]
+        delta = values - state.baseline
+        rows, columns = np.nonzero(
+            (np.abs(state.scores) >= self._threshold) & (np.abs(delta) >= self._min_delta)
+        )
+        dates = analytics.from_days(state.days[self._window:])
+        return [
+            {
+                "date": int(dates[c]),
+                "group": state.groups[r],
+                "cost": round(float(values[r, c]), 2),
+                "expected": round(float(state.baseline[r, c]), 2),
+                "score": round(float(state.scores[r, c]), 2),
+                "direction": "spike" if delta[r, c] > 0 else "drop",
+            }
+            for r, c in zip(rows.tolist(), columns.tolist())
+        ]
+
+
+def _build_anomaly_detector() -> AnomalyDetector:
+    from config import ANOMALY_MAX_STATES, ANOMALY_MIN_DELTA, ANOMALY_THRESHOLD, ANOMALY_WINDOW_DAYS
+
+    return AnomalyDetector(ANOMALY_WINDOW_DAYS, ANOMALY_THRESHOLD, ANOMALY_MIN_DELTA, ANOMALY_MAX_STATES)
+
+
+anomaly_detector = _build_anomaly_detector()
@@ -0,0 +1,158 @@
+"""In-process TTL cache for Azure query results."""
+
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from backend.metrics import cache_requests
+
+
+class _Pending:
+    """An upstream call that other threads can wait on."""
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class QueryCache:
+    """Thread-safe TTL + LRU cache that coalesces concurrent identical lookups.
+
+    The first caller for a key runs ``compute``; callers arriving while it is
+    still running block on the same result instead of issuing their own call.
+    Failures are propagated to every waiter and never cached. Lookups are
+    counted as hits, misses or coalesced waits under ``name``.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, name: str = "query") -> None:
+        self._name = name
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[Hashable, _Pending] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(identity: str, scope: str, query: Any) -> tuple[str, str, str]:
+        """Build a cache key from the caller identity, scope and query body."""
+
+        body = json.dumps(query, sort_keys=True, separators=(",", ":"), default=str)
+        return identity, scope.lower(), body
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key``, computing it at most once."""
+
+        with self._lock:
+            hit = self._lookup(key)
+            if hit is not None:
+                cache_requests.inc(self._name, "hit")
+                return hit[1]
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight[key] = _Pending()
+        cache_requests.inc(self._name, "miss" if owner else "coalesced")
+
+        if not owner:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            pending.value = compute()
+        except BaseException as exc:
+            pending.error = exc
+            raise
+        else:
+            self.put(key, pending.value)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.event.set()
+        return pending.value
+
+    async def aget_or_compute(
+        self, key: Hashable, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Async counterpart of :meth:`get_or_compute`.
+
+        Coalesces with in-flight calls started by threads or other event loops.
+        """
+
+        with self._lock:
+            hit = self._lookup(key)
+            if hit is not None:
+                cache_requests.inc(self._name, "hit")
+                return hit[1]
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight[key] = _Pending()
+        cache_requests.inc(self._name, "miss" if owner else "coalesced")
+
+        if not owner:
+            await asyncio.get_running_loop().run_in_executor(None, pending.event.wait)
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            pending.value = await compute()
+        except BaseException as exc:
+            pending.error = exc
+            raise
+        else:
+            self.put(key, pending.value)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.event.set()
+        return pending.value
+
+    def peek(self, key: Hashable) -> Any:
+        """Return the cached value for ``key``, or ``None``, without computing it."""
+
+        with self._lock:
+            hit = self._lookup(key)
+        return None if hit is None else hit[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store ``value`` under ``key``, evicting the least recently used entries."""
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key: Hashable) -> tuple[float, Any] | None:
+        # Caller must hold self._lock
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+
+def _build_query_cache() -> QueryCache:
+    from config import COST_CACHE_MAX_ENTRIES, COST_CACHE_TTL_SECONDS
+
+    return QueryCache(ttl=COST_CACHE_TTL_SECONDS, max_entries=COST_CACHE_MAX_ENTRIES, name="cost_query")
+
+
+# Shared by every CostAnalyzer in this process
+query_cache = _build_query_cache()
@@ -0,0 +1,259 @@
+"""Long-lived Azure management clients shared across requests.
+
+Building an SDK client creates a new HTTP pipeline and, on first use, new TLS
+connections. The registry keeps one client per kind (and per subscription
+where the SDK requires it) on top of a single pooled ``requests`` session;
+:class:`AsyncClientRegistry` does the same for the async clients on one
+aiohttp session. The signed-in user's token is not baked into the client:
+each call passes its credential as a ``credential=`` keyword and
+:class:`PerCallTokenPolicy` turns it into the ``Authorization`` header.
+"""
+
+import asyncio
+import atexit
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, TypeVar
+
+import aiohttp
+import requests
+from azure.core.exceptions import ServiceRequestError
+from azure.core.pipeline import PipelineRequest, PipelineResponse
+from azure.core.pipeline.policies import AsyncHTTPPolicy, SansIOHTTPPolicy
+from azure.core.pipeline.transport import AioHttpTransport, RequestsTransport
+from azure.mgmt.costmanagement import CostManagementClient
+from azure.mgmt.costmanagement.aio import CostManagementClient as AsyncCostManagementClient
+from azure.mgmt.resource import ResourceManagementClient, SubscriptionClient
+from azure.mgmt.resource.resources.aio import ResourceManagementClient as AsyncResourceManagementClient
+from azure.mgmt.resource.subscriptions.aio import SubscriptionClient as AsyncSubscriptionClient
+
+from .credentials import get_flask_credential
+from .endpoints import is_loopback
+from .throttle import async_client_kwargs, client_kwargs
+
+# Scope of every ARM token, also for callers that snapshot one outside the request
+ARM_SCOPE = "https://management.azure.com/.default"
+
+
+class PerCallTokenPolicy(SansIOHTTPPolicy):
+    """Authorize each request with the credential supplied for that call.
+
+    Unlike :class:`~azure.core.pipeline.policies.BearerTokenCredentialPolicy`
+    nothing is cached on the policy, so a shared client never reuses one
+    user's token for another. Falls back to the Flask session credential.
+    Plain HTTP is only allowed to loopback hosts (a local stand-in for Azure).
+    """
+
+    def on_request(self, request: PipelineRequest) -> None:
+        url = request.http_request.url
+        if not url.lower().startswith("https") and not is_loopback(url):
+            raise ServiceRequestError("Bearer token authentication is not permitted for non-TLS URLs.")
+        context = request.context
+        if "credential" not in context:
+            # Stash on the context so retries of this request keep the same credential
+            context["credential"] = context.options.pop("credential", None) or get_flask_credential()
+        token = context["credential"].get_token(ARM_SCOPE)
+        request.http_request.headers["Authorization"] = f"Bearer {token.token}"
+
+
+class AsyncPerCallTokenPolicy(AsyncHTTPPolicy):
+    """Async counterpart of :class:`PerCallTokenPolicy` for the shared async clients.
+
+    Calls run on the registry's loop, outside any request, so the
+    credential must be passed explicitly; sync and async credentials both work.
+    """
+
+    async def send(self, request: PipelineRequest) -> PipelineResponse:
+        url = request.http_request.url
+        if not url.lower().startswith("https") and not is_loopback(url):
+            raise ServiceRequestError("Bearer token authentication is not permitted for non-TLS URLs.")
+        context = request.context
+        if "credential" not in context:
+            context["credential"] = context.options.pop("credential", None)
+        if context["credential"] is None:
+            raise ValueError("Shared async clients need a credential= keyword on every call")
+        token = context["credential"].get_token(ARM_SCOPE)
+        if inspect.isawaitable(token):
+            token = await token
+        request.http_request.headers["Authorization"] = f"Bearer {token.token}"
+        return await self.next.send(request)
+
+
+class ClientRegistry:
+    """Per-process cache of management clients sharing one connection pool."""
+
+    def __init__(self, max_idle: float, max_clients: int, pool_size: int) -> None:
+        self._max_idle = max_idle
+        self._max_clients = max_clients
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._clients: OrderedDict[tuple, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cost_management(self) -> CostManagementClient:
+        """Return the shared Cost Management client."""
+
+        return self._get(("cost",), lambda **kw: CostManagementClient(get_flask_credential(), **kw))
+
+    def subscriptions(self) -> SubscriptionClient:
+        """Return the shared subscription client."""
+
+        return self._get(("subscriptions",), lambda **kw: SubscriptionClient(get_flask_credential(), **kw))
+
+    def resource_management(self, subscription_id: str) -> ResourceManagementClient:
+        """Return the resource management client bound to ``subscription_id``."""
+
+        return self._get(
+            ("resources", subscription_id),
+            lambda **kw: ResourceManagementClient(get_flask_credential(), subscription_id, **kw),
+        )
+
+    def _get(self, key: tuple, factory: Callable[..., Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            self._close_idle(now)
+            entry = self._clients.get(key)
+            if entry is None:
+                client = factory(
+                    transport=RequestsTransport(session=self._session, session_owner=False),
+                    authentication_policy=PerCallTokenPolicy(),
+                    **client_kwargs(),
+                )
+            else:
+                client = entry[0]
+            self._clients[key] = (client, now)
+            self._clients.move_to_end(key)
+            while len(self._clients) > self._max_clients:
+                _, (evicted, _) = self._clients.popitem(last=False)
+                evicted.close()
+            return client
+
+    def _close_idle(self, now: float) -> None:
+        # Caller must hold self._lock; entries are ordered by last use
+        while self._clients:
+            key, (client, last_used) = next(iter(self._clients.items()))
+            if now - last_used < self._max_idle:
+                break
+            del self._clients[key]
+            client.close()
+
+    def close(self) -> None:
+        """Close every client and the shared connection pool."""
+
+        with self._lock:
+            for client, _ in self._clients.values():
+                client.close()
+            self._clients.clear()
+            self._session.close()
+
+
+T = TypeVar("T")
+
+# Never used: AsyncPerCallTokenPolicy replaces the SDK's bearer policy
+_NO_CREDENTIAL: Any = object()
+_ASYNC_FACTORIES: dict[str, Callable[..., Any]] = {
+    "cost": lambda **kw: AsyncCostManagementClient(_NO_CREDENTIAL, **kw),
+    "subscriptions": lambda **kw: AsyncSubscriptionClient(_NO_CREDENTIAL, **kw),
+    "resources": lambda subscription_id, **kw: AsyncResourceManagementClient(_NO_CREDENTIAL, subscription_id, **kw),
+}
+
+
+class AsyncClientRegistry:
+    """Async management clients shared by every request of the process.
+
+    aiohttp sessions belong to the event loop that created them, and Flask
+    runs each async view on a new loop, so the clients live on one
+    background loop and views hand each call to it with :meth:`call`. Only
+    I/O should run there; callers that would otherwise deserialize large
+    responses on that loop ask for the raw response and decode it themselves.
+    """
+
+    def __init__(self, max_clients: int, pool_size: int) -> None:
+        self._max_clients = max_clients
+        self._pool_size = pool_size
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._session: aiohttp.ClientSession | None = None
+        self._clients: OrderedDict[tuple, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def call(self, kind: str, operation: Callable[[Any], Awaitable[T]], *args: str) -> T:
+        """Await ``operation(client)`` on the shared loop with the ``kind`` client.
+
+        ``args`` are passed to the client's constructor (the subscription id
+        for ``"resources"``); each distinct set gets its own client.
+        """
+
+        future = asyncio.run_coroutine_threadsafe(self._run((kind, *args), operation), self._event_loop())
+        return await asyncio.wrap_future(future)
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="azure-aio-clients", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    async def _run(self, key: tuple, operation: Callable[[Any], Awaitable[T]]) -> T:
+        # Only ever runs on the shared loop, so the clients need no lock
+        client = self._clients.get(key)
+        if client is None:
+            if self._session is None:
+                connector = aiohttp.TCPConnector(limit=self._pool_size)
+                self._session = aiohttp.ClientSession(connector=connector)
+            kind, *args = key
+            client = self._clients[key] = _ASYNC_FACTORIES[kind](
+                *args,
+                transport=AioHttpTransport(session=self._session, session_owner=False),
+                authentication_policy=AsyncPerCallTokenPolicy(),
+                **async_client_kwargs(),
+            )
+        self._clients.move_to_end(key)
+        while len(self._clients) > self._max_clients:
+            _, evicted = self._clients.popitem(last=False)
+            await evicted.close()
+        return await operation(client)
+
+    async def _close_all(self) -> None:
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def close(self) -> None:
+        """Close every client and the shared connection pool, then stop the loop."""
+
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_all(), loop).result(timeout=5)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+
+
+def _build_client_registry() -> ClientRegistry:
+    from config import AZURE_CLIENT_MAX_IDLE_SECONDS, AZURE_CLIENT_POOL_SIZE, AZURE_MAX_CLIENTS
+
+    registry = ClientRegistry(AZURE_CLIENT_MAX_IDLE_SECONDS, AZURE_MAX_CLIENTS, AZURE_CLIENT_POOL_SIZE)
+    atexit.register(registry.close)
+    return registry
+
+
+def _build_async_client_registry() -> AsyncClientRegistry:
+    from config import AZURE_CLIENT_POOL_SIZE, AZURE_MAX_CLIENTS
+
+    registry = AsyncClientRegistry(AZURE_MAX_CLIENTS, AZURE_CLIENT_POOL_SIZE)
+    atexit.register(registry.close)
+    return registry
+
+
+clients = _build_client_registry()
+async_clients = _build_async_client_registry()
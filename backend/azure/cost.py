@@ -2,20 +2,189 @@
 
 import datetime as _dt
 from datetime import timezone
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
 
-from azure.mgmt.costmanagement import CostManagementClient
+import numpy as np
+from azure.core.credentials import TokenCredential
+from azure.core.rest import HttpRequest
+from azure.mgmt.costmanagement.models import QueryResult
 
-from .credentials import get_flask_credential
+from backend.metrics import cache_requests
+
+from . import analytics
+from .anomalies import anomaly_detector
+from .cache import QueryCache, query_cache
+from .clients import clients
+from .credentials import current_identity, get_flask_credential
+from .frame import CostFrame, parse_costs
+from .inventory import ResourceIndex, resource_group_of
+from .rollup import rollup_cube
+from .store import cost_store
+from .throttle import PRIORITY_INTERACTIVE
+
+
+# Dimensions accepted by CostAnalyzer.query_costs, besides "tag:<name>"
+QUERY_DIMENSIONS = ("ResourceGroupName", "ServiceName", "MeterCategory", "ResourceLocation")
+QUERY_GRANULARITIES = ("Daily", "Monthly")
+# CostAnalyzer.iter_export_frames also streams resource-level rows
+EXPORT_DIMENSIONS = (*QUERY_DIMENSIONS, "ResourceId")
+
+
+def previous_month() -> tuple[_dt.date, _dt.date]:
+    """Return the first and last day of the previous calendar month."""
+
+    today: _dt.date = _dt.date.today().replace(day=1)
+    end: _dt.date = today - _dt.timedelta(days=1)
+    return end.replace(day=1), end
+
+
+def trailing_months(months: int, today: _dt.date | None = None) -> tuple[_dt.date, _dt.date]:
+    """Return [start, end] covering the last ``months`` calendar months up to yesterday."""
+
+    end = (today or _dt.date.today()) - _dt.timedelta(days=1)
+    month_index = end.year * 12 + end.month - 1 - (months - 1)
+    return _dt.date(month_index // 12, month_index % 12 + 1, 1), end
+
+
+def _month_chunks(start: _dt.date, end: _dt.date) -> Iterable[tuple[_dt.date, _dt.date]]:
+    """Split [start, end] at calendar month boundaries."""
+
+    while start <= end:
+        next_month = (start.replace(day=28) + _dt.timedelta(days=4)).replace(day=1)
+        chunk_end = min(end, next_month - _dt.timedelta(days=1))
+        yield start, chunk_end
+        start = chunk_end + _dt.timedelta(days=1)
 
 
 class CostAnalyzer:
     """Retrieve cost details for a subscription."""
 
-    def __init__(self, subscription_id: str) -> None:
-        credential = get_flask_credential()
-        self._client = CostManagementClient(credential)
+    def __init__(
+        self,
+        subscription_id: str,
+        credential: TokenCredential | None = None,
+        priority: str = PRIORITY_INTERACTIVE,
+    ) -> None:
+        self._credential = credential or get_flask_credential()
+        self._priority = priority
+        self._client = clients.cost_management()
+        self._subscription_id = subscription_id
         self._scope = f"subscriptions/{subscription_id}"
+        self._identity = current_identity()
+
+    @staticmethod
+    def _grouping_spec(name: str) -> dict:
+        """Map a dimension name, or ``tag:<name>``, to a Cost Management grouping."""
+
+        if name.startswith("tag:"):
+            return {"type": "TagKey", "name": name[4:]}
+        return {"type": "Dimension", "name": name}
+
+    @staticmethod
+    def _usage_query(
+        start: _dt.date,
+        end: _dt.date,
+        grouping: list[dict] | None = None,
+        granularity: str | None = "Daily",
+    ) -> dict[str, object]:
+        """Build a usage query covering [start, end] (one total per group if ``granularity`` is None)."""
+
+        # Convert to datetime with timezone for proper ISO format
+        start_dt = _dt.datetime.combine(start, _dt.time.min, tzinfo=timezone.utc)
+        end_dt = _dt.datetime.combine(end, _dt.time.max, tzinfo=timezone.utc)
+
+        dataset: dict[str, object] = {
+            "aggregation": {"totalCost": {"name": "Cost", "function": "Sum"}},
+        }
+        if granularity:
+            dataset["granularity"] = granularity
+        if grouping:
+            dataset["grouping"] = grouping
+
+        return {
+            "type": "Usage",
+            "timeframe": "Custom",
+            "timePeriod": {"from": start_dt.isoformat(), "to": end_dt.isoformat()},
+            "dataset": dataset,
+        }
+
+    def _usage(self, query: dict[str, object]) -> Any:
+        """Run a usage query, sharing results and in-flight calls across requests."""
+
+        key = QueryCache.make_key(self._identity, self._scope, query)
+        return query_cache.get_or_compute(key, lambda: self._merge_pages(self._pages(query)))
+
+    def _pages(self, query: dict[str, object]) -> Iterator[QueryResult]:
+        """Yield every page of a usage query, following ``nextLink``."""
+
+        result = self._client.query.usage(
+            scope=self._scope, parameters=query, credential=self._credential, priority=self._priority
+        )
+        yield result
+        while result.next_link:
+            response = self._client.send_request(
+                HttpRequest("POST", result.next_link, json=query),
+                credential=self._credential,
+                priority=self._priority,
+            )
+            response.raise_for_status()
+            result = self._page_result(response.json())
+            yield result
+
+    @classmethod
+    def _merge_pages(cls, pages: Iterable[QueryResult]) -> QueryResult:
+        pages = iter(pages)
+        merged = next(pages)
+        rows = list(cls._result_rows(merged))
+        for page in pages:
+            rows.extend(cls._result_rows(page))
+        if merged.get("properties") is not None:
+            merged["properties"]["rows"] = rows
+        else:
+            merged.rows = rows
+        merged.next_link = None
+        return merged
+
+    @staticmethod
+    def _page_result(body: dict) -> QueryResult:
+        """Wrap a raw result page, handing its rows over without converting each cell."""
+
+        properties = body.get("properties") or {}
+        rows = properties.pop("rows", None)
+        result = QueryResult(body)
+        if rows is not None:
+            result["properties"]["rows"] = rows
+        return result
+
+    @staticmethod
+    def _result_rows(result: Any) -> list:
+        """Return the raw row lists of a query result.
+
+        Going through ``result.rows`` converts every cell with the SDK's
+        model layer, which dominates the cost of large results; the model's
+        mapping interface hands back the decoded JSON as is.
+        """
+
+        properties = result.get("properties") if hasattr(result, "get") else None
+        if properties is None:
+            return getattr(result, "rows", None) or []
+        return properties.get("rows") or []
+
+    def check_access(self) -> None:
+        """Confirm the signed-in user can read the subscription.
+
+        Stored rows are shared between users, so a read that is served
+        entirely from the store still has to prove access with a cheap ARM
+        call (cached per user like any other query).
+        """
+
+        key = QueryCache.make_key(self._identity, self._scope, "access")
+        query_cache.get_or_compute(
+            key,
+            lambda: clients.subscriptions().subscriptions.get(
+                self._subscription_id, credential=self._credential, priority=self._priority
+            ),
+        )
 
     @staticmethod
     def _column_names(result: Any) -> list[str]:
@@ -28,7 +197,7 @@ class CostAnalyzer:
     @staticmethod
     def _find_date_key(result: Any, names: list[str]) -> str:
         # Prefer explicit known names
-        for key in ("UsageDate", "Date", "UsageDateTime", "BillingDate"):
+        for key in ("UsageDate", "Date", "UsageDateTime", "BillingDate", "BillingMonth"):
             if key in names:
                 return key
         # Try to find by column type if available
@@ -49,103 +218,449 @@ class CostAnalyzer:
         # Fallback to last column
         return names[-1] if names else "Cost"
 
-    def actual_cost_last_month(self) -> list[dict]:
-        """Return daily cost data for the previous month, normalized to keys UsageDate and Cost."""
+    @staticmethod
+    def _find_group_key(names: list[str], grouping: str) -> str | None:
+        if grouping in names:
+            return grouping
+        if grouping == "ResourceGroupName" and "ResourceGroup" in names:
+            return "ResourceGroup"
+        if grouping.startswith("tag:") and "TagValue" in names:
+            return "TagValue"
+        return None
 
-        today: _dt.date = _dt.date.today().replace(day=1)
-        start: _dt.date = (today - _dt.timedelta(days=1)).replace(day=1)
-        end: _dt.date = today - _dt.timedelta(days=1)
+    def _normalize(self, result: Any, group_by: list[str]) -> CostFrame:
+        """Turn a query result into a :class:`CostFrame` with one group column per ``group_by``."""
 
-        # Convert to datetime with timezone for proper ISO format
-        start_dt = _dt.datetime.combine(start, _dt.time.min, tzinfo=timezone.utc)
-        end_dt = _dt.datetime.combine(end, _dt.time.max, tzinfo=timezone.utc)
+        names = self._column_names(result)
+        return CostFrame.from_columns(
+            names,
+            self._result_rows(result),
+            self._find_date_key(result, names),
+            self._find_cost_key(names),
+            {g: self._find_group_key(names, g) for g in group_by},
+        )
 
-        query: dict[str, object] = {
-            "type": "Usage",
-            "timeframe": "Custom",
-            "timePeriod": {
-                "from": start_dt.isoformat(),
-                "to": end_dt.isoformat(),
-            },
-            "dataset": {
-                "granularity": "Daily",
-                "aggregation": {"totalCost": {"name": "Cost", "function": "Sum"}},
-            },
+    def daily_costs(self, start: _dt.date, end: _dt.date, grouping: str = "") -> CostFrame:
+        """Return stored daily costs for [start, end] (group column ``"group"``).
+
+        Only days that are missing from the local store, or still within the
+        unsettled tail, are fetched from Cost Management.
+        """
+
+        self.ensure_stored(start, end, grouping)
+        return CostFrame.from_rows(cost_store.rows(self._scope, grouping, start, end))
+
+    def ensure_stored(self, start: _dt.date, end: _dt.date, grouping: str = "") -> None:
+        """Fetch the days of [start, end] the local store is missing or holds stale."""
+
+        stale = cost_store.stale_ranges(self._scope, grouping, start, end)
+        cache_requests.inc("cost_store", "miss" if stale else "hit")
+        if not stale:
+            self.check_access()
+        group_spec = [self._grouping_spec(grouping)] if grouping else None
+        for lo, hi in stale:
+            for chunk_start, chunk_end in _month_chunks(lo, hi):
+                result = self._usage(self._usage_query(chunk_start, chunk_end, group_spec))
+                self._store_chunk(grouping, chunk_start, chunk_end, result)
+
+    def group_totals(self, start: _dt.date, end: _dt.date, grouping: str) -> dict[str, float]:
+        """Return total cost per ``grouping`` value over [start, end] from the rollup cube."""
+
+        self.ensure_stored(start, end, grouping)
+        return rollup_cube.totals(self._scope, grouping, start, end)
+
+    def cost_rollup(self, start: _dt.date, end: _dt.date, grouping: str, top: int = 10) -> dict:
+        """Return the ``top`` most expensive ``grouping`` values over [start, end] and the rest."""
+
+        self.ensure_stored(start, end, grouping)
+        return self._rollup(start, end, grouping, top)
+
+    def _rollup(self, start: _dt.date, end: _dt.date, grouping: str, top: int) -> dict:
+        rollup = rollup_cube.top(self._scope, grouping, start, end, top)
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "group_by": grouping,
+            "total_cost": round(rollup["total"], 2),
+            "group_count": rollup["group_count"],
+            "groups": [{"group": group, "cost": round(cost, 2)} for group, cost in rollup["groups"]],
+            "other_cost": round(rollup["other"], 2),
         }
 
-        result = self._client.query.usage(scope=self._scope, parameters=query)
-        names = self._column_names(result)
-        date_key = self._find_date_key(result, names)
-        cost_key = self._find_cost_key(names)
-        idx_date = names.index(date_key)
-        idx_cost = names.index(cost_key)
-
-        normalized: list[dict] = []
-        for row in result.rows:
-            try:
-                normalized.append({
-                    "UsageDate": row[idx_date],
-                    "Cost": float(row[idx_cost] or 0),
-                })
-            except Exception:
-                # Best-effort fallback using pairwise mapping
-                row_map = {names[i]: row[i] for i in range(min(len(names), len(row)))}
-                normalized.append({
-                    "UsageDate": row_map.get(date_key),
-                    "Cost": float(row_map.get(cost_key) or 0),
-                })
-        return normalized
+    def _store_chunk(self, grouping: str, start: _dt.date, end: _dt.date, result: Any) -> None:
+        frame = self._normalize(result, [grouping] if grouping else [])
+        cost_store.replace(self._scope, grouping, start, end, frame.rows(grouping))
+
+    def query_costs(
+        self,
+        start: _dt.date,
+        end: _dt.date,
+        granularity: str = "Daily",
+        group_by: list[str] | None = None,
+    ) -> list[dict]:
+        """Return cost series for [start, end], aggregated by Cost Management.
+
+        Each series is one combination of ``group_by`` values with its total
+        and ``{"date", "cost"}`` points, ordered by total cost descending.
+        """
+
+        group_by = group_by or []
+        query = self._usage_query(
+            start, end, [self._grouping_spec(g) for g in group_by] or None, granularity
+        )
+        return self._series(self._normalize(self._usage(query), group_by), group_by)
+
+    def iter_query_frames(
+        self,
+        start: _dt.date,
+        end: _dt.date,
+        granularity: str = "Daily",
+        group_by: list[str] | None = None,
+    ) -> Iterator[CostFrame]:
+        """Yield un-aggregated query rows one page at a time, bypassing the cache.
+
+        Lets callers stream large results without holding every page in memory.
+        """
+
+        group_by = group_by or []
+        query = self._usage_query(
+            start, end, [self._grouping_spec(g) for g in group_by] or None, granularity
+        )
+        for page in self._pages(query):
+            yield self._normalize(page, group_by)
+
+    def iter_export_frames(
+        self,
+        start: _dt.date,
+        end: _dt.date,
+        granularity: str = "Daily",
+        group_by: list[str] | None = None,
+        batch_rows: int = 10000,
+    ) -> Iterator[CostFrame]:
+        """Yield cost rows for [start, end] in bounded batches, one month at a time.
+
+        Daily totals and daily resource group costs are read from the local
+        store (fetching only what it is missing); anything else streams the
+        query pages of each month uncached.
+        """
+
+        group_by = group_by or []
+        stored = granularity == "Daily" and group_by in ([], ["ResourceGroupName"])
+        grouping = group_by[0] if group_by else ""
+        for chunk_start, chunk_end in _month_chunks(start, end):
+            if not stored:
+                yield from self.iter_query_frames(chunk_start, chunk_end, granularity, group_by)
+                continue
+            self.ensure_stored(chunk_start, chunk_end, grouping)
+            for rows in cost_store.iter_rows(self._scope, grouping, chunk_start, chunk_end, batch_rows):
+                frame = CostFrame.from_rows(rows, grouping or "group")
+                yield frame if grouping else CostFrame(frame.dates, frame.costs)
+
+    @staticmethod
+    def _series(frame: CostFrame, group_by: list[str]) -> list[dict]:
+        if len(frame) == 0:
+            return []
+        codes, keys = frame.group_codes(group_by)
+        totals = np.bincount(codes, weights=frame.costs, minlength=len(keys))
+        # Sort rows by (series, date) once, then slice each series out
+        order = np.lexsort((frame.dates, codes))
+        bounds = np.searchsorted(codes[order], np.arange(len(keys) + 1))
+        dates = frame.dates[order].tolist()
+        costs = frame.costs[order].tolist()
+
+        series = []
+        for index in np.argsort(-totals, kind="stable").tolist():
+            lo, hi = bounds[index], bounds[index + 1]
+            series.append({
+                "group": dict(zip(group_by, keys[index])),
+                "total": round(float(totals[index]), 2),
+                "points": [
+                    {"date": d, "cost": c} for d, c in zip(dates[lo:hi], costs[lo:hi])
+                ],
+            })
+        return series
+
+    def actual_cost_last_month(self) -> list[dict]:
+        """Return daily cost data for the previous month, normalized to keys UsageDate and Cost."""
+
+        start, end = previous_month()
+        return self._daily_records(self.daily_costs(start, end))
+
+    @staticmethod
+    def _daily_records(frame: CostFrame) -> list[dict]:
+        return frame.records("UsageDate", "Cost")
 
     def cost_per_resource_group(self) -> list[dict]:
         """Return cost by resource group aggregated daily for the previous month.
         Normalized to keys: date, resource_group, cost.
         """
 
-        today: _dt.date = _dt.date.today().replace(day=1)
-        start: _dt.date = (today - _dt.timedelta(days=1)).replace(day=1)
-        end: _dt.date = today - _dt.timedelta(days=1)
+        start, end = previous_month()
+        return self._resource_group_records(self.daily_costs(start, end, "ResourceGroupName"))
 
-        # Convert to datetime with timezone for proper ISO format
-        start_dt = _dt.datetime.combine(start, _dt.time.min, tzinfo=timezone.utc)
-        end_dt = _dt.datetime.combine(end, _dt.time.max, tzinfo=timezone.utc)
+    @staticmethod
+    def _resource_group_records(frame: CostFrame) -> list[dict]:
+        return frame.records("date", "cost", {"group": "resource_group"})
 
-        query: dict[str, object] = {
-            "type": "Usage",
-            "timeframe": "Custom",
-            "timePeriod": {"from": start_dt.isoformat(), "to": end_dt.isoformat()},
-            "dataset": {
-                "granularity": "Daily",
-                "aggregation": {"totalCost": {"name": "Cost", "function": "Sum"}},
-                "grouping": [{"type": "Dimension", "name": "ResourceGroupName"}],
-            },
+    def daily_cost_columns(self) -> dict:
+        """Like :meth:`actual_cost_last_month`, as one cost array over the month's days."""
+
+        start, end = previous_month()
+        return self._daily_columns(self.daily_costs(start, end), start, end)
+
+    @staticmethod
+    def _daily_columns(frame: CostFrame, start: _dt.date, end: _dt.date) -> dict:
+        days, totals = analytics.daily_totals(frame, start, end)
+        return {"dates": days.astype(str).tolist(), "costs": totals.tolist()}
+
+    def resource_group_cost_columns(self) -> dict:
+        """Like :meth:`cost_per_resource_group`, as one daily cost array per resource group."""
+
+        start, end = previous_month()
+        return self._resource_group_columns(self.daily_costs(start, end, "ResourceGroupName"), start, end)
+
+    @staticmethod
+    def _resource_group_columns(frame: CostFrame, start: _dt.date, end: _dt.date) -> dict:
+        """Return every day in [start, end], the groups (most expensive first) and their daily costs.
+
+        ``costs[i][j]`` is the cost of ``groups[i]`` on ``dates[j]``, zero
+        where nothing was billed.
+        """
+
+        days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+        groups: list[str] = []
+        costs: list[list[float]] = []
+        if len(frame):
+            codes, keys = frame.group_codes(["group"])
+            offsets = (analytics.to_days(frame.dates) - days[0]).astype(np.int64)
+            grid = np.bincount(
+                codes * len(days) + offsets, weights=frame.costs, minlength=len(keys) * len(days)
+            ).reshape(len(keys), len(days))
+            order = np.argsort(-grid.sum(axis=1), kind="stable")
+            groups = [keys[i][0] for i in order.tolist()]
+            costs = grid[order].tolist()
+        return {"dates": days.astype(str).tolist(), "groups": groups, "costs": costs}
+
+    def cost_summary(self) -> dict:
+        """Return total, average daily and per-resource-group cost for the previous month."""
+
+        start, end = previous_month()
+        return self._summarize(
+            self.daily_costs(start, end), self.group_totals(start, end, "ResourceGroupName")
+        )
+
+    def cost_trend(self, months: int = 12, window: int = 7) -> dict:
+        """Return monthly totals with month-over-month change and a rolling daily average."""
+
+        start, end = trailing_months(months)
+        return self._trend(self.daily_costs(start, end), start, end, window)
+
+    @staticmethod
+    def _trend(frame: CostFrame, start: _dt.date, end: _dt.date, window: int) -> dict:
+        days, costs = analytics.daily_totals(frame, start, end)
+        rolling = analytics.rolling_mean(costs, window)
+        months, totals = analytics.monthly_totals(days, costs)
+        change, change_pct = analytics.month_over_month(totals)
+        partial_month = np.datetime64(end, "M") if (end + _dt.timedelta(days=1)).day != 1 else None
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "window": window,
+            "months": [
+                {
+                    "month": str(month),
+                    "cost": round(total, 2),
+                    "change": None if np.isnan(delta) else round(delta, 2),
+                    "change_pct": None if np.isnan(pct) else round(pct, 1),
+                    "partial": bool(partial_month is not None and month == partial_month),
+                }
+                for month, total, delta, pct in zip(
+                    months, totals.tolist(), change.tolist(), change_pct.tolist()
+                )
+            ],
+            "daily": [
+                {"date": d, "cost": round(c, 2), "rolling_avg": round(r, 2)}
+                for d, c, r in zip(analytics.from_days(days).tolist(), costs.tolist(), rolling.tolist())
+            ],
         }
 
-        result = self._client.query.usage(scope=self._scope, parameters=query)
+    def cost_forecast(self, method: str = "seasonal", history_days: int = 90) -> dict:
+        """Return month-to-date cost and its projection to the end of the current month."""
+
+        today = _dt.date.today()
+        start = today - _dt.timedelta(days=history_days)
+        end = today - _dt.timedelta(days=1)
+        return self._forecast(self.daily_costs(start, end), start, today, method)
+
+    @staticmethod
+    def _forecast(frame: CostFrame, start: _dt.date, today: _dt.date, method: str) -> dict:
+        days, costs = analytics.daily_totals(frame, start, today - _dt.timedelta(days=1))
+        month_start = today.replace(day=1)
+        month_end = (month_start + _dt.timedelta(days=32)).replace(day=1) - _dt.timedelta(days=1)
+        future = np.arange(np.datetime64(today, "D"), np.datetime64(month_end, "D") + 1)
+        projected = analytics.project(days, costs, future, method)
+
+        actual = float(costs[days >= np.datetime64(month_start, "D")].sum())
+        previous = days.astype("datetime64[M]") == np.datetime64(month_start, "M") - 1
+        previous_total = float(costs[previous].sum()) if previous.any() else None
+        forecast_total = actual + float(projected.sum())
+        return {
+            "month": month_start.strftime("%Y-%m"),
+            "method": method,
+            "actual_to_date": round(actual, 2),
+            "forecast_remaining": round(float(projected.sum()), 2),
+            "forecast_total": round(forecast_total, 2),
+            "previous_month_total": None if previous_total is None else round(previous_total, 2),
+            "change_pct": (
+                round((forecast_total - previous_total) / previous_total * 100, 1)
+                if previous_total else None
+            ),
+            "daily": [
+                {"date": d, "cost": round(c, 2)}
+                for d, c in zip(analytics.from_days(future).tolist(), projected.tolist())
+            ],
+        }
+
+    def cost_anomalies(self, days: int = 30) -> list[dict]:
+        """Return resource group days in the last ``days`` that break from their trailing baseline."""
+
+        start, end = self._anomaly_range(days)
+        self.ensure_stored(start - _dt.timedelta(days=anomaly_detector.window), end, "ResourceGroupName")
+        return self._anomaly_records(start, end)
+
+    @staticmethod
+    def _anomaly_range(days: int) -> tuple[_dt.date, _dt.date]:
+        end = _dt.date.today() - _dt.timedelta(days=1)
+        return end - _dt.timedelta(days=days - 1), end
+
+    def _anomaly_records(self, start: _dt.date, end: _dt.date) -> list[dict]:
+        anomalies = anomaly_detector.detect(self._scope, "ResourceGroupName", start, end)
+        for anomaly in anomalies:
+            anomaly["subscription_id"] = self._subscription_id
+            anomaly["resource_group"] = anomaly.pop("group")
+        return anomalies
+
+    def resource_costs(self, start: _dt.date, end: _dt.date) -> tuple[np.ndarray, np.ndarray]:
+        """Return lower-cased resource ids and their total cost over [start, end]."""
+
+        result = self._usage(self._usage_query(start, end, [self._grouping_spec("ResourceId")], None))
         names = self._column_names(result)
-        date_key = self._find_date_key(result, names)
-        cost_key = self._find_cost_key(names)
-        rg_key = "ResourceGroupName" if "ResourceGroupName" in names else ("ResourceGroup" if "ResourceGroup" in names else None)
-
-        # Build indices where possible
-        idx_date = names.index(date_key)
-        idx_cost = names.index(cost_key)
-        idx_rg = names.index(rg_key) if rg_key else None
-
-        output: list[dict] = []
-        for row in result.rows:
-            try:
-                resource_group_value = row[idx_rg] if idx_rg is not None else None
-                output.append({
-                    "date": row[idx_date],
-                    "resource_group": resource_group_value or "Unknown",
-                    "cost": float(row[idx_cost] or 0),
+        id_key = self._find_group_key(names, "ResourceId")
+        rows = self._result_rows(result)
+        if not rows or id_key is None:
+            return np.empty(0, dtype=str), np.empty(0)
+        columns = list(zip(*rows))
+        ids = np.char.lower(np.asarray([i or "" for i in columns[names.index(id_key)]], dtype=str))
+        # One row per resource and currency: fold them together
+        unique, inverse = np.unique(ids, return_inverse=True)
+        costs = np.bincount(inverse, weights=parse_costs(columns[names.index(self._find_cost_key(names))]))
+        return unique, costs
+
+    @staticmethod
+    def resource_page(
+        ids: np.ndarray,
+        costs: np.ndarray,
+        index: ResourceIndex,
+        resource_group: str | None = None,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> dict:
+        """Join resource costs with the inventory and return one page, most expensive first."""
+
+        if resource_group and len(ids):
+            keep = np.char.find(ids, f"/resourcegroups/{resource_group.lower()}/") >= 0
+            ids, costs = ids[keep], costs[keep]
+        # Only the rows up to the end of the page are sorted, and only the page
+        # is joined. Ties at the cut are all kept, so pages match a full stable sort
+        end = offset + limit
+        if 0 < end < len(costs):
+            cut = -np.partition(-costs, end - 1)[end - 1]
+            candidates = np.flatnonzero(costs >= cut)
+        else:
+            candidates = np.arange(len(costs))
+        order = candidates[np.argsort(-costs[candidates], kind="stable")][offset:end]
+        page_ids = ids[order].tolist()
+        positions = index.positions(page_ids)
+
+        resources = []
+        for resource_id, cost, i in zip(page_ids, costs[order].tolist(), positions.tolist()):
+            if i >= 0:
+                resources.append({
+                    "id": index.ids[i],
+                    "name": index.names[i],
+                    "type": index.types[i],
+                    "location": index.locations[i],
+                    "resource_group": index.resource_groups[i],
+                    "cost": round(cost, 2),
+                    "in_inventory": True,
                 })
-            except Exception:
-                row_map = {names[i]: row[i] for i in range(min(len(names), len(row)))}
-                output.append({
-                    "date": row_map.get(date_key),
-                    "resource_group": row_map.get(rg_key) or "Unknown",
-                    "cost": float(row_map.get(cost_key) or 0),
+            else:
+                # Deleted since it was billed, or not visible to this user
+                resources.append({
+                    "id": resource_id,
+                    "name": resource_id.rsplit("/", 1)[-1] or None,
+                    "type": None,
+                    "location": None,
+                    "resource_group": resource_group_of(resource_id),
+                    "cost": round(cost, 2),
+                    "in_inventory": False,
                 })
-        return output
+        return {
+            "total_cost": round(float(costs.sum()), 2),
+            "resource_count": len(ids),
+            "offset": offset,
+            "limit": limit,
+            "resources": resources,
+        }
+
+    def dashboard_panels(self, columnar: bool = False) -> dict:
+        """Return every cost panel of the dashboard from one daily and one grouped query.
 
+        With ``columnar`` the chart panels are parallel arrays instead of one
+        dict per row (see :meth:`_panels`).
+        """
+
+        start, end = previous_month()
+        return self._panels(
+            self.daily_costs(start, end),
+            self.group_totals(start, end, "ResourceGroupName"),
+            start,
+            end,
+            columnar,
+        )
+
+    @classmethod
+    def _panels(
+        cls,
+        daily: CostFrame,
+        resource_groups: dict[str, float],
+        start: _dt.date,
+        end: _dt.date,
+        columnar: bool = False,
+    ) -> dict:
+        ranked = sorted(resource_groups.items(), key=lambda item: item[1], reverse=True)
+        if columnar:
+            names, totals = zip(*ranked) if ranked else ((), ())
+            return {
+                "summary": cls._summarize(daily, resource_groups),
+                "daily_costs": cls._daily_columns(daily, start, end),
+                "resource_group_costs": {"groups": list(names), "costs": list(totals)},
+            }
+        return {
+            "summary": cls._summarize(daily, resource_groups),
+            "daily_costs": cls._daily_records(daily),
+            "resource_group_costs": [{"resource_group": name, "cost": cost} for name, cost in ranked],
+        }
+
+    @staticmethod
+    def _summarize(daily: CostFrame, resource_groups: dict[str, float]) -> dict:
+        total_cost = daily.total()
+        avg_daily_cost = total_cost / len(daily) if len(daily) else 0
+
+        return {
+            "total_cost": round(total_cost, 2),
+            "avg_daily_cost": round(avg_daily_cost, 2),
+            "period_days": len(daily),
+            "resource_groups": resource_groups,
+            "daily_costs": daily.records("UsageDate", "Cost")[:10]  # Last 10 days for chart
+        }
@@ -1,9 +1,14 @@
 """Credential helpers for Azure SDK integration with Flask sessions."""
 
-from flask import session
+import threading
+import time
+from flask import has_request_context, session
 from typing import Sequence
 from azure.core.credentials import AccessToken, TokenCredential
 
+# Renew tokens this many seconds before they expire
+_REFRESH_MARGIN = 300
+
 
 class FlaskSessionCredential(TokenCredential):
     """A simple :class:`~azure.core.credentials.TokenCredential` using Flask session."""
@@ -14,15 +19,108 @@ class FlaskSessionCredential(TokenCredential):
     def get_token(self, *scopes: str, **kwargs: object) -> AccessToken:  # type: ignore[override]
         """Return the :class:`~azure.core.credentials.AccessToken` stored in session."""
 
+        if session.get("token_expires", 0) - time.time() < _REFRESH_MARGIN:
+            refresh_session_token()
+
         token: str | None = session.get("access_token")
         expires_at: int | None = session.get("token_expires")
 
-        if token is None or expires_at is None:
+        if token is None or expires_at is None or expires_at <= time.time():
             raise RuntimeError("User is not authenticated")
 
         return AccessToken(token, expires_at)
 
 
+def refresh_session_token() -> None:
+    """Renew the session's access token from the server-side MSAL cache.
+
+    Leaves the session untouched when there is no cached account or the
+    refresh token has been revoked; callers then see the old expiry.
+    """
+
+    from backend.auth.token_cache import acquire_token_silent
+
+    account_id: str | None = session.get("account_id")
+    if not account_id:
+        return
+    result = acquire_token_silent(account_id)
+    if result and "access_token" in result:
+        session["access_token"] = result["access_token"]
+        session["token_expires"] = int(time.time()) + int(result.get("expires_in", 3600))
+
+
+class ServicePrincipalCredential(TokenCredential):
+    """App-only credential (client credentials flow) for work done outside a request.
+
+    Uses the app registration's own client id and secret, so the service
+    principal needs read access (e.g. Cost Management Reader) on every
+    subscription it is asked to query.
+    """
+
+    def __init__(self) -> None:
+        self._app = None
+        self._lock = threading.Lock()
+
+    def get_token(self, *scopes: str, **kwargs: object) -> AccessToken:  # type: ignore[override]
+        import msal
+        from backend.auth.token_cache import observe_token
+        from config import AUTHORITY, CLIENT_ID, CLIENT_SECRET
+
+        started = time.perf_counter()
+        with self._lock:
+            if self._app is None:
+                self._app = msal.ConfidentialClientApplication(
+                    CLIENT_ID, authority=AUTHORITY, client_credential=CLIENT_SECRET
+                )
+            # MSAL serves the token from its in-memory cache until it nears expiry
+            result = self._app.acquire_token_for_client(list(scopes))
+        observe_token("client_credentials", started, result)
+        if "access_token" not in result:
+            raise RuntimeError(f"Service principal sign-in failed: {result.get('error_description')}")
+        return AccessToken(result["access_token"], int(time.time()) + int(result.get("expires_in", 3600)))
+
+
+class StaticTokenCredential(TokenCredential):
+    """A credential that always returns one already acquired token.
+
+    Lets work that outlives a request (e.g. a background refresh) act as the
+    user who triggered it, for as long as that token is valid.
+    """
+
+    def __init__(self, token: AccessToken) -> None:
+        self._token = token
+
+    def get_token(self, *scopes: str, **kwargs: object) -> AccessToken:  # type: ignore[override]
+        if self._token.expires_on <= time.time():
+            raise RuntimeError("Access token has expired")
+        return self._token
+
+
+def static_token() -> str | None:
+    """Return ``AZURE_STATIC_TOKEN`` if the management endpoint is a local stand-in."""
+
+    from config import AZURE_MANAGEMENT_URL, AZURE_STATIC_TOKEN
+
+    from .endpoints import is_loopback
+
+    if AZURE_STATIC_TOKEN and is_loopback(AZURE_MANAGEMENT_URL):
+        return AZURE_STATIC_TOKEN
+    return None
+
+
+def app_credential() -> TokenCredential:
+    """Return the credential background work runs as.
+
+    That is the service principal, or the static token when running
+    against a local stand-in, so no MSAL sign-in is attempted offline.
+    """
+
+    token = static_token()
+    if token is not None:
+        return StaticTokenCredential(AccessToken(token, int(time.time()) + 86400 * 365))
+    return ServicePrincipalCredential()
+
+
 def get_flask_credential() -> FlaskSessionCredential:
     """Create a :class:`FlaskSessionCredential` from the current session."""
 
@@ -30,3 +128,18 @@ def get_flask_credential() -> FlaskSessionCredential:
 
     return FlaskSessionCredential(SCOPE)
 
+
+def current_identity() -> str:
+    """Return a stable identifier for the signed-in user, used to partition caches.
+
+    Outside a request (background jobs) the caller is the app itself.
+    """
+
+    if not has_request_context():
+        from config import CLIENT_ID
+
+        return f"app:{CLIENT_ID}"
+    claims = session.get("user") or {}
+    tenant = claims.get("tid", "")
+    user = claims.get("oid") or claims.get("preferred_username") or claims.get("sub", "")
+    return f"{tenant}:{user}"
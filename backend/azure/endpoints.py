@@ -0,0 +1,11 @@
+"""Where management requests go: Azure, or a local stand-in for offline runs."""
+
+from urllib.parse import urlsplit
+
+_LOOPBACK_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+def is_loopback(url: str) -> bool:
+    """Return whether ``url`` points at this machine."""
+
+    return urlsplit(url).hostname in _LOOPBACK_HOSTS
@@ -0,0 +1,582 @@
+"""Ingest Cost Management Exports (usage CSV) into the local cost store.
+
+Scheduled exports cover far larger scopes than the Query API can serve
+within its throttling limits. Each export run (the CSV files of one
+directory, or one blob "folder") is read in a single streaming pass:
+plain files are memory-mapped and decoded in blocks, gzip files and blobs
+are streamed, and rows are parsed in chunks of ``COST_EXPORT_CHUNK_ROWS``
+whose daily totals per subscription, resource group, service and tag are
+folded into running sums with NumPy. The totals then replace the stored
+days they cover, exactly as if they had come from the Query API::
+
+    python -m backend.azure.exports /mnt/exports/daily
+    python -m backend.azure.exports "https://<account>.blob.core.windows.net/<container>/<prefix>?<sas>"
+
+Runs whose files have not changed since they were last ingested are
+skipped unless ``--force`` is given. Blob URLs without a SAS token are read
+with the app's credential, which then needs Storage Blob Data Reader.
+"""
+
+import argparse
+import codecs
+import csv
+import gzip
+import hashlib
+import io
+import json
+import logging
+import mmap
+import operator
+import os
+import posixpath
+import time
+import xml.etree.ElementTree as ElementTree
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from itertools import chain, islice
+from typing import Callable, ContextManager, Iterable, Iterator, Sequence
+from urllib.parse import quote, urlsplit, urlunsplit
+
+import numpy as np
+
+from .store import CostStore, cost_store, key_date
+
+logger = logging.getLogger(__name__)
+
+# Candidate header names (lower-cased) across EA, MCA and FOCUS export schemas
+_DATE_COLUMNS = ("date", "usagedate", "usagedatetime", "chargeperiodstart")
+_COST_COLUMNS = ("costinbillingcurrency", "pretaxcost", "cost", "billedcost")
+_SUBSCRIPTION_COLUMNS = ("subscriptionid", "subscriptionguid", "subaccountid")
+_RESOURCE_GROUP_COLUMNS = ("resourcegroup", "resourcegroupname", "x_resourcegroupname")
+_SERVICE_COLUMNS = ("servicename", "metercategory", "consumedservice")
+_TAG_COLUMNS = ("tags",)
+
+_EXTENSIONS = (".csv", ".csv.gz")
+# Bytes of a memory-mapped file or blob decoded at a time
+_BLOCK_BYTES = 16 * 1024 * 1024
+_STORAGE_SCOPE = "https://storage.azure.com/.default"
+_STORAGE_VERSION = "2021-08-06"
+
+
+def parse_export_date(text: str) -> int:
+    """Convert ``MM/DD/YYYY`` or ISO export dates to ``YYYYMMDD``; 0 if unparseable."""
+
+    text = text.strip()
+    try:
+        if "/" in text:
+            month, day, year = text.split(" ", 1)[0].split("/")
+            return int(year) * 10000 + int(month) * 100 + int(day)
+        return int(text[:10].replace("-", ""))
+    except ValueError:
+        return 0
+
+
+def parse_tags(text: str) -> dict[str, str]:
+    """Parse an export ``Tags`` cell, with or without the surrounding braces."""
+
+    text = text.strip()
+    if not text:
+        return {}
+    if not text.startswith("{"):
+        text = "{" + text + "}"
+    try:
+        tags = json.loads(text)
+    except ValueError:
+        return {}
+    if not isinstance(tags, dict):
+        return {}
+    return {str(k): "" if v is None else str(v) for k, v in tags.items()}
+
+
+def _parse_costs(values: tuple[str, ...]) -> np.ndarray:
+    column = np.asarray(values)
+    column[column == ""] = "0"
+    try:
+        return column.astype(np.float64)
+    except ValueError:
+        costs = np.zeros(len(values))
+        for i, value in enumerate(values):
+            try:
+                costs[i] = float(value)
+            except ValueError:
+                pass
+        return costs
+
+
+def _factorize(values: Sequence[str]) -> tuple[list[str], np.ndarray]:
+    """Return the distinct ``values`` in first-seen order and each row's index into them.
+
+    Export columns have few distinct values per chunk, so dict lookups (run
+    in C through ``map``) are much cheaper than sorting the strings.
+    """
+
+    index = dict.fromkeys(values)
+    for code, value in enumerate(index):
+        index[value] = code
+    return list(index), np.fromiter(map(index.__getitem__, values), dtype=np.int64, count=len(values))
+
+
+def _reduce(
+    scopes: np.ndarray, days: np.ndarray, values: np.ndarray, costs: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Sum ``costs`` per distinct (scope, day, value) code triple."""
+
+    day_keys, day_codes = np.unique(days, return_inverse=True)
+    value_count = int(values.max()) + 1
+    combined = (scopes * len(day_keys) + day_codes) * value_count + values
+    keys, inverse = np.unique(combined, return_inverse=True)
+    totals = np.bincount(inverse, weights=costs, minlength=len(keys))
+    rest, value_codes = np.divmod(keys, value_count)
+    scope_codes, day_codes = np.divmod(rest, len(day_keys))
+    return scope_codes, day_keys[day_codes], value_codes, totals
+
+
+class ExportTotals:
+    """Daily cost sums per subscription scope and grouping, built from export chunks.
+
+    Groupings match what :class:`~backend.azure.cost.CostAnalyzer` stores:
+    ``""`` (daily totals), ``ResourceGroupName``, ``ServiceName`` and
+    ``tag:<name>`` for each tag key seen (or only ``tags`` if given). Each
+    chunk is reduced to its distinct (scope, day, value) sums right away;
+    those partial sums are merged again every few chunks.
+    """
+
+    _COMPACT_EVERY = 16
+
+    def __init__(self, tags: Iterable[str] | None = None) -> None:
+        self._scopes: dict[str, int] = {}
+        self._values: dict[str, dict[str, int]] = defaultdict(dict)
+        self._parts: dict[str, list[tuple[np.ndarray, ...]]] = defaultdict(list)
+        self._ranges: dict[str, tuple[int, int]] = {}
+        # Tag keys are case-insensitive in Azure: groupings use the configured
+        # spelling, or the lower-cased key, whatever the case in the export
+        self._tag_names: dict[str, str] = {t.lower(): t for t in tags or ()}
+        self._only_tags = bool(self._tag_names)
+        self.rows = 0
+
+    def _codes(self, index: dict[str, int], names: list[str]) -> np.ndarray:
+        """Map chunk-local distinct ``names`` to codes that are stable across chunks."""
+
+        return np.asarray([index.setdefault(n, len(index)) for n in names], dtype=np.int64)
+
+    def add(
+        self,
+        subscriptions: tuple[str, ...],
+        dates: tuple[str, ...],
+        costs: tuple[str, ...],
+        resource_groups: tuple[str, ...] | None = None,
+        services: tuple[str, ...] | None = None,
+        tags: tuple[str, ...] | None = None,
+    ) -> None:
+        """Fold one chunk of export columns (raw CSV cells) into the totals."""
+
+        unique_dates, date_codes = _factorize(dates)
+        days = np.asarray([parse_export_date(d) for d in unique_dates], dtype=np.int64)[date_codes]
+        unique_subs, sub_codes = _factorize(subscriptions)
+        # FOCUS SubAccountId is a full "/subscriptions/<id>" path
+        scope_names = [f"subscriptions/{s.rsplit('/', 1)[-1].lower()}" if s else "" for s in unique_subs]
+        scopes = self._codes(self._scopes, scope_names)[sub_codes]
+        amounts = _parse_costs(costs)
+        valid = (days > 0) & np.asarray([bool(s) for s in scope_names])[sub_codes]
+        if not len(valid) or not valid.any():
+            return
+        self.rows += int(valid.sum())
+
+        names = list(self._scopes)
+        for code in np.unique(scopes[valid]).tolist():
+            in_scope = days[valid & (scopes == code)]
+            lo, hi = int(in_scope.min()), int(in_scope.max())
+            if names[code] in self._ranges:
+                lo, hi = min(lo, self._ranges[names[code]][0]), max(hi, self._ranges[names[code]][1])
+            self._ranges[names[code]] = (lo, hi)
+
+        self._add("", scopes, days, np.zeros(len(days), dtype=np.int64), amounts, valid)
+        for grouping, column, normalize in (
+            ("ResourceGroupName", resource_groups, str.lower),
+            ("ServiceName", services, str),
+        ):
+            if column is not None:
+                values, codes = _factorize(column)
+                codes = self._codes(self._values[grouping], [normalize(v) or "Unknown" for v in values])[codes]
+                self._add(grouping, scopes, days, codes, amounts, valid)
+        if tags is not None:
+            self._add_tags(scopes, days, tags, amounts, valid)
+
+    def _add_tags(
+        self, scopes: np.ndarray, days: np.ndarray, tags: tuple[str, ...], amounts: np.ndarray, valid: np.ndarray
+    ) -> None:
+        # Tag cells repeat heavily, so each distinct cell is parsed once
+        cells, cell_codes = _factorize(tags)
+        parsed = [{k.lower(): v for k, v in parse_tags(c).items()} for c in cells]
+        for key in sorted({key for tag_map in parsed for key in tag_map}):
+            if self._only_tags and key not in self._tag_names:
+                continue
+            grouping = f"tag:{self._tag_names.get(key, key)}"
+            per_cell = [tag_map.get(key, "") for tag_map in parsed]
+            tagged = np.asarray([bool(v) for v in per_cell])[cell_codes] & valid
+            codes = self._codes(self._values[grouping], per_cell)[cell_codes]
+            self._add(grouping, scopes, days, codes, amounts, tagged)
+
+    def _add(
+        self,
+        grouping: str,
+        scopes: np.ndarray,
+        days: np.ndarray,
+        values: np.ndarray,
+        amounts: np.ndarray,
+        mask: np.ndarray,
+    ) -> None:
+        if not mask.any():
+            return
+        parts = self._parts[grouping]
+        parts.append(_reduce(scopes[mask], days[mask], values[mask], amounts[mask]))
+        if len(parts) >= self._COMPACT_EVERY:
+            self._compact(grouping)
+
+    def _compact(self, grouping: str) -> tuple[np.ndarray, ...]:
+        parts = self._parts[grouping]
+        if len(parts) > 1:
+            parts[:] = [_reduce(*(np.concatenate(column) for column in zip(*parts)))]
+        return parts[0]
+
+    def scopes(self) -> dict[str, tuple[int, int]]:
+        """Return each scope seen with its first and last ``YYYYMMDD`` day."""
+
+        return dict(self._ranges)
+
+    def groupings(self, scope: str) -> list[str]:
+        code = self._scopes[scope]
+        return [g for g in self._parts if code in self._compact(g)[0]]
+
+    def stored_rows(self, scope: str, grouping: str) -> list[tuple[int, str, float]]:
+        """Return ``(usage_date, group_value, cost)`` rows for the store.
+
+        Untagged cost is reported under ``"Unknown"`` for every tag grouping,
+        as the Query API does, so each grouping adds up to the daily total.
+        """
+
+        code = self._scopes[scope]
+        scopes, days, values, totals = self._compact(grouping)
+        mine = scopes == code
+        names = list(self._values[grouping]) or [""]
+        rows = list(zip(days[mine].tolist(), [names[v] for v in values[mine].tolist()], totals[mine].tolist()))
+        if grouping.startswith("tag:"):
+            all_scopes, all_days, _, all_totals = self._compact("")
+            in_scope = all_scopes == code
+            day_totals = dict(zip(all_days[in_scope].tolist(), all_totals[in_scope].tolist()))
+            for day, _, cost in rows:
+                day_totals[day] -= cost
+            untagged = {day: cost for day, cost in day_totals.items() if abs(cost) > 1e-9}
+            merged = {(day, value): cost for day, value, cost in rows}
+            for day, cost in untagged.items():
+                merged[(day, "Unknown")] = merged.get((day, "Unknown"), 0.0) + cost
+            rows = [(day, value, cost) for (day, value), cost in merged.items()]
+        return sorted(rows)
+
+    def write(self, store: CostStore) -> None:
+        """Replace every stored day the totals cover, per scope and grouping."""
+
+        for scope, (lo, hi) in self._ranges.items():
+            for grouping in self.groupings(scope):
+                store.replace(scope, grouping, key_date(lo), key_date(hi), self.stored_rows(scope, grouping))
+
+
+def _find(header: list[str], candidates: tuple[str, ...]) -> int | None:
+    names = [h.strip().lower() for h in header]
+    for candidate in candidates:
+        if candidate in names:
+            return names.index(candidate)
+    return None
+
+
+def read_export(lines: Iterable[str], totals: ExportTotals, chunk_rows: int) -> int:
+    """Parse one export CSV in chunks of ``chunk_rows`` into ``totals``; return its row count."""
+
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        return 0
+    required = [_find(header, c) for c in (_SUBSCRIPTION_COLUMNS, _DATE_COLUMNS, _COST_COLUMNS)]
+    if None in required:
+        raise ValueError("Not a Cost Management export: subscription, date or cost column missing")
+    optional = [_find(header, c) for c in (_RESOURCE_GROUP_COLUMNS, _SERVICE_COLUMNS, _TAG_COLUMNS)]
+    indices = required + [i for i in optional if i is not None]
+    take = operator.itemgetter(*indices)
+
+    rows = 0
+    # Blank lines are skipped; only the needed cells of each row are kept
+    cells = map(take, filter(None, reader))
+    while True:
+        try:
+            chunk = list(islice(cells, chunk_rows))
+        except IndexError:
+            raise ValueError(f"Truncated row at line {reader.line_num}") from None
+        if not chunk:
+            return rows
+        rows += len(chunk)
+        columns = iter(zip(*chunk))
+        subscriptions, dates, costs = next(columns), next(columns), next(columns)
+        resource_groups, services, tags = (next(columns) if i is not None else None for i in optional)
+        totals.add(subscriptions, dates, costs, resource_groups, services, tags)
+
+
+def _text_blocks(chunks: Iterable[bytes]) -> Iterator[io.StringIO]:
+    """Decode UTF-8 byte chunks into text blocks that each end at a line break."""
+
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = b""
+    for chunk in chunks:
+        data = pending + chunk
+        cut = data.rfind(b"\n") + 1
+        pending = data[cut:]
+        if cut:
+            # newline="" splits on line endings without translating them, as csv expects
+            yield io.StringIO(decoder.decode(data[:cut]), newline="")
+    tail = decoder.decode(pending, final=True)
+    if tail:
+        yield io.StringIO(tail, newline="")
+
+
+def _mapped_chunks(path: str) -> Iterator[bytes]:
+    """Yield ``path`` from a read-only memory map in blocks cut after a newline."""
+
+    with open(path, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            start = 0
+            while start < size:
+                end = min(start + _BLOCK_BYTES, size)
+                if end < size:
+                    newline = mapped.rfind(b"\n", start, end)
+                    end = newline + 1 if newline >= 0 else end
+                chunk = mapped[start:end]
+                # Let the kernel drop pages already copied out instead of growing RSS
+                if hasattr(mmap, "MADV_DONTNEED"):
+                    aligned = start - start % mmap.PAGESIZE
+                    mapped.madvise(mmap.MADV_DONTNEED, aligned, end - aligned)
+                start = end
+                yield chunk
+
+
+class ExportFile:
+    """One export CSV, local or in blob storage; ``open()`` yields its lines."""
+
+    def __init__(
+        self, name: str, size: int, modified: float, open: Callable[[], ContextManager[Iterable[str]]]
+    ) -> None:
+        self.name = name
+        self.size = size
+        self.modified = modified
+        self.open = open
+
+
+class ExportRun:
+    """The files of one export run, ingested together under ``source``."""
+
+    def __init__(self, source: str, files: list[ExportFile]) -> None:
+        self.source = source
+        self.files = files
+
+    def signature(self) -> str:
+        state = sorted((f.name, f.size, f.modified) for f in self.files)
+        return hashlib.sha256(json.dumps(state).encode()).hexdigest()
+
+    def modified(self) -> float:
+        return max(f.modified for f in self.files)
+
+
+def _is_export(name: str) -> bool:
+    return name.lower().endswith(_EXTENSIONS)
+
+
+@contextmanager
+def _open_local(path: str) -> Iterator[Iterable[str]]:
+    if path.lower().endswith(".gz"):
+        with gzip.open(path, "rt", encoding="utf-8-sig", newline="") as handle:
+            yield handle
+    else:
+        chunks = _mapped_chunks(path)
+        try:
+            yield chain.from_iterable(_text_blocks(chunks))
+        finally:
+            chunks.close()
+
+
+def _local_file(path: str) -> ExportFile:
+    stat = os.stat(path)
+    return ExportFile(path, stat.st_size, stat.st_mtime, lambda: _open_local(path))
+
+
+def _local_runs(path: str) -> list[ExportRun]:
+    path = os.path.abspath(path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No such export path: {path}")
+    if os.path.isfile(path):
+        return [ExportRun(path, [_local_file(path)])]
+    runs = []
+    for directory, _, names in os.walk(path):
+        files = [_local_file(os.path.join(directory, n)) for n in sorted(names) if _is_export(n)]
+        if files:
+            runs.append(ExportRun(directory, files))
+    return runs
+
+
+def _blob_headers(sas: str) -> dict[str, str]:
+    if sas:
+        return {}
+    from .credentials import app_credential
+
+    token = app_credential().get_token(_STORAGE_SCOPE).token
+    return {"Authorization": f"Bearer {token}", "x-ms-version": _STORAGE_VERSION}
+
+
+@contextmanager
+def _open_blob(url: str, headers: dict[str, str]) -> Iterator[Iterable[str]]:
+    import requests
+
+    with requests.get(url, headers=headers, stream=True, timeout=(10, 300)) as response:
+        response.raise_for_status()
+        chunks = response.iter_content(_BLOCK_BYTES)
+        if urlsplit(url).path.lower().endswith(".gz"):
+            inflate = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+            chunks = map(inflate.decompress, chunks)
+        yield chain.from_iterable(_text_blocks(chunks))
+
+
+def _blob_runs(url: str) -> list[ExportRun]:
+    """List export runs under a blob container URL with an optional path prefix."""
+
+    import requests
+
+    parts = urlsplit(url)
+    container, _, prefix = parts.path.lstrip("/").partition("/")
+    headers = _blob_headers(parts.query)
+    container_url = urlunsplit((parts.scheme, parts.netloc, f"/{container}", "", ""))
+
+    def blob_url(name: str) -> str:
+        return f"{container_url}/{quote(name)}" + (f"?{parts.query}" if parts.query else "")
+
+    listed: list[tuple[str, int, str]] = []
+    if _is_export(prefix):
+        response = requests.head(blob_url(prefix), headers=headers, timeout=30)
+        response.raise_for_status()
+        listed.append((prefix, int(response.headers.get("Content-Length", 0)), response.headers["Last-Modified"]))
+    else:
+        marker = ""
+        while True:
+            query = f"restype=container&comp=list&prefix={quote(prefix)}" + (f"&marker={quote(marker)}" if marker else "")
+            if parts.query:
+                query += f"&{parts.query}"
+            response = requests.get(f"{container_url}?{query}", headers=headers, timeout=30)
+            response.raise_for_status()
+            root = ElementTree.fromstring(response.content)
+            for blob in root.iter("Blob"):
+                name = blob.findtext("Name", "")
+                if _is_export(name):
+                    listed.append((
+                        name,
+                        int(blob.findtext("Properties/Content-Length", "0")),
+                        blob.findtext("Properties/Last-Modified", ""),
+                    ))
+            marker = root.findtext("NextMarker") or ""
+            if not marker:
+                break
+
+    runs: dict[str, list[ExportFile]] = defaultdict(list)
+    for name, size, modified in listed:
+        runs[posixpath.dirname(name)].append(ExportFile(
+            name, size, parsedate_to_datetime(modified).timestamp(), lambda u=blob_url(name): _open_blob(u, headers)
+        ))
+    return [ExportRun(f"{container_url}/{directory}", files) for directory, files in runs.items()]
+
+
+def find_export_runs(path: str) -> list[ExportRun]:
+    """Return the export runs under a local path or blob URL."""
+
+    if urlsplit(path).scheme in ("http", "https"):
+        return _blob_runs(path)
+    return _local_runs(path)
+
+
+def ingest_exports(
+    paths: Iterable[str],
+    store: CostStore = cost_store,
+    tags: Iterable[str] | None = None,
+    chunk_rows: int | None = None,
+    force: bool = False,
+) -> dict:
+    """Ingest every new or changed export run under ``paths`` and return what was done.
+
+    Runs are ingested oldest first, so when several cover the same days (e.g.
+    month-to-date exports) the latest one wins.
+    """
+
+    from config import COST_EXPORT_CHUNK_ROWS, COST_EXPORT_TAGS
+
+    tags = COST_EXPORT_TAGS if tags is None else list(tags)
+    chunk_rows = chunk_rows or COST_EXPORT_CHUNK_ROWS
+    started = time.monotonic()
+    summary = {"runs": 0, "skipped": 0, "files": 0, "rows": 0, "bytes": 0, "scopes": [], "errors": {}}
+    scopes: set[str] = set()
+    runs = []
+    for path in paths:
+        try:
+            runs.extend(find_export_runs(path))
+        except Exception as e:
+            logger.exception("Error listing exports under %s", path)
+            summary["errors"][path] = str(e)
+    for run in sorted(runs, key=ExportRun.modified):
+        signature = run.signature()
+        if not force and store.export_signature(run.source) == signature:
+            summary["skipped"] += 1
+            continue
+        totals = ExportTotals(tags)
+        try:
+            for export in run.files:
+                with export.open() as lines:
+                    read_export(lines, totals, chunk_rows)
+        except Exception as e:
+            logger.exception("Error ingesting export %s", run.source)
+            summary["errors"][run.source] = str(e)
+            continue
+        totals.write(store)
+        store.record_export(run.source, signature)
+        scopes.update(totals.scopes())
+        summary["runs"] += 1
+        summary["files"] += len(run.files)
+        summary["rows"] += totals.rows
+        summary["bytes"] += sum(f.size for f in run.files)
+    summary["scopes"] = sorted(scopes)
+    summary["seconds"] = round(time.monotonic() - started, 1)
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingest Cost Management usage exports into the local cost store.")
+    parser.add_argument("paths", nargs="*", help="export directories, files or blob URLs (default: COST_EXPORT_PATHS)")
+    parser.add_argument("--force", action="store_true", help="re-ingest runs that have not changed")
+    parser.add_argument("--tag", action="append", dest="tags", help="only aggregate this tag key (repeatable)")
+    parser.add_argument("--chunk-rows", type=int, help="rows parsed per chunk")
+    args = parser.parse_args()
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    from config import COST_EXPORT_PATHS
+
+    paths = args.paths or COST_EXPORT_PATHS
+    if not paths:
+        parser.error("no paths given and COST_EXPORT_PATHS is not set")
+    summary = ingest_exports(paths, tags=args.tags, chunk_rows=args.chunk_rows, force=args.force)
+    print(
+        f"Ingested {summary['rows']} rows from {summary['files']} files in {summary['runs']} runs"
+        f" ({summary['skipped']} unchanged) for {len(summary['scopes'])} subscriptions"
+        f" in {summary['seconds']}s"
+    )
+    raise SystemExit(1 if summary["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Column-oriented cost rows backed by NumPy arrays."""
+
+from typing import Any, Iterable, Sequence
+
+import numpy as np
+
+
+def parse_usage_dates(values: Sequence[Any]) -> np.ndarray:
+    """Convert a column of ``20240131`` ints or ISO date strings to ``YYYYMMDD`` int64."""
+
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64)
+    if isinstance(values[0], (int, np.integer)):
+        return np.asarray(values, dtype=np.int64)
+    text = np.asarray(values, dtype="U10")  # truncates "2024-01-31T00:00:00" to the date
+    return np.char.replace(text, "-", "").astype(np.int64)
+
+
+def parse_costs(values: Sequence[Any]) -> np.ndarray:
+    """Convert a column of cost cells (numbers, numeric strings or None) to float64."""
+
+    column = np.asarray(values, dtype=object)
+    column[column == None] = 0  # noqa: E711 - elementwise comparison
+    return column.astype(np.float64)
+
+
+class CostFrame:
+    """Parallel arrays of usage date, cost and optional group columns.
+
+    Rows only become dicts at the JSON boundary (see :meth:`records`), so
+    totals and group-bys over large results run as array operations.
+    """
+
+    def __init__(
+        self,
+        dates: np.ndarray,
+        costs: np.ndarray,
+        groups: dict[str, np.ndarray] | None = None,
+    ) -> None:
+        self.dates = dates
+        self.costs = costs
+        self.groups = groups or {}
+
+    def __len__(self) -> int:
+        return len(self.costs)
+
+    @classmethod
+    def empty(cls, group_names: Iterable[str] = ()) -> "CostFrame":
+        return cls(
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.float64),
+            {name: np.empty(0, dtype=object) for name in group_names},
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        names: list[str],
+        rows: Sequence[Sequence[Any]],
+        date_key: str,
+        cost_key: str,
+        group_keys: dict[str, str | None],
+    ) -> "CostFrame":
+        """Build a frame from row-major query results in one transpose.
+
+        ``group_keys`` maps each output group name to its result column;
+        missing columns and empty cells become ``"Unknown"``.
+        """
+
+        if not rows:
+            return cls.empty(group_keys)
+        columns = list(zip(*rows))
+        groups = {}
+        for name, key in group_keys.items():
+            if key is None:
+                groups[name] = np.full(len(rows), "Unknown", dtype=object)
+            else:
+                column = np.asarray(columns[names.index(key)], dtype=object)
+                column[(column == None) | (column == "")] = "Unknown"  # noqa: E711
+                groups[name] = column
+        return cls(
+            parse_usage_dates(columns[names.index(date_key)]),
+            parse_costs(columns[names.index(cost_key)]),
+            groups,
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple[int, str, float]], group_name: str = "group") -> "CostFrame":
+        """Build a frame from stored ``(usage_date, group_value, cost)`` rows."""
+
+        if not rows:
+            return cls.empty([group_name])
+        dates, groups, costs = zip(*rows)
+        return cls(
+            np.asarray(dates, dtype=np.int64),
+            np.asarray(costs, dtype=np.float64),
+            {group_name: np.asarray(groups, dtype=object)},
+        )
+
+    def rows(self, group_name: str = "group") -> Iterable[tuple[int, str, float]]:
+        """Yield ``(usage_date, group_value, cost)`` tuples for the store."""
+
+        groups = self.groups[group_name].tolist() if group_name in self.groups else [""] * len(self)
+        return zip(self.dates.tolist(), groups, self.costs.tolist())
+
+    def total(self) -> float:
+        return float(self.costs.sum())
+
+    def group_codes(self, names: Sequence[str]) -> tuple[np.ndarray, list[tuple]]:
+        """Return a dense code per row for the combination of ``names``, and the keys."""
+
+        codes = np.zeros(len(self), dtype=np.int64)
+        uniques = []
+        for name in names:
+            values, inverse = np.unique(self.groups[name].astype(str), return_inverse=True)
+            codes = codes * len(values) + inverse
+            uniques.append(values)
+        combined, codes = np.unique(codes, return_inverse=True)
+        keys = []
+        for code in combined.tolist():
+            key = []
+            for values in reversed(uniques):
+                code, index = divmod(code, len(values))
+                key.append(str(values[index]))
+            keys.append(tuple(reversed(key)))
+        return codes, keys
+
+    def records(self, date_field: str, cost_field: str, group_fields: dict[str, str] | None = None) -> list[dict]:
+        """Return rows as dicts, naming fields for the JSON response."""
+
+        fields = [date_field, cost_field]
+        columns = [self.dates.tolist(), self.costs.tolist()]
+        for name, field in (group_fields or {}).items():
+            fields.append(field)
+            columns.append(self.groups[name].tolist())
+        return [dict(zip(fields, values)) for values in zip(*columns)]
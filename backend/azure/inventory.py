@@ -0,0 +1,397 @@
+"""Cached Azure inventory: subscriptions, resource groups and resources.
+
+Listings are cached per user and scope. One older than ``refresh_after`` is
+still served while a background thread reloads it, acting as the user with
+a snapshot of their current token; only a missing or expired listing makes
+the caller wait. With change detection enabled, a background refresh of
+resource groups or resources first asks Azure Resource Graph whether any
+were created or deleted since the last check and skips the listing if not.
+"""
+
+import datetime as _dt
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Iterable
+
+import numpy as np
+from azure.core.credentials import TokenCredential
+from azure.core.rest import HttpRequest
+
+from .aio.credentials import session_token_credential
+from .aio.resource_groups import AsyncResourceGroupManager
+from .aio.subscriptions import AsyncSubscriptionManager
+from .cache import QueryCache
+from .clients import ARM_SCOPE, clients
+from .credentials import StaticTokenCredential, current_identity, get_flask_credential
+from .resource_groups import ResourceGroupManager
+from .resources import ResourceManager
+from .subscriptions import SubscriptionManager
+from .throttle import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+_RESOURCE_GRAPH_API_VERSION = "2022-10-01"
+# Resource Graph records changes with a delay; look back this far before the last check
+_CHANGE_LAG_SECONDS = 900
+
+
+def resource_group_of(resource_id: str) -> str | None:
+    """Return the resource group named in ``resource_id``, if any."""
+
+    parts = resource_id.split("/")
+    for i, part in enumerate(parts[:-1]):
+        if part.lower() == "resourcegroups":
+            return parts[i + 1]
+    return None
+
+
+class Listing:
+    """One ARM listing with case-insensitive lookups by name and by id."""
+
+    def __init__(self, items: list[dict], id_key: str, name_key: str) -> None:
+        self.items = items
+        self._ids: dict[str, str] = {}
+        for item in items:
+            if item[name_key]:
+                # Display names need not be unique: the first one wins
+                self._ids.setdefault(item[name_key].lower(), item[id_key])
+        self._by_id = {item[id_key].lower(): item for item in items}
+
+    def id_of(self, name: str) -> str | None:
+        """Return the id of the item called ``name``, or ``None``."""
+
+        return self._ids.get(name.lower())
+
+    def get(self, item_id: str) -> dict | None:
+        """Return one item by id (any case), or ``None``."""
+
+        return self._by_id.get(item_id.lower())
+
+
+class ResourceIndex:
+    """A subscription's resources as columns, indexed by lower-cased resource id.
+
+    Azure treats resource ids case-insensitively and Cost Management returns
+    them lower-cased, so joins go through the lower-cased form.
+    """
+
+    def __init__(self, resources: list[dict]) -> None:
+        self.ids = np.array([r["id"] for r in resources], dtype=object)
+        self.names = np.array([r["name"] for r in resources], dtype=object)
+        self.types = np.array([r["type"] for r in resources], dtype=object)
+        self.locations = np.array([r["location"] for r in resources], dtype=object)
+        self.resource_groups = np.array([resource_group_of(r["id"]) for r in resources], dtype=object)
+        self._positions = {r["id"].lower(): i for i, r in enumerate(resources)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def positions(self, resource_ids: Iterable[str]) -> np.ndarray:
+        """Return each id's row in the index, or -1 where it is not in the inventory."""
+
+        lookup = self._positions.get
+        return np.fromiter((lookup(i.lower(), -1) for i in resource_ids), dtype=np.int64)
+
+    def get(self, resource_id: str) -> dict | None:
+        """Return one resource by id (any case), or ``None``."""
+
+        i = self._positions.get(resource_id.lower())
+        if i is None:
+            return None
+        return {
+            "id": self.ids[i],
+            "name": self.names[i],
+            "type": self.types[i],
+            "location": self.locations[i],
+            "resource_group": self.resource_groups[i],
+        }
+
+
+def _subscription_scope(subscription_id: str) -> str:
+    return f"subscriptions/{subscription_id}"
+
+
+class InventoryCache:
+    """Per-user inventory listings with background refresh and lookups.
+
+    The lookup methods (:meth:`subscription_id`, :meth:`resource_group_id`,
+    :meth:`location`) only read what the signed-in user already has cached
+    and never call Azure; they return ``None`` for anything not loaded.
+    """
+
+    def __init__(self, ttl: float, refresh_after: float, max_entries: int, change_detection: bool) -> None:
+        self._cache = QueryCache(ttl, max_entries, name="inventory")
+        self._refresh_after = refresh_after
+        self._change_detection = change_detection
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="inventory-refresh")
+
+    def subscriptions(
+        self, credential: TokenCredential | None = None, priority: str = PRIORITY_INTERACTIVE
+    ) -> list[dict]:
+        """Return the subscriptions the user can see."""
+
+        # Role assignments change which subscriptions are visible without a
+        # container change, so this listing is always reloaded on refresh
+        return self._get("tenant", "subscriptions", self._list_subscriptions, None, credential, priority).items
+
+    async def asubscriptions(
+        self, credential: TokenCredential | None = None, priority: str = PRIORITY_INTERACTIVE
+    ) -> list[dict]:
+        """Async :meth:`subscriptions`: a miss is listed without holding a thread."""
+
+        async def load(c: TokenCredential, p: str) -> Listing:
+            return Listing(await AsyncSubscriptionManager(c, p).list_subscriptions(), "subscription_id", "display_name")
+
+        listing = await self._aget(
+            "tenant", "subscriptions", load, self._list_subscriptions, None, credential, priority
+        )
+        return listing.items
+
+    def resource_groups(
+        self,
+        subscription_id: str,
+        credential: TokenCredential | None = None,
+        priority: str = PRIORITY_INTERACTIVE,
+    ) -> list[dict]:
+        """Return the resource groups of ``subscription_id``."""
+
+        return self._get(
+            _subscription_scope(subscription_id),
+            "resource_groups",
+            functools.partial(self._list_resource_groups, subscription_id),
+            functools.partial(self._resource_groups_changed, subscription_id),
+            credential,
+            priority,
+        ).items
+
+    async def aresource_groups(
+        self,
+        subscription_id: str,
+        credential: TokenCredential | None = None,
+        priority: str = PRIORITY_INTERACTIVE,
+    ) -> list[dict]:
+        """Async :meth:`resource_groups`: a miss is listed without holding a thread."""
+
+        async def load(c: TokenCredential, p: str) -> Listing:
+            return Listing(await AsyncResourceGroupManager(subscription_id, c, p).list_resource_groups(), "id", "name")
+
+        listing = await self._aget(
+            _subscription_scope(subscription_id),
+            "resource_groups",
+            load,
+            functools.partial(self._list_resource_groups, subscription_id),
+            functools.partial(self._resource_groups_changed, subscription_id),
+            credential,
+            priority,
+        )
+        return listing.items
+
+    def resource_index(
+        self,
+        subscription_id: str,
+        credential: TokenCredential | None = None,
+        priority: str = PRIORITY_INTERACTIVE,
+    ) -> ResourceIndex:
+        """Return the resources of ``subscription_id`` indexed by id."""
+
+        return self._get(
+            _subscription_scope(subscription_id),
+            "resources",
+            lambda c, p: ResourceIndex(ResourceManager(subscription_id, c, p).list_resources()),
+            lambda c, since: self._changed(subscription_id, "resourcechanges", None, c, since),
+            credential,
+            priority,
+        )
+
+    def subscription_id(self, name: str) -> str | None:
+        """Return the id of the subscription with display name ``name``."""
+
+        listing = self._peek("tenant", "subscriptions")
+        return listing.id_of(name) if listing else None
+
+    def resource_group_id(self, subscription_id: str, name: str) -> str | None:
+        """Return the id of resource group ``name`` in ``subscription_id``."""
+
+        listing = self._peek(_subscription_scope(subscription_id), "resource_groups")
+        return listing.id_of(name) if listing else None
+
+    def location(self, resource_id: str) -> str | None:
+        """Return the location of a resource group or resource by id."""
+
+        try:
+            subscription_id = ResourceManager.extract_subscription_id(resource_id)
+        except ValueError:
+            return None
+        scope = _subscription_scope(subscription_id)
+        if "/providers/" in resource_id.lower():
+            index = self._peek(scope, "resources")
+            resource = index.get(resource_id) if index else None
+        else:
+            listing = self._peek(scope, "resource_groups")
+            resource = listing.get(resource_id) if listing else None
+        return resource["location"] if resource else None
+
+    def clear(self) -> None:
+        """Drop every cached listing."""
+
+        self._cache.clear()
+
+    def _peek(self, scope: str, kind: str) -> Any:
+        entry = self._cache.peek(QueryCache.make_key(current_identity(), scope, kind))
+        return entry[1] if entry else None
+
+    @staticmethod
+    def _list_subscriptions(credential: TokenCredential, priority: str) -> Listing:
+        return Listing(SubscriptionManager(credential, priority).list_subscriptions(), "subscription_id", "display_name")
+
+    @staticmethod
+    def _list_resource_groups(subscription_id: str, credential: TokenCredential, priority: str) -> Listing:
+        return Listing(ResourceGroupManager(subscription_id, credential, priority).list_resource_groups(), "id", "name")
+
+    @classmethod
+    def _resource_groups_changed(cls, subscription_id: str, credential: TokenCredential, since: float) -> bool:
+        return cls._changed(
+            subscription_id, "resourcecontainerchanges", "microsoft.resources/subscriptions/resourcegroups", credential, since
+        )
+
+    def _get(
+        self,
+        scope: str,
+        kind: str,
+        load: Callable[[TokenCredential, str], Any],
+        changed: Callable[[TokenCredential, float], bool] | None,
+        credential: TokenCredential | None,
+        priority: str,
+    ) -> Any:
+        credential = credential or get_flask_credential()
+        key = QueryCache.make_key(current_identity(), scope, kind)
+        checked_at, value = self._cache.get_or_compute(key, lambda: (time.time(), load(credential, priority)))
+        if time.time() - checked_at >= self._refresh_after:
+            self._schedule_refresh(key, load, changed, credential, checked_at, value)
+        return value
+
+    async def _aget(
+        self,
+        scope: str,
+        kind: str,
+        aload: Callable[[TokenCredential, str], Awaitable[Any]],
+        load: Callable[[TokenCredential, str], Any],
+        changed: Callable[[TokenCredential, float], bool] | None,
+        credential: TokenCredential | None,
+        priority: str,
+    ) -> Any:
+        # Background refreshes still run ``load`` on the refresh threads
+        credential = credential or await session_token_credential()
+        key = QueryCache.make_key(current_identity(), scope, kind)
+
+        async def compute() -> tuple[float, Any]:
+            checked_at = time.time()
+            return checked_at, await aload(credential, priority)
+
+        checked_at, value = await self._cache.aget_or_compute(key, compute)
+        if time.time() - checked_at >= self._refresh_after:
+            self._schedule_refresh(key, load, changed, credential, checked_at, value)
+        return value
+
+    def _schedule_refresh(
+        self,
+        key: tuple,
+        load: Callable[[TokenCredential, str], Any],
+        changed: Callable[[TokenCredential, float], bool] | None,
+        credential: TokenCredential,
+        checked_at: float,
+        value: Any,
+    ) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        try:
+            # The refresh runs outside the request, so it gets the token itself
+            token = StaticTokenCredential(credential.get_token(ARM_SCOPE))
+        except Exception:
+            logger.exception("Error scheduling inventory refresh")
+            with self._lock:
+                self._refreshing.discard(key)
+            return
+        if not self._change_detection:
+            changed = None
+        self._executor.submit(self._refresh, key, load, changed, token, checked_at, value)
+
+    def _refresh(
+        self,
+        key: tuple,
+        load: Callable[[TokenCredential, str], Any],
+        changed: Callable[[TokenCredential, float], bool] | None,
+        credential: TokenCredential,
+        checked_at: float,
+        value: Any,
+    ) -> None:
+        started = time.time()
+        try:
+            if changed is None or changed(credential, checked_at - _CHANGE_LAG_SECONDS):
+                value = load(credential, PRIORITY_BACKGROUND)
+            self._cache.put(key, (started, value))
+        except Exception:
+            logger.exception("Error refreshing inventory %s for %s", key[2], key[1])
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    @staticmethod
+    def _changed(
+        subscription_id: str,
+        table: str,
+        target_type: str | None,
+        credential: TokenCredential,
+        since: float,
+    ) -> bool:
+        """Ask Resource Graph whether anything in ``table`` was created or deleted since ``since``."""
+
+        timestamp = _dt.datetime.fromtimestamp(since, _dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        # Name, type and location are immutable, so only creations and deletions matter
+        query = (
+            f"{table}"
+            f" | where todatetime(properties.changeAttributes.timestamp) > datetime({timestamp})"
+            " | where properties.changeType in ('Create', 'Delete')"
+        )
+        if target_type:
+            query += f" | where properties.targetResourceType =~ '{target_type}'"
+        query += " | summarize changes = count()"
+
+        request = HttpRequest(
+            "POST",
+            "/providers/Microsoft.ResourceGraph/resources",
+            params={"api-version": _RESOURCE_GRAPH_API_VERSION},
+            json={"subscriptions": [subscription_id], "query": query, "options": {"resultFormat": "objectArray"}},
+        )
+        # There is no Resource Graph client here; any ARM client's send_request
+        # resolves the path against the same endpoint, pipeline and limiter
+        response = clients.cost_management().send_request(
+            request, credential=credential, priority=PRIORITY_BACKGROUND
+        )
+        response.raise_for_status()
+        data = response.json().get("data") or [{}]
+        return bool(data[0].get("changes", 1))
+
+
+def _build_inventory() -> InventoryCache:
+    from config import (
+        INVENTORY_CHANGE_DETECTION,
+        INVENTORY_MAX_ENTRIES,
+        INVENTORY_REFRESH_SECONDS,
+        INVENTORY_TTL_SECONDS,
+    )
+
+    return InventoryCache(
+        INVENTORY_TTL_SECONDS, INVENTORY_REFRESH_SECONDS, INVENTORY_MAX_ENTRIES, INVENTORY_CHANGE_DETECTION
+    )
+
+
+# Inventory changes far less often than costs, so it has its own, longer-lived cache
+inventory = _build_inventory()
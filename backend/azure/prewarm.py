@@ -0,0 +1,191 @@
+"""Background pre-warming of the local cost store.
+
+Refreshes the previous month's daily and per-resource-group costs for
+configured and recently viewed subscriptions at fixed UTC hours, using the
+app's service principal and background priority so users are never queued
+behind it. New Cost Management Exports under ``COST_EXPORT_PATHS`` are
+ingested first, so the days they cover need no queries. Run it in-process
+(``PREWARM_IN_PROCESS=true``) or as a separate worker::
+
+    python -m backend.azure.prewarm          # run on the schedule
+    python -m backend.azure.prewarm --once   # warm once and exit
+"""
+
+import argparse
+import datetime as _dt
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from azure.core.credentials import TokenCredential
+
+from config import (
+    COST_EXPORT_PATHS,
+    PREWARM_HOURS_UTC,
+    PREWARM_LOCK_PATH,
+    PREWARM_RECENT_DAYS,
+    PREWARM_SUBSCRIPTIONS,
+)
+
+from .cost import CostAnalyzer
+from .credentials import app_credential
+from .store import cost_store
+from .throttle import PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = "subscriptions/"
+
+
+def prewarm_targets() -> list[str]:
+    """Return configured subscriptions followed by recently viewed ones."""
+
+    recent = [
+        scope[len(_PREFIX):]
+        for scope in cost_store.recent_scopes(PREWARM_RECENT_DAYS * 86400)
+        if scope.startswith(_PREFIX)
+    ]
+    return list(dict.fromkeys(PREWARM_SUBSCRIPTIONS + recent))
+
+
+def prewarm(subscription_ids: list[str], credential: TokenCredential | None = None) -> dict[str, str]:
+    """Warm the store for each subscription and return errors by subscription id."""
+
+    credential = credential or app_credential()
+    errors = {}
+    for subscription_id in subscription_ids:
+        try:
+            CostAnalyzer(subscription_id, credential, PRIORITY_BACKGROUND).cost_summary()
+        except Exception as e:
+            logger.exception("Error pre-warming subscription %s", subscription_id)
+            errors[subscription_id] = str(e)
+    return errors
+
+
+@contextmanager
+def _run_lock() -> Iterator[float | None]:
+    """Hold the host-wide pre-warm lock and yield when the previous run started.
+
+    Yields ``None`` if another process holds the lock, else the previous
+    start time (``0.0`` if none); the lock file then records this run's.
+    """
+
+    try:
+        import fcntl
+    except ImportError:  # Windows: no cross-process lock, always run
+        yield 0.0
+        return
+    directory = os.path.dirname(PREWARM_LOCK_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(PREWARM_LOCK_PATH, "a+") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield None
+            return
+        try:
+            handle.seek(0)
+            try:
+                last_run = float(handle.read() or 0.0)
+            except ValueError:
+                last_run = 0.0
+            handle.seek(0)
+            handle.truncate()
+            handle.write(str(time.time()))
+            handle.flush()
+            yield last_run
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def seconds_until_next_run(now: _dt.datetime, hours: list[int]) -> float:
+    """Return the seconds from ``now`` (UTC) to the next scheduled hour."""
+
+    candidates = [
+        now.replace(hour=hour, minute=0, second=0, microsecond=0) + _dt.timedelta(days=days)
+        for hour in hours
+        for days in (0, 1)
+    ]
+    return min((c - now).total_seconds() for c in candidates if c > now)
+
+
+def last_scheduled_run(now: _dt.datetime, hours: list[int]) -> _dt.datetime:
+    """Return the latest scheduled hour at or before ``now`` (UTC)."""
+
+    candidates = [
+        now.replace(hour=hour, minute=0, second=0, microsecond=0) - _dt.timedelta(days=days)
+        for hour in hours
+        for days in (0, 1)
+    ]
+    return max(c for c in candidates if c <= now)
+
+
+def run_once(since: float | None = None) -> None:
+    """Warm every target unless another worker on the host is already doing so.
+
+    With ``since``, also skip if a run on this host started at or after it,
+    so a worker whose timer fires late does not repeat a finished run.
+    """
+
+    with _run_lock() as last_run:
+        if last_run is None or (since is not None and last_run >= since):
+            return
+        if COST_EXPORT_PATHS:
+            from .exports import ingest_exports
+
+            try:
+                summary = ingest_exports(COST_EXPORT_PATHS)
+                logger.info("Ingested %d export rows from %d new export runs", summary["rows"], summary["runs"])
+            except Exception:
+                logger.exception("Error ingesting cost exports")
+        targets = prewarm_targets()
+        started = time.monotonic()
+        errors = prewarm(targets)
+        logger.info(
+            "Pre-warmed %d/%d subscriptions in %.1fs", len(targets) - len(errors), len(targets), time.monotonic() - started
+        )
+
+
+def run_forever(stop: threading.Event | None = None) -> None:
+    """Run :func:`run_once` at every ``PREWARM_HOURS_UTC`` hour until ``stop`` is set."""
+
+    stop = stop or threading.Event()
+    while not stop.wait(seconds_until_next_run(_dt.datetime.now(_dt.timezone.utc), PREWARM_HOURS_UTC)):
+        try:
+            now = _dt.datetime.now(_dt.timezone.utc)
+            run_once(last_scheduled_run(now, PREWARM_HOURS_UTC).timestamp())
+        except Exception:
+            logger.exception("Error in pre-warm run")
+
+
+def start_prewarm_thread() -> threading.Thread:
+    """Start the scheduler on a daemon thread inside the web process."""
+
+    thread = threading.Thread(target=run_forever, name="cost-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-warm the local Azure cost store.")
+    parser.add_argument("--once", action="store_true", help="warm once and exit")
+    parser.add_argument("subscriptions", nargs="*", help="subscription ids (default: configured and recently viewed)")
+    args = parser.parse_args()
+    # As in the web app: backend progress at INFO, the Azure SDK only from WARNING
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logging.getLogger("backend").setLevel(logging.INFO)
+    if args.subscriptions:
+        errors = prewarm(args.subscriptions)
+        raise SystemExit(1 if errors else 0)
+    if args.once:
+        run_once()
+    else:
+        run_forever()
+
+
+if __name__ == "__main__":
+    main()
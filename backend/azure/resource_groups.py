@@ -1,19 +1,29 @@
 """Azure Resource Group management helpers."""
-from azure.mgmt.resource import ResourceManagementClient
+from azure.core.credentials import TokenCredential
 
+from .clients import clients
 from .credentials import get_flask_credential
+from .throttle import PRIORITY_INTERACTIVE
 
 class ResourceGroupManager:
     """Operations for Azure resource groups."""
 
-    def __init__(self, subscription_id: str) -> None:
-        credential = get_flask_credential()
-        self._client = ResourceManagementClient(credential, subscription_id)
+    def __init__(
+        self,
+        subscription_id: str,
+        credential: TokenCredential | None = None,
+        priority: str = PRIORITY_INTERACTIVE,
+    ) -> None:
+        self._credential = credential or get_flask_credential()
+        self._priority = priority
+        self._client = clients.resource_management(subscription_id)
 
     def list_resource_groups(self) -> list[dict]:
         """Return resource groups for the subscription."""
 
-        groups = self._client.resource_groups.list()
+        groups = self._client.resource_groups.list(
+            credential=self._credential, priority=self._priority
+        )
         return [
             {
                 "id": g.id,
@@ -1,18 +1,28 @@
 """Azure resource management helpers."""
-from azure.mgmt.resource import ResourceManagementClient
+from azure.core.credentials import TokenCredential
+from .clients import clients
 from .credentials import get_flask_credential
+from .throttle import PRIORITY_INTERACTIVE
 
 class ResourceManager:
     """Operations for Azure resources within a subscription."""
 
-    def __init__(self, subscription_id: str) -> None:
-        credential = get_flask_credential()
-        self._client = ResourceManagementClient(credential, subscription_id)
+    def __init__(
+        self,
+        subscription_id: str,
+        credential: TokenCredential | None = None,
+        priority: str = PRIORITY_INTERACTIVE,
+    ) -> None:
+        self._credential = credential or get_flask_credential()
+        self._priority = priority
+        self._client = clients.resource_management(subscription_id)
 
     def list_resources(self) -> list[dict]:
         """List resources for the subscription."""
 
-        resources = self._client.resources.list()
+        resources = self._client.resources.list(
+            credential=self._credential, priority=self._priority
+        )
         return [
             {
                 "id": r.id,
@@ -0,0 +1,208 @@
+"""Materialized rollups of stored daily costs with prefix sums over days."""
+
+import datetime as _dt
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from backend.metrics import cache_requests
+
+from . import analytics
+from .store import cost_store
+
+# Days added past the requested end when an axis grows, so the days that
+# land next fit without reallocating
+_PAD_DAYS = 31
+
+
+class _Cube:
+    """Cumulative (group x day) costs and row counts for one scope and grouping.
+
+    Column ``j`` of ``cumulative`` holds the sum of days ``0..j-1``, so a
+    range total is one subtraction per group.
+    """
+
+    def __init__(self, days: np.ndarray) -> None:
+        self.days = days
+        self.groups: list[str] = []
+        self.index: dict[str, int] = {}
+        self.cumulative = np.zeros((0, len(days) + 1))
+        self.counts = np.zeros((0, len(days) + 1), dtype=np.int64)
+        self.fetched = np.full(len(days), np.nan)
+        self.version: float | None = None
+
+    def add_groups(self, names: list[str]) -> None:
+        new = [name for name in dict.fromkeys(names) if name not in self.index]
+        if not new:
+            return
+        for name in new:
+            self.index[name] = len(self.groups)
+            self.groups.append(name)
+        # A new group's prefix sums are zero up to the days it is loaded for
+        self.cumulative = np.vstack((self.cumulative, np.zeros((len(new), self.cumulative.shape[1]))))
+        self.counts = np.vstack((self.counts, np.zeros((len(new), self.counts.shape[1]), dtype=np.int64)))
+
+    def columns(self, start: _dt.date, end: _dt.date) -> tuple[int, int]:
+        """Return the prefix columns bounding [start, end]."""
+
+        lo = int((np.datetime64(start, "D") - self.days[0]).astype(np.int64))
+        hi = int((np.datetime64(end, "D") - self.days[0]).astype(np.int64))
+        return lo, hi + 1
+
+
+class RollupCube:
+    """Per-group range totals over the local cost store, kept up to date incrementally.
+
+    Each (scope, grouping) keeps prefix sums of its daily costs in memory.
+    A query first compares the store's version for the axis; only when rows
+    changed are the days whose ``fetched_at`` moved reloaded and the prefix
+    sums recomputed from the earliest of them. Range totals and top-N are
+    then answered in O(groups) without reading any rows. A cube's day axis
+    grows to cover new ranges up to ``max_days``; past that it is rebuilt
+    around the range asked for.
+    """
+
+    def __init__(self, max_cubes: int, max_days: int) -> None:
+        self._max_cubes = max_cubes
+        self._max_days = max_days
+        self._cubes: OrderedDict[tuple[str, str], _Cube] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def totals(self, scope: str, grouping: str, start: _dt.date, end: _dt.date) -> dict[str, float]:
+        """Return total cost per group with rows in [start, end], ordered by group name."""
+
+        with self._lock:
+            cube = self._update(scope, grouping, start, end)
+            lo, hi = cube.columns(start, end)
+            totals = (cube.cumulative[:, hi] - cube.cumulative[:, lo]).tolist()
+            present = (cube.counts[:, hi] > cube.counts[:, lo]).tolist()
+            groups = cube.groups
+        return {groups[i]: totals[i] for i in sorted(range(len(groups)), key=groups.__getitem__) if present[i]}
+
+    def top(self, scope: str, grouping: str, start: _dt.date, end: _dt.date, limit: int) -> dict:
+        """Return the ``limit`` most expensive groups in [start, end] and the rest combined."""
+
+        with self._lock:
+            cube = self._update(scope, grouping, start, end)
+            lo, hi = cube.columns(start, end)
+            totals = cube.cumulative[:, hi] - cube.cumulative[:, lo]
+            present = np.flatnonzero(cube.counts[:, hi] > cube.counts[:, lo])
+            groups = cube.groups
+        totals = totals[present]
+        if len(totals) > limit:
+            # Only the top `limit` are sorted
+            best = np.argpartition(-totals, limit - 1)[:limit]
+        else:
+            best = np.arange(len(totals))
+        best = best[np.argsort(-totals[best], kind="stable")]
+        total = float(totals.sum())
+        top_total = float(totals[best].sum())
+        return {
+            "total": total,
+            "group_count": len(totals),
+            "groups": [(groups[present[i]], float(totals[i])) for i in best.tolist()],
+            "other": total - top_total,
+        }
+
+    def daily(self, scope: str, grouping: str, start: _dt.date, end: _dt.date) -> tuple[np.ndarray, np.ndarray]:
+        """Return every day in [start, end] and its total cost across groups."""
+
+        with self._lock:
+            cube = self._update(scope, grouping, start, end)
+            lo, hi = cube.columns(start, end)
+            prefix = cube.cumulative[:, lo:hi + 1].sum(axis=0)
+            days = cube.days[lo:hi]
+        return days, np.diff(prefix)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cubes.clear()
+
+    def _update(self, scope: str, grouping: str, start: _dt.date, end: _dt.date) -> _Cube:
+        # Caller must hold self._lock
+        key = (scope, grouping)
+        cube = self._cubes.get(key)
+        first, last = np.datetime64(start, "D"), np.datetime64(end, "D")
+        if cube is None or first < cube.days[0] or last > cube.days[-1]:
+            axis_start = first if cube is None else min(first, cube.days[0])
+            axis_end = max(last, cube.days[-1]) if cube is not None else last
+            if (axis_end - axis_start).astype(np.int64) + _PAD_DAYS >= self._max_days:
+                # Growing would keep days nobody asks for: start over on this range
+                cube, axis_start, axis_end = None, first, last
+            cube = self._realign(cube, np.arange(axis_start, axis_end + _PAD_DAYS + 1))
+            self._cubes[key] = cube
+        self._cubes.move_to_end(key)
+        while len(self._cubes) > self._max_cubes:
+            self._cubes.popitem(last=False)
+
+        axis_start = cube.days[0].item()
+        axis_end = cube.days[-1].item()
+        version = cost_store.version(scope, [grouping], axis_start, axis_end)
+        if version == cube.version:
+            cache_requests.inc("rollup", "hit")
+            return cube
+        cache_requests.inc("rollup", "miss")
+
+        fetched_at = cost_store.fetched_days(scope, grouping, axis_start, axis_end)
+        fetched = np.array([fetched_at.get(d, np.nan) for d in analytics.from_days(cube.days).tolist()])
+        dirty = np.flatnonzero(~((fetched == cube.fetched) | (np.isnan(fetched) & np.isnan(cube.fetched))))
+        if len(dirty):
+            lo, hi = int(dirty[0]), int(dirty[-1])
+            self._reload(cube, scope, grouping, lo, hi)
+        cube.fetched = fetched
+        cube.version = version
+        return cube
+
+    @staticmethod
+    def _reload(cube: _Cube, scope: str, grouping: str, lo: int, hi: int) -> None:
+        """Replace days ``lo..hi`` from the store and recompute the prefix sums after them."""
+
+        first = cube.days[lo].item()
+        rows = cost_store.rows(scope, grouping, first, cube.days[hi].item())
+        cube.add_groups([group for _, group, _ in rows])
+
+        width = len(cube.days) - lo
+        daily = np.diff(cube.cumulative[:, lo:], axis=1)
+        counts = np.diff(cube.counts[:, lo:], axis=1)
+        daily[:, :hi - lo + 1] = 0.0
+        counts[:, :hi - lo + 1] = 0
+        if rows:
+            dates, groups, costs = zip(*rows)
+            columns = (analytics.to_days(np.asarray(dates)) - cube.days[lo]).astype(np.int64)
+            index = cube.index
+            cells = np.fromiter((index[g] for g in groups), np.int64, len(groups)) * width + columns
+            size = len(cube.groups) * width
+            daily += np.bincount(cells, weights=costs, minlength=size).reshape(len(cube.groups), width)
+            counts += np.bincount(cells, minlength=size).reshape(len(cube.groups), width)
+        cube.cumulative[:, lo + 1:] = cube.cumulative[:, lo:lo + 1] + np.cumsum(daily, axis=1)
+        cube.counts[:, lo + 1:] = cube.counts[:, lo:lo + 1] + np.cumsum(counts, axis=1)
+
+    @staticmethod
+    def _realign(cube: _Cube | None, days: np.ndarray) -> _Cube:
+        """Return a cube on the ``days`` axis, carrying over the days both share."""
+
+        aligned = _Cube(days)
+        if cube is None:
+            return aligned
+        aligned.groups, aligned.index = cube.groups, cube.index
+        offset = int((cube.days[0] - days[0]).astype(np.int64))
+        span = slice(offset, offset + len(cube.days))
+        daily = np.zeros((len(cube.groups), len(days)))
+        counts = np.zeros((len(cube.groups), len(days)), dtype=np.int64)
+        daily[:, span] = np.diff(cube.cumulative, axis=1)
+        counts[:, span] = np.diff(cube.counts, axis=1)
+        aligned.cumulative = np.hstack((np.zeros((len(cube.groups), 1)), np.cumsum(daily, axis=1)))
+        aligned.counts = np.hstack((np.zeros((len(cube.groups), 1), dtype=np.int64), np.cumsum(counts, axis=1)))
+        aligned.fetched[span] = cube.fetched
+        return aligned
+
+
+def _build_rollup_cube() -> RollupCube:
+    from config import ROLLUP_MAX_CUBES, ROLLUP_MAX_DAYS
+
+    return RollupCube(ROLLUP_MAX_CUBES, ROLLUP_MAX_DAYS)
+
+
+# Shared by every CostAnalyzer in this process
+rollup_cube = _build_rollup_cube()
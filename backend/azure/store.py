@@ -0,0 +1,251 @@
+"""Local SQLite store of daily cost rows with incremental refresh bookkeeping."""
+
+import datetime as _dt
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Iterator
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_costs (
+    scope       TEXT    NOT NULL,
+    grouping    TEXT    NOT NULL,
+    usage_date  INTEGER NOT NULL,
+    group_value TEXT    NOT NULL,
+    cost        REAL    NOT NULL,
+    PRIMARY KEY (scope, grouping, usage_date, group_value)
+);
+CREATE TABLE IF NOT EXISTS fetched_days (
+    scope       TEXT    NOT NULL,
+    grouping    TEXT    NOT NULL,
+    usage_date  INTEGER NOT NULL,
+    fetched_at  REAL    NOT NULL,
+    PRIMARY KEY (scope, grouping, usage_date)
+);
+CREATE TABLE IF NOT EXISTS scope_views (
+    scope       TEXT    PRIMARY KEY,
+    viewed_at   REAL    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ingested_exports (
+    source      TEXT    PRIMARY KEY,
+    signature   TEXT    NOT NULL,
+    ingested_at REAL    NOT NULL
+);
+"""
+
+# Views are only written once per scope and process in this many seconds
+_VIEW_WRITE_INTERVAL = 600
+
+
+def date_key(day: _dt.date) -> int:
+    """Return ``day`` in the ``YYYYMMDD`` integer form Cost Management uses."""
+
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+def key_date(value: int) -> _dt.date:
+    """Inverse of :func:`date_key`."""
+
+    return _dt.date(value // 10000, value // 100 % 100, value % 100)
+
+
+class CostStore:
+    """Daily cost rows per (scope, grouping), shared by all workers on the host.
+
+    ``grouping`` is the Cost Management dimension the rows are grouped by, or
+    ``""`` for ungrouped daily totals. A day is considered fresh once it has
+    been fetched after its costs settled (``settle_days`` after the day
+    itself); unsettled days are re-fetched at most every ``tail_refresh``
+    seconds.
+    """
+
+    def __init__(self, path: str, settle_days: int, tail_refresh: float) -> None:
+        self._path = path
+        self._settle_days = settle_days
+        self._tail_refresh = tail_refresh
+        self._local = threading.local()
+        self._views_written: dict[str, float] = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def stale_ranges(
+        self, scope: str, grouping: str, start: _dt.date, end: _dt.date
+    ) -> list[tuple[_dt.date, _dt.date]]:
+        """Return contiguous date ranges within [start, end] that need fetching."""
+
+        fetched = self.fetched_days(scope, grouping, start, end)
+        now = time.time()
+        ranges: list[tuple[_dt.date, _dt.date]] = []
+        day = start
+        while day <= end:
+            fetched_at = fetched.get(date_key(day))
+            if fetched_at is None or not self._is_fresh(day, fetched_at, now):
+                if ranges and ranges[-1][1] == day - _dt.timedelta(days=1):
+                    ranges[-1] = (ranges[-1][0], day)
+                else:
+                    ranges.append((day, day))
+            day += _dt.timedelta(days=1)
+        return ranges
+
+    def fetched_days(
+        self, scope: str, grouping: str, start: _dt.date, end: _dt.date
+    ) -> dict[int, float]:
+        """Return when each stored day in [start, end] was last fetched."""
+
+        return dict(
+            self._connect().execute(
+                "SELECT usage_date, fetched_at FROM fetched_days"
+                " WHERE scope = ? AND grouping = ? AND usage_date BETWEEN ? AND ?",
+                (scope, grouping, date_key(start), date_key(end)),
+            )
+        )
+
+    def _is_fresh(self, day: _dt.date, fetched_at: float, now: float) -> bool:
+        settled = _dt.datetime.combine(
+            day + _dt.timedelta(days=self._settle_days), _dt.time.min, tzinfo=_dt.timezone.utc
+        )
+        return fetched_at >= settled.timestamp() or now - fetched_at < self._tail_refresh
+
+    def replace(
+        self,
+        scope: str,
+        grouping: str,
+        start: _dt.date,
+        end: _dt.date,
+        rows: Iterable[tuple[int, str, float]],
+    ) -> None:
+        """Replace every row in [start, end] with ``rows`` and mark the days fetched."""
+
+        lo, hi = date_key(start), date_key(end)
+        now = time.time()
+        days = []
+        day = start
+        while day <= end:
+            days.append((scope, grouping, date_key(day), now))
+            day += _dt.timedelta(days=1)
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM daily_costs"
+                " WHERE scope = ? AND grouping = ? AND usage_date BETWEEN ? AND ?",
+                (scope, grouping, lo, hi),
+            )
+            conn.executemany(
+                "INSERT INTO daily_costs (scope, grouping, usage_date, group_value, cost)"
+                " VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT DO UPDATE SET cost = cost + excluded.cost",
+                ((scope, grouping, d, g, c) for d, g, c in rows if lo <= d <= hi),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO fetched_days (scope, grouping, usage_date, fetched_at)"
+                " VALUES (?, ?, ?, ?)",
+                days,
+            )
+
+    def rows(
+        self, scope: str, grouping: str, start: _dt.date, end: _dt.date
+    ) -> list[tuple[int, str, float]]:
+        """Return stored ``(usage_date, group_value, cost)`` rows ordered by date."""
+
+        return self._connect().execute(
+            "SELECT usage_date, group_value, cost FROM daily_costs"
+            " WHERE scope = ? AND grouping = ? AND usage_date BETWEEN ? AND ?"
+            " ORDER BY usage_date, group_value",
+            (scope, grouping, date_key(start), date_key(end)),
+        ).fetchall()
+
+    def iter_rows(
+        self, scope: str, grouping: str, start: _dt.date, end: _dt.date, batch_rows: int
+    ) -> Iterator[list[tuple[int, str, float]]]:
+        """Like :meth:`rows`, but yield them ``batch_rows`` at a time from one cursor."""
+
+        cursor = self._connect().execute(
+            "SELECT usage_date, group_value, cost FROM daily_costs"
+            " WHERE scope = ? AND grouping = ? AND usage_date BETWEEN ? AND ?"
+            " ORDER BY usage_date, group_value",
+            (scope, grouping, date_key(start), date_key(end)),
+        )
+        while True:
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                return
+            yield rows
+
+    def version(
+        self, scope: str, groupings: list[str], start: _dt.date, end: _dt.date
+    ) -> float | None:
+        """Return when rows of ``groupings`` in [start, end] last changed, if ever fetched."""
+
+        placeholders = ", ".join("?" * len(groupings))
+        row = self._connect().execute(
+            "SELECT MAX(fetched_at) FROM fetched_days"
+            f" WHERE scope = ? AND grouping IN ({placeholders}) AND usage_date BETWEEN ? AND ?",
+            (scope, *groupings, date_key(start), date_key(end)),
+        ).fetchone()
+        return row[0]
+
+    def record_view(self, scope: str) -> None:
+        """Remember that a user looked at ``scope`` (used to pick what to pre-warm)."""
+
+        now = time.time()
+        if now - self._views_written.get(scope, 0.0) < _VIEW_WRITE_INTERVAL:
+            return
+        self._views_written[scope] = now
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO scope_views (scope, viewed_at) VALUES (?, ?)", (scope, now)
+            )
+
+    def recent_scopes(self, max_age: float) -> list[str]:
+        """Return scopes viewed within the last ``max_age`` seconds, most recent first."""
+
+        return [
+            scope
+            for (scope,) in self._connect().execute(
+                "SELECT scope FROM scope_views WHERE viewed_at >= ? ORDER BY viewed_at DESC",
+                (time.time() - max_age,),
+            )
+        ]
+
+    def export_signature(self, source: str) -> str | None:
+        """Return the signature recorded when export ``source`` was last ingested."""
+
+        row = self._connect().execute(
+            "SELECT signature FROM ingested_exports WHERE source = ?", (source,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def record_export(self, source: str, signature: str) -> None:
+        """Remember that export ``source`` was ingested in the state ``signature``."""
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ingested_exports (source, signature, ingested_at)"
+                " VALUES (?, ?, ?)",
+                (source, signature, time.time()),
+            )
+
+
+def _build_cost_store() -> CostStore:
+    from config import COST_SETTLE_DAYS, COST_STORE_PATH, COST_TAIL_REFRESH_SECONDS
+
+    return CostStore(COST_STORE_PATH, COST_SETTLE_DAYS, COST_TAIL_REFRESH_SECONDS)
+
+
+# Shared by every CostAnalyzer in this process
+cost_store = _build_cost_store()
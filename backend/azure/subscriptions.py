@@ -1,17 +1,24 @@
 """Azure subscription management utilities."""
-from azure.mgmt.resource import SubscriptionClient
+from azure.core.credentials import TokenCredential
+from .clients import clients
 from .credentials import get_flask_credential
+from .throttle import PRIORITY_INTERACTIVE
 class SubscriptionManager:
     """Helper class for Azure subscription operations."""
 
-    def __init__(self) -> None:
-        credential = get_flask_credential()
-        self._client = SubscriptionClient(credential)
+    def __init__(
+        self, credential: TokenCredential | None = None, priority: str = PRIORITY_INTERACTIVE
+    ) -> None:
+        self._credential = credential or get_flask_credential()
+        self._priority = priority
+        self._client = clients.subscriptions()
 
     def list_subscriptions(self) -> list[dict]:
         """Return all subscriptions available for the signed-in user."""
 
-        subs = self._client.subscriptions.list()
+        subs = self._client.subscriptions.list(
+            credential=self._credential, priority=self._priority
+        )
         return [
             {
                 "subscription_id": sub.subscription_id,
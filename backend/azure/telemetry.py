@@ -0,0 +1,71 @@
+"""Latency metrics for every Azure management call."""
+
+import time
+from urllib.parse import urlsplit
+
+from azure.core.pipeline import PipelineRequest, PipelineResponse
+from azure.core.pipeline.policies import SansIOHTTPPolicy
+
+from backend.metrics import azure_request_seconds
+
+# Segments followed by a name that is replaced with {} in operation names
+_NAMED = {"subscriptions", "resourcegroups"}
+
+
+def operation_name(method: str, url: str) -> str:
+    """Return ``method`` and ``url``'s path with subscription and resource names as ``{}``."""
+
+    segments = [s.lower() for s in urlsplit(url).path.split("/") if s]
+    template, i, in_provider = [], 0, False
+    while i < len(segments):
+        segment = segments[i]
+        template.append(segment)
+        i += 1
+        if segment == "providers" and i < len(segments):
+            template.append(segments[i])  # the namespace, e.g. microsoft.costmanagement
+            i += 1
+            in_provider = True
+        elif (segment in _NAMED or in_provider) and i < len(segments):
+            # Below a provider, segments alternate between resource type and name
+            template.append("{}")
+            i += 1
+    return f"{method} /" + "/".join(template)
+
+
+def scope_of(url: str) -> str:
+    """Return ``subscriptions/<id>`` for subscription-scoped URLs, else ``tenant``."""
+
+    segments = [s for s in urlsplit(url).path.split("/") if s]
+    if len(segments) > 1 and segments[0].lower() == "subscriptions":
+        return f"subscriptions/{segments[1].lower()}"
+    return "tenant"
+
+
+class MetricsPolicy(SansIOHTTPPolicy):
+    """Time each call from the first attempt to the final response.
+
+    Runs ahead of the rate limiter, so queueing, retries and token
+    acquisition are all included.
+    """
+
+    def on_request(self, request: PipelineRequest) -> None:
+        request.context["metrics_started"] = time.perf_counter()
+
+    def on_response(self, request: PipelineRequest, response: PipelineResponse) -> None:
+        self._observe(request, str(response.http_response.status_code))
+
+    def on_exception(self, request: PipelineRequest) -> None:
+        self._observe(request, "error")
+
+    @staticmethod
+    def _observe(request: PipelineRequest, status: str) -> None:
+        started = request.context.get("metrics_started")
+        if started is None:
+            return
+        url = request.http_request.url
+        azure_request_seconds.observe(
+            time.perf_counter() - started,
+            operation_name(request.http_request.method, url),
+            scope_of(url),
+            status,
+        )
@@ -0,0 +1,273 @@
+"""Client-side rate limiting, prioritization and retry for Azure management calls.
+
+Every request passes through :class:`ThrottlePolicy` (or its async twin),
+which takes a token from the bucket of the quota it counts against: Cost
+Management queries and other ARM reads are limited per subscription. The
+buckets are slowed down by the ``x-ms-ratelimit-*`` and ``Retry-After``
+headers the service returns. Interactive requests may drain a bucket;
+background requests (``priority="background"``) only run while a reserve
+is left, so they queue behind users. Throttled and transient failures are
+retried with jittered exponential backoff. Interactive requests give up
+once their waits would exceed ``AZURE_INTERACTIVE_WAIT_SECONDS``, so a user
+gets a 429 with ``Retry-After`` instead of a request that hangs.
+"""
+
+import asyncio
+import math
+import random
+import re
+import threading
+import time
+
+from azure.core.exceptions import HttpResponseError
+from azure.core.pipeline import PipelineRequest, PipelineResponse
+from azure.core.pipeline.policies import AsyncHTTPPolicy, HTTPPolicy
+
+from backend.metrics import azure_retries, azure_throttle_wait_seconds
+from config import (
+    AZURE_ARM_RATE_PER_SECOND,
+    AZURE_BACKGROUND_RESERVE,
+    AZURE_COST_RATE_PER_SECOND,
+    AZURE_INTERACTIVE_WAIT_SECONDS,
+    AZURE_MANAGEMENT_URL,
+    AZURE_MAX_RETRIES,
+    AZURE_RATE_BURST,
+)
+
+from .telemetry import MetricsPolicy
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+
+_RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+_RETRY_AFTER_HEADERS = (
+    "retry-after",
+    "x-ms-ratelimit-microsoft.costmanagement-entity-retry-after",
+    "x-ms-ratelimit-microsoft.costmanagement-tenant-retry-after",
+    "x-ms-ratelimit-microsoft.costmanagement-client-retry-after",
+)
+_REMAINING_HEADERS = (
+    "x-ms-ratelimit-microsoft.costmanagement-qpu-remaining",
+    "x-ms-ratelimit-remaining-subscription-reads",
+    "x-ms-ratelimit-remaining-tenant-reads",
+)
+_SUBSCRIPTION_RE = re.compile(r"/subscriptions/([^/?]+)", re.IGNORECASE)
+
+
+class ThrottleBudgetExceeded(HttpResponseError):
+    """An interactive request would wait longer than its budget for a rate limit slot.
+
+    Raised before the request is sent; it reads as a 429 whose
+    ``retry_after`` is when the slot would have come up.
+    """
+
+    def __init__(self, wait: float) -> None:
+        self.retry_after = max(1, math.ceil(wait))
+        super().__init__(f"Rate limit reached, retry in {self.retry_after}s")
+        self.status_code = 429
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of blocking.
+
+    Tokens may go negative: each reservation is queued behind earlier ones
+    and told how long to wait, so sync and async callers can share a bucket.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, floor: float = 0.0) -> float:
+        """Take a token and return the seconds to wait before using it.
+
+        ``floor`` tokens are kept back for higher-priority callers.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            wait = max(0.0, (floor + 1 - self._tokens) / self._rate, self._paused_until - now)
+            self._tokens -= 1
+            return wait
+
+    def release(self) -> None:
+        """Return a reserved token that will not be used."""
+
+        with self._lock:
+            self._tokens = min(self._capacity, self._tokens + 1)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every reservation for ``seconds`` (server asked us to back off)."""
+
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def drain(self) -> None:
+        """Drop the remaining burst when the server reports its quota is exhausted."""
+
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0)
+
+
+class RateLimiter:
+    """Token buckets per (API, subscription) quota."""
+
+    def __init__(self) -> None:
+        self._buckets: dict[tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        api = _api(url)
+        match = _SUBSCRIPTION_RE.search(url)
+        key = (api, match.group(1).lower() if match else "tenant")
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate = AZURE_COST_RATE_PER_SECOND if api == "costmanagement" else AZURE_ARM_RATE_PER_SECOND
+                bucket = self._buckets[key] = TokenBucket(rate, AZURE_RATE_BURST)
+            return bucket
+
+
+rate_limiter = RateLimiter()
+
+
+def _api(url: str) -> str:
+    return "costmanagement" if "/providers/microsoft.costmanagement/" in url.lower() else "arm"
+
+
+def _deadline(request: PipelineRequest) -> float:
+    """Return the monotonic time an interactive request must stop waiting by (inf for background)."""
+
+    priority = request.context.setdefault(
+        "priority", request.context.options.pop("priority", PRIORITY_INTERACTIVE)
+    )
+    if priority == PRIORITY_BACKGROUND:
+        return math.inf
+    return time.monotonic() + AZURE_INTERACTIVE_WAIT_SECONDS
+
+
+def _reserve(request: PipelineRequest, deadline: float) -> tuple[TokenBucket, float]:
+    priority = request.context["priority"]
+    bucket = rate_limiter.bucket_for(request.http_request.url)
+    floor = AZURE_RATE_BURST * AZURE_BACKGROUND_RESERVE if priority == PRIORITY_BACKGROUND else 0.0
+    wait = bucket.reserve(floor)
+    if time.monotonic() + wait > deadline:
+        bucket.release()
+        raise ThrottleBudgetExceeded(wait)
+    azure_throttle_wait_seconds.observe(wait, _api(request.http_request.url), priority)
+    return bucket, wait
+
+
+def _retry_after(response: PipelineResponse) -> float | None:
+    headers = response.http_response.headers
+    for name in _RETRY_AFTER_HEADERS:
+        value = headers.get(name)
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                continue
+    return None
+
+
+def _observe(bucket: TokenBucket, response: PipelineResponse) -> None:
+    """Feed quota headers back into the bucket."""
+
+    headers = response.http_response.headers
+    for name in _REMAINING_HEADERS:
+        value = headers.get(name)
+        if value is not None and value.strip() in ("0", "0.0"):
+            bucket.drain()
+    delay = _retry_after(response)
+    if delay is not None and response.http_response.status_code == 429:
+        bucket.pause(delay)
+
+
+def _backoff(response: PipelineResponse, attempt: int) -> float:
+    delay = _retry_after(response)
+    if delay is not None:
+        return delay + random.uniform(0, 1)
+    # Full jitter: spread retries out so throttled workers do not stampede
+    return random.uniform(0, min(30.0, 2.0 ** attempt))
+
+
+def _retry_delay(response: PipelineResponse, attempt: int, deadline: float) -> float | None:
+    """Return how long to back off before retrying, or None to hand ``response`` back.
+
+    A retry that would run past ``deadline`` is not attempted: the caller
+    gets the 429 (with its ``Retry-After``) or 5xx instead.
+    """
+
+    status = response.http_response.status_code
+    if status not in _RETRY_STATUSES or attempt >= AZURE_MAX_RETRIES:
+        return None
+    delay = _backoff(response, attempt)
+    if time.monotonic() + delay > deadline:
+        return None
+    azure_retries.inc(_api(response.http_request.url), str(status))
+    return delay
+
+
+class ThrottlePolicy(HTTPPolicy):
+    """Rate limit, prioritize and retry a request (sync pipelines)."""
+
+    def send(self, request: PipelineRequest) -> PipelineResponse:
+        deadline = _deadline(request)
+        attempt = 0
+        while True:
+            bucket, wait = _reserve(request, deadline)
+            if wait:
+                time.sleep(wait)
+            response = self.next.send(request)
+            _observe(bucket, response)
+            delay = _retry_delay(response, attempt, deadline)
+            if delay is None:
+                return response
+            time.sleep(delay)
+            attempt += 1
+
+
+class AsyncThrottlePolicy(AsyncHTTPPolicy):
+    """Rate limit, prioritize and retry a request (async pipelines)."""
+
+    async def send(self, request: PipelineRequest) -> PipelineResponse:
+        deadline = _deadline(request)
+        attempt = 0
+        while True:
+            bucket, wait = _reserve(request, deadline)
+            if wait:
+                await asyncio.sleep(wait)
+            response = await self.next.send(request)
+            _observe(bucket, response)
+            delay = _retry_delay(response, attempt, deadline)
+            if delay is None:
+                return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+def client_kwargs() -> dict:
+    """Keyword arguments that route a sync management client through the limiter."""
+
+    # The SDK's own RetryPolicy keeps connection retries; status retries are ours
+    return {
+        "base_url": AZURE_MANAGEMENT_URL,
+        "per_call_policies": [MetricsPolicy(), ThrottlePolicy()],
+        "retry_status": 0,
+    }
+
+
+def async_client_kwargs() -> dict:
+    """Keyword arguments that route an async management client through the limiter."""
+
+    return {
+        "base_url": AZURE_MANAGEMENT_URL,
+        "per_call_policies": [MetricsPolicy(), AsyncThrottlePolicy()],
+        "retry_status": 0,
+    }
@@ -0,0 +1,312 @@
+"""In-process counters and histograms rendered in the Prometheus text format.
+
+Every gunicorn worker counts its own requests. When ``METRICS_PATH`` is set
+each worker also publishes its totals to a SQLite file every
+``METRICS_PUBLISH_SECONDS``, so ``/metrics`` on any worker reports the sum
+over all live workers on the host.
+"""
+
+import bisect
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+FAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# {metric name: {label values (JSON list): values}}
+Snapshot = dict[str, dict[str, list[float]]]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._series: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def _width(self) -> int:
+        raise NotImplementedError
+
+    def _values(self, labels: tuple[str, ...]) -> list[float]:
+        # Caller must hold self._lock
+        values = self._series.get(labels)
+        if values is None:
+            if len(labels) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {labels}")
+            values = self._series[labels] = [0.0] * self._width()
+        return values
+
+    def snapshot(self) -> dict[str, list[float]]:
+        with self._lock:
+            return {json.dumps(labels): list(values) for labels, values in self._series.items()}
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label set."""
+
+    kind = "counter"
+
+    def _width(self) -> int:
+        return 1
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values(labels)[0] += amount
+
+    def samples(self, labels: dict[str, str], values: list[float]) -> Iterator[tuple[str, dict[str, str], float]]:
+        yield self.name + "_total", labels, values[0]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative ``le`` buckets per label set."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: tuple[str, ...], buckets: tuple[float, ...]
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def _width(self) -> int:
+        # One count per bucket plus +Inf, then the sum
+        return len(self.buckets) + 2
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            values = self._values(labels)
+            values[bisect.bisect_left(self.buckets, value)] += 1
+            values[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Observe how long the ``with`` block takes."""
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self, labels: dict[str, str], values: list[float]) -> Iterator[tuple[str, dict[str, str], float]]:
+        cumulative = 0.0
+        for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+            cumulative += count
+            yield self.name + "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+        yield self.name + "_sum", labels, values[-1]
+        yield self.name + "_count", labels, cumulative
+
+
+class Registry:
+    """The set of metrics one process exposes."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> Snapshot:
+        """Return every series' current values."""
+
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def render(self, snapshot: Snapshot | None = None) -> str:
+        """Return ``snapshot`` (default: this process) in the Prometheus text format."""
+
+        snapshot = self.snapshot() if snapshot is None else snapshot
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, values in sorted(snapshot.get(name, {}).items()):
+                labels = dict(zip(metric.labelnames, json.loads(key)))
+                for sample, sample_labels, value in metric.samples(labels, values):
+                    lines.append(f"{sample}{_format_labels(sample_labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+def merge(snapshots: list[Snapshot]) -> Snapshot:
+    """Sum several processes' snapshots series by series."""
+
+    merged: Snapshot = {}
+    for snapshot in snapshots:
+        for name, series in snapshot.items():
+            target = merged.setdefault(name, {})
+            for key, values in series.items():
+                current = target.get(key)
+                target[key] = list(values) if current is None else [a + b for a, b in zip(current, values)]
+    return merged
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":  # os.kill would terminate the process
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:  # exists but belongs to someone else
+        return True
+    return True
+
+
+class MetricsStore:
+    """Latest snapshot of each worker process, shared through SQLite."""
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots (pid INTEGER PRIMARY KEY, snapshot TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def publish(self, pid: int, snapshot: Snapshot) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (pid, snapshot, updated_at) VALUES (?, ?, ?)",
+                (pid, json.dumps(snapshot), time.time()),
+            )
+
+    def collect(self) -> list[Snapshot]:
+        """Return the snapshots of live workers, forgetting exited ones."""
+
+        conn = self._connect()
+        snapshots, dead = [], []
+        for pid, snapshot in conn.execute("SELECT pid, snapshot FROM snapshots").fetchall():
+            if _pid_alive(pid):
+                snapshots.append(json.loads(snapshot))
+            else:
+                dead.append((pid,))
+        if dead:
+            # Their totals drop out, which Prometheus treats as a counter reset
+            with conn:
+                conn.executemany("DELETE FROM snapshots WHERE pid = ?", dead)
+        return snapshots
+
+
+class MetricsPublisher:
+    """Publishes this process's snapshot and reports the host-wide totals."""
+
+    def __init__(self, registry: Registry, store: MetricsStore | None, interval: float) -> None:
+        self._registry = registry
+        self._store = store
+        self._interval = interval
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start publishing on a daemon thread (once per process)."""
+
+        with self._lock:
+            if self._store is None or self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name="metrics-publisher", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self._interval)
+            try:
+                self._store.publish(os.getpid(), self._registry.snapshot())
+            except Exception:
+                logger.exception("Error publishing metrics")
+
+    def render(self) -> str:
+        """Return the exposition text for every worker (or just this one)."""
+
+        if self._store is None:
+            return self._registry.render()
+        snapshot = self._registry.snapshot()
+        self._store.publish(os.getpid(), snapshot)
+        return self._registry.render(merge(self._store.collect()))
+
+
+registry = Registry()
+
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "Time to handle an HTTP request.", ("method", "route", "status")
+)
+json_serialize_seconds = registry.histogram(
+    "json_serialize_duration_seconds", "Time spent encoding JSON responses.", ("route",), FAST_BUCKETS
+)
+azure_request_seconds = registry.histogram(
+    "azure_request_duration_seconds",
+    "Azure management calls, including rate limiter waits and retries.",
+    ("operation", "scope", "status"),
+)
+azure_throttle_wait_seconds = registry.histogram(
+    "azure_throttle_wait_seconds", "Time requests waited for the client-side rate limiter.", ("api", "priority")
+)
+azure_retries = registry.counter(
+    "azure_request_retries", "Azure requests retried after a throttled or transient response.", ("api", "status")
+)
+cache_requests = registry.counter("cache_requests", "Cache lookups by outcome.", ("cache", "result"))
+logged_errors = registry.counter("logged_errors", "Errors logged by the application.", ("logger", "route"))
+token_seconds = registry.histogram(
+    "msal_token_duration_seconds", "Time to acquire an access token from MSAL.", ("flow", "result")
+)
+
+
+def _build_publisher() -> MetricsPublisher:
+    from config import METRICS_PATH, METRICS_PUBLISH_SECONDS
+
+    return MetricsPublisher(registry, MetricsStore(METRICS_PATH) if METRICS_PATH else None, METRICS_PUBLISH_SECONDS)
+
+
+publisher = _build_publisher()
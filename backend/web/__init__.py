@@ -0,0 +1 @@
+# HTTP delivery: static assets, caching and compression
@@ -0,0 +1,86 @@
+"""Response compression: brotli when the client and server support it, else gzip."""
+
+import gzip
+import zlib
+from typing import Iterable, Iterator
+
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:  # optional dependency; gzip alone is fine
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/javascript",
+    "image/svg+xml",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+}
+# Below this size the headers outweigh the savings
+MIN_COMPRESS_SIZE = 512
+
+
+def negotiate_encoding() -> str | None:
+    """Return the best encoding the current request accepts, or ``None``."""
+
+    if brotli is not None and request.accept_encodings["br"]:
+        return "br"
+    if request.accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: str, best: bool = False) -> bytes:
+    """Compress ``data``; ``best`` trades CPU for size when the result is reused."""
+
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if best else 5)
+    return gzip.compress(data, compresslevel=9 if best else 6)
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """Compress a streamed body, flushing after every chunk so the client sees progress."""
+
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=5)
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+        return
+    # wbits=31 writes a gzip header and trailer
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def init_compression(app: Flask) -> None:
+    """Compress eligible responses of ``app`` after every other hook has run."""
+
+    @app.after_request
+    def compress_response(response: Response) -> Response:
+        response.vary.add("Accept-Encoding")
+        if (
+            response.status_code != 200
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.content_length is None
+            or response.content_length < MIN_COMPRESS_SIZE
+        ):
+            return response
+        encoding = negotiate_encoding()
+        if encoding is None:
+            return response
+        response.set_data(compress(response.get_data(), encoding))
+        response.headers["Content-Encoding"] = encoding
+        # The bytes differ per encoding, so a strong validator would be wrong here
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,133 @@
+"""Row-batch encoders for streamed cost exports: CSV, NDJSON and Parquet.
+
+Each encoder takes ``(subscription_id, CostFrame)`` batches and yields the
+encoded bytes batch by batch, so an export never holds more than one batch
+(or one Parquet row group) in memory.
+"""
+
+import csv
+import io
+import json
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from backend.azure import analytics
+from backend.azure.frame import CostFrame
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency; only needed for format=parquet
+    pa = None
+
+EXPORT_MIMETYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+# Parquet row groups are written once this many rows are buffered
+PARQUET_ROW_GROUP_ROWS = 65536
+
+Batches = Iterable[tuple[str, CostFrame]]
+
+
+def export_columns(group_by: list[str]) -> list[str]:
+    return ["subscription_id", "date", *group_by, "cost"]
+
+
+def _columns(subscription_id: str, frame: CostFrame, group_by: list[str]) -> list[list]:
+    """Return the batch as columns in :func:`export_columns` order, dates as ISO strings."""
+
+    dates = analytics.to_days(frame.dates).astype(str).tolist()
+    groups = [frame.groups[name].tolist() for name in group_by]
+    return [[subscription_id] * len(frame), dates, *groups, frame.costs.tolist()]
+
+
+def encode_csv(batches: Batches, group_by: list[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(export_columns(group_by))
+    for subscription_id, frame in batches:
+        writer.writerows(zip(*_columns(subscription_id, frame, group_by)))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def encode_ndjson(batches: Batches, group_by: list[str]) -> Iterator[bytes]:
+    fields = export_columns(group_by)
+    for subscription_id, frame in batches:
+        rows = zip(*_columns(subscription_id, frame, group_by))
+        yield "".join(json.dumps(dict(zip(fields, row))) + "\n" for row in rows).encode()
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands its bytes to the caller instead of keeping them."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def encode_parquet(batches: Batches, group_by: list[str]) -> Iterator[bytes]:
+    """Write one row group per ``PARQUET_ROW_GROUP_ROWS`` rows, yielding it once written."""
+
+    schema = pa.schema(
+        [("subscription_id", pa.string()), ("date", pa.date32())]
+        + [(name, pa.string()) for name in group_by]
+        + [("cost", pa.float64())]
+    )
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema)
+    pending: list[CostFrame] = []
+    pending_rows = 0
+
+    def row_group(subscription_id: str) -> bytes:
+        frame = CostFrame(
+            analytics.to_days(np.concatenate([f.dates for f in pending])),
+            np.concatenate([f.costs for f in pending]),
+            {name: np.concatenate([f.groups[name] for f in pending]) for name in group_by},
+        )
+        columns = [pa.array([subscription_id] * len(frame), pa.string()), pa.array(frame.dates)]
+        columns += [pa.array(frame.groups[name], pa.string()) for name in group_by]
+        columns.append(pa.array(frame.costs))
+        writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+        pending.clear()
+        return sink.drain()
+
+    current = None
+    for subscription_id, frame in batches:
+        # A row group holds one subscription, so its id column stays a single run
+        if pending and (subscription_id != current or pending_rows >= PARQUET_ROW_GROUP_ROWS):
+            yield row_group(current)
+            pending_rows = 0
+        current = subscription_id
+        if len(frame):
+            pending.append(frame)
+            pending_rows += len(frame)
+    if pending:
+        yield row_group(current)
+    writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson, "parquet": encode_parquet}
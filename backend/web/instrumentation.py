@@ -0,0 +1,79 @@
+"""Request latency, JSON encoding and error metrics, and the ``/metrics`` endpoint."""
+
+import hmac
+import logging
+import time
+
+from flask import Flask, Response, abort, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+from backend.metrics import http_request_seconds, json_serialize_seconds, logged_errors, publisher
+
+
+def _route() -> str:
+    # The rule, not the path, so ids in URLs do not create new series
+    if not has_request_context():
+        return ""
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, timing every ``dumps`` by route."""
+
+    def dumps(self, obj: object, **kwargs: object) -> str:
+        with json_serialize_seconds.time(_route()):
+            return super().dumps(obj, **kwargs)
+
+
+class ErrorCountingHandler(logging.Handler):
+    """Count every error logged under the app's loggers, by logger and route."""
+
+    def __init__(self) -> None:
+        super().__init__(logging.ERROR)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logged_errors.inc(record.name, _route())
+
+
+def init_instrumentation(app: Flask) -> None:
+    """Time every request and serve the metrics at ``/metrics``.
+
+    Register before other ``after_request`` hooks (such as compression) so
+    their time is included. Scrapers must present ``METRICS_TOKEN``; without
+    one, ``/metrics`` is only served by the debug server.
+    """
+
+    from config import METRICS_TOKEN
+
+    app.json = TimedJSONProvider(app)
+    logging.getLogger("backend").addHandler(ErrorCountingHandler())
+
+    @app.before_request
+    def start_timer() -> None:
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_latency(response: Response) -> Response:
+        started = g.pop("request_started", None)
+        if started is not None:
+            http_request_seconds.observe(
+                time.perf_counter() - started, request.method, _route(), str(response.status_code)
+            )
+        return response
+
+    @app.route("/metrics")
+    def metrics() -> Response:
+        # Labels carry subscription ids, so they are never served unauthenticated in production
+        if not METRICS_TOKEN:
+            if not app.debug:
+                abort(404)
+        else:
+            supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+            if not hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode()):
+                return Response("Unauthorized\n", status=401, mimetype="text/plain")
+        response = Response(publisher.render(), mimetype="text/plain")
+        response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    publisher.start()
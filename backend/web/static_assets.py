@@ -0,0 +1,131 @@
+"""In-memory, pre-compressed frontend assets served under content-hashed names.
+
+``app.js`` is also reachable as ``app.<hash>.js``; pages reference the hashed
+names, which never change content and can be cached by browsers for a year.
+Unhashed names (and the pages themselves) are revalidated with their ETag.
+Brotli and gzip variants are compressed once, on first request, so serving
+a file is a dict lookup and startup does no compression.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+from flask import Response, abort, request
+
+from .compression import (
+    COMPRESSIBLE_MIMETYPES,
+    MIN_COMPRESS_SIZE,
+    compress,
+    negotiate_encoding,
+)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class _Asset:
+    """One file's bytes and the headers derived from them."""
+
+    def __init__(self, body: bytes, mimetype: str, etag: str, hashed_name: str) -> None:
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = etag
+        self.hashed_name = hashed_name
+        self.compressible = mimetype in COMPRESSIBLE_MIMETYPES and len(body) >= MIN_COMPRESS_SIZE
+        self._encoded: dict[str, bytes] = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        """Return the body in ``encoding``, compressing it on first use only."""
+
+        body = self._encoded.get(encoding)
+        if body is None:
+            # Racing threads compute the same bytes; either result may be kept
+            body = self._encoded[encoding] = compress(self.body, encoding, best=True)
+        return body
+
+
+class StaticAssets:
+    """Files of one directory, hashed and held in memory.
+
+    With ``auto_reload`` (debug mode) the directory is re-read when a file
+    changes.
+    """
+
+    def __init__(self, directory: str, auto_reload: bool = False) -> None:
+        self._directory = directory
+        self._auto_reload = auto_reload
+        self._assets: dict[str, _Asset] = {}
+        self._by_hashed_name: dict[str, str] = {}
+        self._mtimes: dict[str, float] = {}
+        self._load()
+
+    def _files(self) -> dict[str, str]:
+        files = {}
+        for root, _, names in os.walk(self._directory):
+            for name in names:
+                path = os.path.join(root, name)
+                files[os.path.relpath(path, self._directory).replace(os.sep, "/")] = path
+        return files
+
+    def _load(self) -> None:
+        files = self._files()
+        self._mtimes = {name: os.path.getmtime(path) for name, path in files.items()}
+        contents = {}
+        for name, path in files.items():
+            with open(path, "rb") as handle:
+                contents[name] = handle.read()
+
+        assets = {}
+        # Hash the assets pages link to first, then point the pages at the hashed names
+        pages = [name for name in contents if name.endswith(".html")]
+        for name in [n for n in contents if n not in pages] + pages:
+            body = contents[name]
+            if name in pages:
+                body = self._link_hashed(body, assets)
+            assets[name] = self._asset(name, body)
+        self._assets = assets
+        self._by_hashed_name = {asset.hashed_name: name for name, asset in assets.items()}
+
+    @staticmethod
+    def _asset(name: str, body: bytes) -> _Asset:
+        digest = hashlib.sha256(body).hexdigest()
+        stem, ext = os.path.splitext(name)
+        mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        return _Asset(body, mimetype, digest[:32], f"{stem}.{digest[:10]}{ext}")
+
+    @staticmethod
+    def _link_hashed(page: bytes, assets: dict[str, _Asset]) -> bytes:
+        def replace(match: re.Match) -> bytes:
+            asset = assets.get(match.group(2).decode())
+            if asset is None:
+                return match.group(0)
+            return match.group(1) + asset.hashed_name.encode() + match.group(3)
+
+        return re.sub(rb'((?:href|src)=")([^"/:]+)(")', replace, page)
+
+    def _reload_if_changed(self) -> None:
+        files = self._files()
+        if files.keys() != self._mtimes.keys() or any(
+            os.path.getmtime(path) != self._mtimes[name] for name, path in files.items()
+        ):
+            self._load()
+
+    def response(self, name: str) -> Response:
+        """Serve ``name`` (plain or hashed) with validators and cache headers, or 404."""
+
+        if self._auto_reload:
+            self._reload_if_changed()
+        hashed = name in self._by_hashed_name
+        asset = self._assets.get(self._by_hashed_name.get(name, name))
+        if asset is None:
+            abort(404)
+        encoding = negotiate_encoding() if asset.compressible else None
+        if encoding is None:
+            response = Response(asset.body, mimetype=asset.mimetype)
+            response.set_etag(asset.etag)
+        else:
+            response = Response(asset.encoded(encoding), mimetype=asset.mimetype)
+            response.headers["Content-Encoding"] = encoding
+            response.set_etag(asset.etag, weak=True)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if hashed else "no-cache"
+        return response.make_conditional(request)
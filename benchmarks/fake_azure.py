@@ -0,0 +1,356 @@
+"""A local stand-in for the Azure Resource Manager and Cost Management APIs.
+
+Serves the subscription, resource group, resource, Cost Management query and
+Resource Graph calls the app makes, with synthetic but deterministic data,
+configurable latency, pagination and injected 429 throttling::
+
+    python benchmarks/fake_azure.py --port 8081 --query-latency-ms 800 --throttle-rate 0.05
+
+Point the app at it with ``AZURE_MANAGEMENT_URL=http://127.0.0.1:8081`` and
+``AZURE_STATIC_TOKEN=<any value>`` (then ``/auth/login`` signs in without
+MSAL). ``GET /_stats`` returns the number of calls served per operation.
+"""
+
+import argparse
+import datetime as _dt
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+_LOCATIONS = ("westeurope", "northeurope", "eastus", "westus2")
+_SERVICES = (
+    ("Microsoft.Compute/virtualMachines", "Virtual Machines", "Virtual Machines"),
+    ("Microsoft.Storage/storageAccounts", "Storage", "Storage"),
+    ("Microsoft.Sql/servers/databases", "SQL Database", "SQL Database"),
+    ("Microsoft.Web/sites", "Azure App Service", "Azure App Service"),
+    ("Microsoft.Network/publicIPAddresses", "Virtual Network", "Bandwidth"),
+)
+_DIMENSIONS = ("ResourceGroupName", "ResourceId", "ServiceName", "MeterCategory", "ResourceLocation")
+
+
+class FakeTenant:
+    """Deterministic subscriptions, resource groups, resources and their daily costs."""
+
+    def __init__(self, subscriptions: int, resource_groups: int, resources: int) -> None:
+        self.subscription_ids = [f"00000000-0000-4000-8000-{i:012d}" for i in range(subscriptions)]
+        self._resource_groups = resource_groups
+        self._resources = resources
+
+    def subscription(self, subscription_id: str) -> dict:
+        index = self.subscription_ids.index(subscription_id)
+        return {
+            "id": f"/subscriptions/{subscription_id}",
+            "subscriptionId": subscription_id,
+            "displayName": f"Subscription {index}",
+            "state": "Enabled",
+        }
+
+    def resource_groups(self, subscription_id: str) -> list[dict]:
+        return [
+            {
+                "id": f"/subscriptions/{subscription_id}/resourceGroups/rg-{i:03d}",
+                "name": f"rg-{i:03d}",
+                "type": "Microsoft.Resources/resourceGroups",
+                "location": _LOCATIONS[i % len(_LOCATIONS)],
+                "properties": {"provisioningState": "Succeeded"},
+            }
+            for i in range(self._resource_groups)
+        ]
+
+    def resources(self, subscription_id: str) -> list[dict]:
+        resources = []
+        for i in range(self._resources):
+            resource_type, service, meter = _SERVICES[i % len(_SERVICES)]
+            group = f"rg-{i % self._resource_groups:03d}"
+            resources.append({
+                "id": f"/subscriptions/{subscription_id}/resourceGroups/{group}/providers/{resource_type}/res-{i:05d}",
+                "name": f"res-{i:05d}",
+                "type": resource_type,
+                "location": _LOCATIONS[i % len(_LOCATIONS)],
+                "tags": {"env": ("prod", "dev", "test")[i % 3]},
+                # Not part of the ARM shape; used to build cost rows
+                "_dimensions": {"ResourceGroupName": group, "ServiceName": service, "MeterCategory": meter},
+                "_cost": 1.0 + (i * 7919) % 1000 / 10.0,
+            })
+        return resources
+
+    def cost_rows(self, subscription_id: str, query: dict) -> tuple[list[dict], list[list]]:
+        """Answer a Cost Management usage query with columns and rows."""
+
+        period = query.get("timePeriod") or {}
+        start = _dt.date.fromisoformat(period["from"][:10])
+        end = _dt.date.fromisoformat(period["to"][:10])
+        dataset = query.get("dataset") or {}
+        granularity = dataset.get("granularity")
+        grouping = [g["name"] for g in dataset.get("grouping") or []]
+
+        days = [start + _dt.timedelta(days=n) for n in range((end - start).days + 1)]
+        totals: dict[tuple, float] = {}
+        for resource in self.resources(subscription_id):
+            values = tuple(self._dimension(resource, name) for name in grouping)
+            for day in days:
+                # Weekends are cheaper, and every day drifts a little
+                factor = (0.7 if day.weekday() >= 5 else 1.0) * (1 + 0.1 * ((day.toordinal() * 31 + len(values)) % 7) / 7)
+                if granularity == "Daily":
+                    period_key = day.year * 10000 + day.month * 100 + day.day
+                elif granularity == "Monthly":
+                    period_key = f"{day.year:04d}-{day.month:02d}-01T00:00:00"
+                else:
+                    period_key = None
+                key = (period_key,) + values
+                totals[key] = totals.get(key, 0.0) + resource["_cost"] * factor
+
+        columns = [{"name": "Cost", "type": "Number"}]
+        if granularity == "Daily":
+            columns.append({"name": "UsageDate", "type": "Number"})
+        elif granularity == "Monthly":
+            columns.append({"name": "BillingMonth", "type": "Datetime"})
+        columns += [{"name": name, "type": "String"} for name in grouping]
+        columns.append({"name": "Currency", "type": "String"})
+
+        rows = []
+        for key, cost in totals.items():
+            row = [round(cost, 4)]
+            if granularity:
+                row.append(key[0])
+            rows.append(row + list(key[1:]) + ["USD"])
+        return columns, rows
+
+    @staticmethod
+    def _dimension(resource: dict, name: str) -> str:
+        if name == "ResourceId":
+            return resource["id"].lower()
+        if name == "ResourceLocation":
+            return resource["location"]
+        if name in resource["_dimensions"]:
+            return resource["_dimensions"][name]
+        if name.startswith("tag:") or name == "TagKey":
+            return resource["tags"].get(name[4:], "")
+        return ""
+
+
+class FakeAzureServer(ThreadingHTTPServer):
+    """HTTP server answering ARM and Cost Management calls for a :class:`FakeTenant`."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        tenant: FakeTenant,
+        arm_latency: float = 0.05,
+        query_latency: float = 0.5,
+        jitter: float = 0.2,
+        page_size: int = 100,
+        rows_per_page: int = 5000,
+        throttle_rate: float = 0.0,
+        token: str | None = None,
+        seed: int = 0,
+    ) -> None:
+        super().__init__(address, _Handler)
+        self.tenant = tenant
+        self.arm_latency = arm_latency
+        self.query_latency = query_latency
+        self.jitter = jitter
+        self.page_size = page_size
+        self.rows_per_page = rows_per_page
+        self.throttle_rate = throttle_rate
+        self.token = token
+        self.stats: Counter = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> threading.Thread:
+        """Serve on a daemon thread."""
+
+        thread = threading.Thread(target=self.serve_forever, name="fake-azure", daemon=True)
+        thread.start()
+        return thread
+
+    def delay(self, base: float) -> None:
+        with self._lock:
+            factor = 1 + self._random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, base * factor))
+
+    def throttled(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.throttle_rate
+
+    def count(self, operation: str) -> None:
+        with self._lock:
+            self.stats[operation] += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeAzureServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [p for p in url.path.lower().split("/") if p]
+        body = self._body()
+
+        if parts == ["_stats"]:
+            return self._json(200, dict(self.server.stats))
+        if self.server.token and self.headers.get("Authorization") != f"Bearer {self.server.token}":
+            return self._json(401, {"error": {"code": "InvalidAuthenticationToken", "message": "Bad token"}})
+
+        tenant = self.server.tenant
+        operation, status, payload = "unknown", 404, {"error": {"code": "NotFound", "message": url.path}}
+        if method == "POST" and parts[-2:] == ["microsoft.costmanagement", "query"] and len(parts) >= 2:
+            operation = "cost_query"
+        elif method == "POST" and parts == ["providers", "microsoft.resourcegraph", "resources"]:
+            operation = "resource_graph"
+        elif method == "GET" and parts == ["subscriptions"]:
+            operation = "subscriptions"
+        elif method == "GET" and len(parts) == 2 and parts[0] == "subscriptions":
+            operation = "subscription"
+        elif method == "GET" and len(parts) == 3 and parts[2] in ("resourcegroups", "resources"):
+            operation = parts[2]
+
+        if operation != "unknown" and self.server.throttled():
+            self.server.count(f"{operation}_throttled")
+            return self._json(
+                429,
+                {"error": {"code": "TooManyRequests", "message": "Throttled by the fake server"}},
+                {"Retry-After": "1", "x-ms-ratelimit-microsoft.costmanagement-entity-retry-after": "1"},
+            )
+        self.server.count(operation)
+
+        subscription_id = self._subscription(url.path)
+        if operation == "cost_query":
+            self.server.delay(self.server.query_latency)
+            if subscription_id not in tenant.subscription_ids:
+                return self._json(404, payload)
+            columns, rows = tenant.cost_rows(subscription_id, json.loads(body or b"{}"))
+            offset = int(params.get("$skiptoken", 0))
+            page = rows[offset:offset + self.server.rows_per_page]
+            next_link = None
+            if offset + self.server.rows_per_page < len(rows):
+                next_params = {**params, "$skiptoken": offset + self.server.rows_per_page}
+                next_link = f"{self.server.url}{url.path}?{urlencode(next_params)}"
+            status, payload = 200, {
+                "id": f"{url.path}/query",
+                "name": "query",
+                "type": "Microsoft.CostManagement/query",
+                "properties": {"nextLink": next_link, "columns": columns, "rows": page},
+            }
+        elif operation == "resource_graph":
+            self.server.delay(self.server.arm_latency)
+            status, payload = 200, {"totalRecords": 1, "count": 1, "resultTruncated": "false", "data": [{"changes": 0}]}
+        elif operation != "unknown":
+            self.server.delay(self.server.arm_latency)
+            if operation == "subscriptions":
+                status, payload = 200, self._page([tenant.subscription(s) for s in tenant.subscription_ids], url, params)
+            elif subscription_id not in tenant.subscription_ids:
+                status = 404
+            elif operation == "subscription":
+                status, payload = 200, tenant.subscription(subscription_id)
+            elif operation == "resourcegroups":
+                status, payload = 200, self._page(tenant.resource_groups(subscription_id), url, params)
+            else:
+                resources = [
+                    {k: v for k, v in r.items() if not k.startswith("_")} for r in tenant.resources(subscription_id)
+                ]
+                status, payload = 200, self._page(resources, url, params)
+        self._json(status, payload)
+
+    def _page(self, items: list[dict], url, params: dict) -> dict:
+        offset = int(params.get("$skiptoken", 0))
+        size = self.server.page_size
+        page = {"value": items[offset:offset + size]}
+        if offset + size < len(items):
+            page["nextLink"] = f"{self.server.url}{url.path}?{urlencode({**params, '$skiptoken': offset + size})}"
+        return page
+
+    @staticmethod
+    def _subscription(path: str) -> str | None:
+        parts = [p for p in path.split("/") if p]
+        if len(parts) > 1 and parts[0].lower() == "subscriptions":
+            return parts[1].lower()
+        return None
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _json(self, status: int, payload: dict, headers: dict | None = None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the fake tenant and server options to ``parser``."""
+
+    parser.add_argument("--subscriptions", type=int, default=3)
+    parser.add_argument("--resource-groups", type=int, default=20, help="per subscription")
+    parser.add_argument("--resources", type=int, default=500, help="per subscription")
+    parser.add_argument("--arm-latency-ms", type=float, default=50)
+    parser.add_argument("--query-latency-ms", type=float, default=500)
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency varies by +/- this fraction")
+    parser.add_argument("--page-size", type=int, default=100, help="items per ARM list page")
+    parser.add_argument("--rows-per-page", type=int, default=5000, help="rows per Cost Management page")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def build_server(args: argparse.Namespace, host: str = "127.0.0.1", port: int = 0, token: str | None = None) -> FakeAzureServer:
+    """Build a server from :func:`add_arguments` options."""
+
+    return FakeAzureServer(
+        (host, port),
+        FakeTenant(args.subscriptions, args.resource_groups, args.resources),
+        arm_latency=args.arm_latency_ms / 1000,
+        query_latency=args.query_latency_ms / 1000,
+        jitter=args.jitter,
+        page_size=args.page_size,
+        rows_per_page=args.rows_per_page,
+        throttle_rate=args.throttle_rate,
+        token=token,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--token", help="require this bearer token")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = build_server(args, args.host, args.port, args.token)
+    print(f"Fake Azure listening on {server.url} with subscriptions {', '.join(server.tenant.subscription_ids)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Drive the /api routes under concurrent load against a local stand-in for Azure.
+
+Starts ``benchmarks/fake_azure.py`` in-process and the app under gunicorn
+with a fresh local store, signs each client in without MSAL, then runs a
+weighted mix of dashboard requests and reports per-route p50/p90/p99
+latency, requests per second, upstream calls and memory per worker::
+
+    python benchmarks/load.py                                 # 30 s, 16 clients
+    python benchmarks/load.py --duration 60 --concurrency 64 --workers 4
+    python benchmarks/load.py --query-latency-ms 2000 --throttle-rate 0.05
+    python benchmarks/load.py --json results.json             # for comparing runs
+    python benchmarks/load.py --app-dir ../old-checkout       # compare another tree
+
+The client-side Azure rate limits are raised so they do not cap the run
+unless ``AZURE_*_RATE_PER_SECOND`` are set in the environment. Clients and
+the fake server share this process, so keep an eye on its CPU when pushing
+concurrency up.
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+import requests
+
+from fake_azure import add_arguments, build_server
+
+# (name, path, weight); {sub} is replaced by a subscription id
+ROUTES = (
+    ("dashboard", "/api/dashboard?subscription_id={sub}", 4),
+    ("last-month", "/api/costs/last-month?subscription_id={sub}", 2),
+    ("by-resource-group", "/api/costs/by-resource-group?subscription_id={sub}", 2),
+    ("summary", "/api/costs/summary?subscription_id={sub}", 2),
+    ("trend", "/api/costs/trend?subscription_id={sub}&months=6", 1),
+    ("forecast", "/api/costs/forecast?subscription_id={sub}", 1),
+    ("anomalies", "/api/costs/anomalies?subscription_id={sub}", 1),
+    ("resources", "/api/costs/resources?subscription_id={sub}&limit=50", 1),
+    ("query", "/api/costs/query?subscription_id={sub}&group_by=ServiceName", 1),
+    ("subscriptions", "/api/subscriptions", 1),
+    ("resource-groups", "/api/resource-groups?subscription_id={sub}", 1),
+)
+_TOKEN = "benchmark-token"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb(pid: int) -> float | None:
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _children(pid: int) -> list[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as children:
+            return [int(p) for p in children.read().split()]
+    except OSError:
+        return []
+
+
+class MemorySampler(threading.Thread):
+    """Records the peak and last RSS of each gunicorn worker (Linux only)."""
+
+    def __init__(self, master: int, interval: float = 0.5) -> None:
+        super().__init__(name="memory-sampler", daemon=True)
+        self._master = master
+        self._interval = interval
+        self.peak: dict[int, float] = {}
+        self.last: dict[int, float] = {}
+        self.stop = threading.Event()
+
+    def run(self) -> None:
+        while not self.stop.wait(self._interval):
+            for pid in _children(self._master):
+                rss = _rss_mb(pid)
+                if rss is not None:
+                    self.last[pid] = rss
+                    self.peak[pid] = max(rss, self.peak.get(pid, 0.0))
+
+
+def start_app(args: argparse.Namespace, fake_url: str, scratch: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    for name in ("AZURE_CLIENT_ID", "AZURE_TENANT_ID", "AZURE_CLIENT_SECRET", "FLASK_SECRET_KEY"):
+        env.setdefault(name, "benchmark")
+    for name in ("AZURE_COST_RATE_PER_SECOND", "AZURE_ARM_RATE_PER_SECOND"):
+        env.setdefault(name, "1000")
+    env.setdefault("AZURE_RATE_BURST", "1000")
+    env.update({
+        "AZURE_MANAGEMENT_URL": fake_url,
+        "AZURE_STATIC_TOKEN": _TOKEN,
+        "SESSION_TYPE": "filesystem",
+        "SESSION_FILE_PATH": os.path.join(scratch, "sessions.sqlite3"),
+        "COST_STORE_PATH": os.path.join(scratch, "cost-store.sqlite3"),
+        "TOKEN_CACHE_PATH": os.path.join(scratch, "token-cache.sqlite3"),
+        "METRICS_PATH": os.path.join(scratch, "metrics.sqlite3"),
+        "PREWARM_LOCK_PATH": os.path.join(scratch, "prewarm.lock"),
+        "PREWARM_IN_PROCESS": "false",
+    })
+    command = [
+        sys.executable, "-m", "gunicorn",
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(args.workers),
+        "--worker-class", "gthread",
+        "--threads", str(args.threads),
+        "--timeout", "120",
+        "--log-level", "warning",
+        "app:app",
+    ]
+    return subprocess.Popen(command, cwd=args.app_dir, env=env)
+
+
+def wait_ready(base: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"The app exited with status {process.returncode}")
+        try:
+            if requests.get(f"{base}/api/health", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise SystemExit("The app did not become ready")
+
+
+def sign_in(base: str, count: int) -> list[requests.Session]:
+    sessions = []
+    for _ in range(count):
+        session = requests.Session()
+        session.get(f"{base}/auth/login", timeout=10).raise_for_status()
+        if not session.get(f"{base}/api/auth/status", timeout=10).json().get("authenticated"):
+            raise SystemExit("Static sign-in failed; is AZURE_STATIC_TOKEN honoured by this tree?")
+        sessions.append(session)
+    return sessions
+
+
+def run_load(
+    base: str,
+    sessions: list[requests.Session],
+    subscriptions: list[str],
+    concurrency: int,
+    duration: float,
+    seed: int,
+) -> tuple[dict[str, list[float]], dict[str, int], float]:
+    """Run the route mix until ``duration`` elapses; return latencies, errors and elapsed time."""
+
+    names, paths, weights = zip(*ROUTES)
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    lock = threading.Lock()
+    started = time.monotonic()
+    deadline = started + duration
+
+    def client(index: int) -> None:
+        rng = random.Random(seed + index)
+        session = sessions[index]
+        while time.monotonic() < deadline:
+            route = rng.choices(range(len(names)), weights)[0]
+            url = base + paths[route].format(sub=rng.choice(subscriptions))
+            began = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=120).status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - began
+            with lock:
+                latencies[names[route]].append(elapsed)
+                if not ok:
+                    errors[names[route]] += 1
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.monotonic() - started
+
+
+def summarize(latencies: dict[str, list[float]], errors: dict[str, int], elapsed: float) -> dict:
+    routes = {}
+    for name, values in sorted(latencies.items()):
+        ms = np.asarray(values) * 1000
+        p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+        routes[name] = {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "p50_ms": round(float(p50), 1),
+            "p90_ms": round(float(p90), 1),
+            "p99_ms": round(float(p99), 1),
+            "max_ms": round(float(ms.max()), 1),
+        }
+    every = np.asarray([v for values in latencies.values() for v in values]) * 1000
+    total = {
+        "requests": int(len(every)),
+        "errors": int(sum(errors.values())),
+        "requests_per_second": round(len(every) / elapsed, 1) if elapsed else 0.0,
+    }
+    if len(every):
+        total.update({f"p{q}_ms": round(float(np.percentile(every, q)), 1) for q in (50, 90, 99)})
+    return {"total": total, "routes": routes}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=30, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of unmeasured load first")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=8, help="threads per gunicorn worker")
+    parser.add_argument("--app-dir", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser.add_argument("--json", help="also write the results to this file")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    fake = build_server(args, token=_TOKEN)
+    fake.start()
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as scratch:
+        app = start_app(args, fake.url, scratch, port)
+        memory = MemorySampler(app.pid)
+        sessions = []
+        try:
+            wait_ready(base, app)
+            memory.start()
+            sessions = sign_in(base, args.concurrency)
+            subscriptions = fake.tenant.subscription_ids
+            if args.warmup:
+                run_load(base, sessions, subscriptions, args.concurrency, args.warmup, args.seed + 1000)
+            upstream_before = dict(fake.stats)
+            latencies, errors, elapsed = run_load(
+                base, sessions, subscriptions, args.concurrency, args.duration, args.seed
+            )
+            upstream = {k: v - upstream_before.get(k, 0) for k, v in fake.stats.items() if v - upstream_before.get(k, 0)}
+        finally:
+            memory.stop.set()
+            # Idle keep-alive connections would hold up gunicorn's graceful shutdown
+            for session in sessions:
+                session.close()
+            app.terminate()
+            try:
+                app.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                app.kill()
+                app.wait()
+            fake.shutdown()
+
+    results = summarize(latencies, errors, elapsed)
+    results["upstream_calls"] = upstream
+    results["worker_rss_mb"] = {
+        str(pid): {"peak": round(memory.peak[pid], 1), "last": round(memory.last[pid], 1)} for pid in memory.peak
+    }
+    results["settings"] = {
+        k: getattr(args, k)
+        for k in ("duration", "concurrency", "workers", "threads", "subscriptions",
+                  "resource_groups", "resources", "arm_latency_ms", "query_latency_ms", "throttle_rate")
+    }
+
+    total = results["total"]
+    print(f"{total['requests']} requests in {elapsed:.1f}s: {total['requests_per_second']} req/s, {total['errors']} errors")
+    print(f"  {'route':<18} {'count':>6} {'errors':>6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, r in results["routes"].items():
+        print(f"  {name:<18} {r['requests']:>6} {r['errors']:>6} {r['p50_ms']:>8} {r['p90_ms']:>8} {r['p99_ms']:>8} {r['max_ms']:>8}")
+    if len(results["routes"]) > 1 and "p50_ms" in total:
+        print(f"  {'all':<18} {total['requests']:>6} {total['errors']:>6} {total['p50_ms']:>8} {total['p90_ms']:>8} {total['p99_ms']:>8}")
+    print(f"Upstream calls: {', '.join(f'{k} {v}' for k, v in sorted(upstream.items())) or 'none'}")
+    for pid, rss in results["worker_rss_mb"].items():
+        print(f"Worker {pid}: peak {rss['peak']} MB, last {rss['last']} MB")
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Measure worker cold start: importing the app and serving its first requests.
+
+Each sample runs in a fresh interpreter, as a new gunicorn worker would::
+
+    python benchmarks/startup.py                  # this checkout
+    python benchmarks/startup.py --runs 20
+    python benchmarks/startup.py --app-dir ../old-checkout   # compare another tree
+
+Azure is never contacted: placeholder credentials are used unless set, and
+only the health check and the login page are requested.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+health = client.get("/api/health")
+ready = time.perf_counter()
+login = client.get("/", headers={"Accept-Encoding": "gzip"})
+served = time.perf_counter()
+assert health.status_code == 200 and login.status_code == 200
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_health_ms": (ready - started) * 1000,
+    "login_page_ms": (served - ready) * 1000,
+    "azure_sdk_loaded": any(m.startswith("azure.mgmt") for m in sys.modules),
+}))
+"""
+
+
+def sample(app_dir: str, scratch: str) -> dict:
+    env = dict(os.environ)
+    for name in ("AZURE_CLIENT_ID", "AZURE_TENANT_ID", "AZURE_CLIENT_SECRET", "FLASK_SECRET_KEY"):
+        env.setdefault(name, "benchmark")
+    env.setdefault("SESSION_TYPE", "memory")
+    env.setdefault("COST_STORE_PATH", os.path.join(scratch, "cost-store.sqlite3"))
+    env.setdefault("TOKEN_CACHE_PATH", os.path.join(scratch, "token-cache.sqlite3"))
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=app_dir, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--app-dir", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        sample(args.app_dir, scratch)  # warm the bytecode and OS file caches
+        samples = [sample(args.app_dir, scratch) for _ in range(args.runs)]
+
+    print(f"{args.runs} cold starts of {args.app_dir}")
+    for key in ("import_ms", "first_health_ms", "login_page_ms"):
+        values = [s[key] for s in samples]
+        print(f"  {key:<16} median {statistics.median(values):7.1f}   min {min(values):7.1f}   max {max(values):7.1f}")
+    print(f"  Azure SDK loaded at startup: {any(s['azure_sdk_loaded'] for s in samples)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,4 +18,88 @@ SCOPE = [
     "https://management.azure.com/.default"
 ]
 
-SESSION_TYPE = "filesystem"  # Optional, but recommended for Flask session
+# Server-side session backend: "filesystem" (SQLite file shared by workers), "memory" or "cookie"
+SESSION_TYPE = os.getenv("SESSION_TYPE", "filesystem")
+SESSION_FILE_PATH = os.getenv("SESSION_FILE_PATH", os.path.join("instance", "sessions.sqlite3"))
+SESSION_LIFETIME_SECONDS = int(os.getenv("SESSION_LIFETIME_SECONDS", str(8 * 3600)))
+
+# Cost Management query result cache (per process)
+COST_CACHE_TTL_SECONDS = int(os.getenv("COST_CACHE_TTL_SECONDS", "300"))
+COST_CACHE_MAX_ENTRIES = int(os.getenv("COST_CACHE_MAX_ENTRIES", "256"))
+
+# Local store of daily cost rows; only missing days and the unsettled tail are re-fetched
+COST_STORE_PATH = os.getenv("COST_STORE_PATH", os.path.join("instance", "cost-store.sqlite3"))
+COST_SETTLE_DAYS = int(os.getenv("COST_SETTLE_DAYS", "4"))
+COST_TAIL_REFRESH_SECONDS = int(os.getenv("COST_TAIL_REFRESH_SECONDS", "3600"))
+
+# Cost Management Exports (usage CSV) ingested into the local store by python -m backend.azure.exports
+# Comma-separated directories, files or blob container URLs (with an optional prefix and SAS token)
+COST_EXPORT_PATHS = [p.strip() for p in os.getenv("COST_EXPORT_PATHS", "").split(",") if p.strip()]
+# Tag keys to aggregate costs by (empty = every key found in the exports)
+COST_EXPORT_TAGS = [t.strip() for t in os.getenv("COST_EXPORT_TAGS", "").split(",") if t.strip()]
+COST_EXPORT_CHUNK_ROWS = int(os.getenv("COST_EXPORT_CHUNK_ROWS", "20000"))
+
+# In-memory prefix-sum rollups of stored daily costs, one per subscription and grouping (per process)
+ROLLUP_MAX_CUBES = int(os.getenv("ROLLUP_MAX_CUBES", "256"))
+# Longest day axis a rollup grows to before it is rebuilt around the requested range
+ROLLUP_MAX_DAYS = int(os.getenv("ROLLUP_MAX_DAYS", "800"))
+
+# Rows read from the local store per streamed batch of /api/costs/export
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "10000"))
+
+# Maximum subscriptions queried concurrently by /api/costs/summary/all
+COST_FANOUT_CONCURRENCY = int(os.getenv("COST_FANOUT_CONCURRENCY", "4"))
+
+# Azure Resource Manager endpoint; point it at a local stand-in (benchmarks/fake_azure.py) to run offline
+AZURE_MANAGEMENT_URL = os.getenv("AZURE_MANAGEMENT_URL", "https://management.azure.com")
+# Sign in without MSAL as a fixed local user holding this token; ignored unless
+# AZURE_MANAGEMENT_URL is a loopback address, so it can never reach real Azure
+AZURE_STATIC_TOKEN = os.getenv("AZURE_STATIC_TOKEN")
+
+# Shared Azure management clients (per process)
+AZURE_CLIENT_MAX_IDLE_SECONDS = int(os.getenv("AZURE_CLIENT_MAX_IDLE_SECONDS", "900"))
+AZURE_MAX_CLIENTS = int(os.getenv("AZURE_MAX_CLIENTS", "64"))
+AZURE_CLIENT_POOL_SIZE = int(os.getenv("AZURE_CLIENT_POOL_SIZE", "20"))
+
+# Server-side MSAL token caches (refresh tokens never leave the server)
+TOKEN_CACHE_PATH = os.getenv("TOKEN_CACHE_PATH", os.path.join("instance", "token-cache.sqlite3"))
+
+# Client-side rate limiting of Azure calls (per subscription, per API)
+AZURE_COST_RATE_PER_SECOND = float(os.getenv("AZURE_COST_RATE_PER_SECOND", "0.5"))
+AZURE_ARM_RATE_PER_SECOND = float(os.getenv("AZURE_ARM_RATE_PER_SECOND", "10"))
+AZURE_RATE_BURST = float(os.getenv("AZURE_RATE_BURST", "10"))
+# Share of each bucket's burst kept back for interactive requests
+AZURE_BACKGROUND_RESERVE = float(os.getenv("AZURE_BACKGROUND_RESERVE", "0.5"))
+AZURE_MAX_RETRIES = int(os.getenv("AZURE_MAX_RETRIES", "4"))
+# Longest an interactive call waits on the limiter and retries before giving up with a 429
+AZURE_INTERACTIVE_WAIT_SECONDS = float(os.getenv("AZURE_INTERACTIVE_WAIT_SECONDS", "15"))
+
+# Background pre-warming of cost data with the app's service principal
+# Comma-separated subscription ids to always warm, besides recently viewed ones
+PREWARM_SUBSCRIPTIONS = [s.strip() for s in os.getenv("PREWARM_SUBSCRIPTIONS", "").split(",") if s.strip()]
+PREWARM_RECENT_DAYS = int(os.getenv("PREWARM_RECENT_DAYS", "7"))
+# UTC hours to run at: before business hours and after Azure's daily cost refresh
+PREWARM_HOURS_UTC = [int(h) for h in os.getenv("PREWARM_HOURS_UTC", "5,13").split(",") if h.strip()]
+# Run the scheduler as a thread inside the web app (otherwise: python -m backend.azure.prewarm)
+PREWARM_IN_PROCESS = os.getenv("PREWARM_IN_PROCESS", "false").lower() in ("1", "true", "yes")
+PREWARM_LOCK_PATH = os.getenv("PREWARM_LOCK_PATH", os.path.join("instance", "prewarm.lock"))
+
+# Cost anomaly detection over daily per-resource-group costs
+ANOMALY_WINDOW_DAYS = int(os.getenv("ANOMALY_WINDOW_DAYS", "28"))  # Trailing baseline per day
+ANOMALY_THRESHOLD = float(os.getenv("ANOMALY_THRESHOLD", "3.5"))  # Robust z-score to flag
+ANOMALY_MIN_DELTA = float(os.getenv("ANOMALY_MIN_DELTA", "1.0"))  # Ignore smaller swings (currency units)
+ANOMALY_MAX_STATES = int(os.getenv("ANOMALY_MAX_STATES", "256"))  # Subscription x grouping score matrices kept per process
+
+# Subscription, resource group and resource inventory cache (per process, per user and scope)
+# Older listings are served while refreshed in the background; expired ones are reloaded first
+INVENTORY_REFRESH_SECONDS = int(os.getenv("INVENTORY_REFRESH_SECONDS", "900"))
+INVENTORY_TTL_SECONDS = int(os.getenv("INVENTORY_TTL_SECONDS", "3600"))
+INVENTORY_MAX_ENTRIES = int(os.getenv("INVENTORY_MAX_ENTRIES", "512"))
+# Skip background reloads when Azure Resource Graph reports no creations or deletions
+INVENTORY_CHANGE_DETECTION = os.getenv("INVENTORY_CHANGE_DETECTION", "false").lower() in ("1", "true", "yes")
+
+# Prometheus metrics at /metrics; workers on a host share totals through METRICS_PATH ("" = per worker)
+METRICS_PATH = os.getenv("METRICS_PATH", os.path.join("instance", "metrics.sqlite3"))
+METRICS_PUBLISH_SECONDS = float(os.getenv("METRICS_PUBLISH_SECONDS", "15"))
+# Scrapers must send "Authorization: Bearer <token>"; unset, /metrics only answers in debug mode
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
@@ -44,14 +44,19 @@ class AzureCostDashboard {
 
     async checkAuthenticationStatus() {
         try {
-            const response = await fetch('/api/auth/status');
+            // Auth status and subscriptions arrive in one batched response
+            const response = await fetch('/api/dashboard');
             if (response.ok) {
                 const data = await response.json();
                 this.isAuthenticated = data.authenticated;
                 this.updateAuthUI(data.user);
-                // Only load subscriptions if authenticated
+                // Subscriptions are only included once authenticated
                 if (this.isAuthenticated) {
-                    await this.loadSubscriptions();
+                    if (data.subscriptions) {
+                        this.populateSubscriptionSelect(data.subscriptions);
+                    } else {
+                        this.showError('Failed to load subscriptions');
+                    }
                 }
             }
         } catch (error) {
@@ -80,25 +85,6 @@ class AzureCostDashboard {
         }
     }
 
-    async loadSubscriptions() {
-        try {
-            this.showLoading(true);
-            const response = await fetch('/api/subscriptions');
-            const data = await response.json();
-
-            if (response.ok && data.subscriptions) {
-                this.populateSubscriptionSelect(data.subscriptions);
-            } else {
-                this.showError('Failed to load subscriptions');
-            }
-        } catch (error) {
-            console.error('Error loading subscriptions:', error);
-            this.showError('Failed to load subscriptions');
-        } finally {
-            this.showLoading(false);
-        }
-    }
-
     populateSubscriptionSelect(subscriptions) {
         const select = document.getElementById('subscription-select');
         select.innerHTML = '<option value="">Select a subscription...</option>';
@@ -116,39 +102,35 @@ class AzureCostDashboard {
 
         try {
             this.showLoading(true);
-            
-            // Load cost summary
-            await this.loadCostSummary();
-            
-            // Load resource group costs
-            await this.loadResourceGroupCosts();
-            
-            // Load resource groups list
-            await this.loadResourceGroupsList();
-            
-            // Load daily costs chart
-            await this.loadDailyCostsChart();
-            
-        } catch (error) {
-            console.error('Error loading dashboard data:', error);
-            this.showError('Failed to load dashboard data');
-        } finally {
-            this.showLoading(false);
-        }
-    }
 
-    async loadCostSummary() {
-        try {
-            const response = await fetch(`/api/costs/summary?subscription_id=${this.currentSubscription}`);
+            // Every panel comes from one request; the server runs the queries concurrently.
+            // Chart panels arrive as parallel arrays (format=columnar) rather than one object per row.
+            const response = await fetch(`/api/dashboard?subscription_id=${this.currentSubscription}&format=columnar`);
             const data = await response.json();
 
-            if (response.ok && data) {
-                this.updateCostSummary(data);
+            if (!response.ok) {
+                this.showError('Failed to load dashboard data');
+                return;
+            }
+
+            if (data.summary) {
+                this.updateCostSummary(data.summary);
+                this.updateResourceGroupCosts(data.resource_group_costs);
+                this.updateDailyCostsChart(data.daily_costs);
+            } else {
+                this.showError('Failed to load cost data');
+            }
+
+            if (data.resource_groups) {
+                this.updateResourceGroupsTable(data.resource_groups);
             } else {
-                this.showError('Failed to load cost summary');
+                this.showError('Failed to load resource groups');
             }
         } catch (error) {
-            console.error('Error loading cost summary:', error);
+            console.error('Error loading dashboard data:', error);
+            this.showError('Failed to load dashboard data');
+        } finally {
+            this.showLoading(false);
         }
     }
 
@@ -162,70 +144,27 @@ class AzureCostDashboard {
         if (periodDays) periodDays.textContent = `${data.period_days} days`;
     }
 
-    async loadResourceGroupCosts() {
-        try {
-            const response = await fetch(`/api/costs/by-resource-group?subscription_id=${this.currentSubscription}`);
-            const data = await response.json();
-
-            if (response.ok && data.costs) {
-                this.updateResourceGroupCosts(data.costs);
-            } else {
-                this.showError('Failed to load resource group costs');
-            }
-        } catch (error) {
-            console.error('Error loading resource group costs:', error);
-        }
-    }
-
-    updateResourceGroupCosts(costs) {
+    updateResourceGroupCosts({ groups, costs }) {
         const container = document.getElementById('resource-groups-list');
         if (!container) return;
 
-        // Group costs by resource group
-        const groupedCosts = {};
-        costs.forEach(cost => {
-            const rgName = cost.resource_group || 'Unknown';
-            if (!groupedCosts[rgName]) {
-                groupedCosts[rgName] = 0;
-            }
-            groupedCosts[rgName] += parseFloat(cost.cost || 0);
-        });
-
-        // Sort by cost (highest first)
-        const sortedGroups = Object.entries(groupedCosts)
-            .sort(([,a], [,b]) => b - a)
-            .slice(0, 10); // Show top 10
-
         container.innerHTML = '';
         
-        if (sortedGroups.length === 0) {
+        if (groups.length === 0) {
             container.innerHTML = '<div class="loading">No cost data available</div>';
             return;
         }
 
-        sortedGroups.forEach(([rgName, totalCost]) => {
+        // Groups arrive sorted by total cost (highest first); show the top 10
+        const count = Math.min(groups.length, 10);
+        for (let i = 0; i < count; i++) {
             const item = document.createElement('div');
             item.className = 'resource-group-item';
             item.innerHTML = `
-                <span class="resource-group-name">${rgName}</span>
-                <span class="resource-group-cost">$${totalCost.toFixed(2)}</span>
+                <span class="resource-group-name">${groups[i] || 'Unknown'}</span>
+                <span class="resource-group-cost">$${costs[i].toFixed(2)}</span>
             `;
             container.appendChild(item);
-        });
-    }
-
-    async loadResourceGroupsList() {
-        try {
-            const response = await fetch(`/api/resource-groups?subscription_id=${this.currentSubscription}`);
-            const data = await response.json();
-
-            if (response.ok && data.resource_groups) {
-                this.updateResourceGroupsTable(data.resource_groups);
-            } else {
-                this.showError('Failed to load resource groups');
-            }
-        } catch (error) {
-            console.error('Error loading resource groups:', error);
         }
     }
 
@@ -264,22 +203,7 @@ class AzureCostDashboard {
         container.appendChild(table);
     }
 
-    async loadDailyCostsChart() {
-        try {
-            const response = await fetch(`/api/costs/last-month?subscription_id=${this.currentSubscription}`);
-            const data = await response.json();
-
-            if (response.ok && data.costs) {
-                this.updateDailyCostsChart(data.costs);
-            } else {
-                this.showError('Failed to load daily costs');
-            }
-        } catch (error) {
-            console.error('Error loading daily costs:', error);
-        }
-    }
-
-    updateDailyCostsChart(costs) {
+    updateDailyCostsChart({ dates, costs }) {
         const container = document.getElementById('daily-costs-chart');
         if (!container) return;
 
@@ -289,18 +213,20 @@ class AzureCostDashboard {
         }
 
         // Create a simple bar chart using CSS
-        const chartData = costs.slice(-10); // Last 10 days
+        const chartDates = dates.slice(-10); // Last 10 days
+        const chartCosts = costs.slice(-10);
+        const maxCost = Math.max(...chartCosts);
         
         container.innerHTML = `
             <div class="simple-chart">
                 <div class="chart-bars">
-                    ${chartData.map(cost => {
-                        const costValue = parseFloat(cost.Cost || 0);
-                        const maxCost = Math.max(...chartData.map(c => parseFloat(c.Cost || 0)));
+                    ${chartCosts.map((costValue, i) => {
                         const height = maxCost > 0 ? (costValue / maxCost) * 100 : 0;
-                        const date = new Date(cost.UsageDate).toLocaleDateString('en-US', { 
+                        // Dates are YYYY-MM-DD days; format them in UTC so they do not shift a day
+                        const date = new Date(chartDates[i]).toLocaleDateString('en-US', { 
                             month: 'short', 
-                            day: 'numeric' 
+                            day: 'numeric',
+                            timeZone: 'UTC'
                         });
                         
                         return `
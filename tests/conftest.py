@@ -0,0 +1,34 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# config.py reads the environment at import time, so it is set up before the app loads
+_scratch = tempfile.mkdtemp(prefix="cost-dashboard-tests-")
+for name, value in {
+    "AZURE_CLIENT_ID": "dummy",
+    "AZURE_TENANT_ID": "dummy",
+    "AZURE_CLIENT_SECRET": "dummy",
+    "AZURE_REDIRECT_URI": "http://localhost:5000/auth/callback",
+    "FLASK_SECRET_KEY": "testsecret",
+    # Signs in with a fixed token; nothing listens here, so tests stub Azure calls
+    "AZURE_MANAGEMENT_URL": "http://127.0.0.1:9",
+    "AZURE_STATIC_TOKEN": "test-token",
+    "SESSION_TYPE": "memory",
+    "COST_STORE_PATH": os.path.join(_scratch, "cost-store.sqlite3"),
+    "TOKEN_CACHE_PATH": os.path.join(_scratch, "token-cache.sqlite3"),
+    "METRICS_PATH": "",
+    "PREWARM_IN_PROCESS": "false",
+}.items():
+    os.environ[name] = value
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def client():
+    from app import app
+
+    client = app.test_client()
+    client.get("/auth/login")
+    return client
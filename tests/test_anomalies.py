@@ -0,0 +1,68 @@
+import datetime as _dt
+import random
+
+import pytest
+
+from backend.azure import anomalies
+from backend.azure.anomalies import AnomalyDetector
+from backend.azure.store import CostStore, date_key
+
+_SCOPE = "subscriptions/sub-a"
+_GROUPING = "ServiceName"
+_FIRST = _dt.date(2024, 1, 1)
+_WINDOW = 14
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = CostStore(str(tmp_path / "store.sqlite3"), settle_days=3, tail_refresh=3600)
+    monkeypatch.setattr(anomalies, "cost_store", store)
+    return store
+
+
+def _fill(store, rng, start, end):
+    rows = []
+    day = start
+    while day <= end:
+        for group in ("Storage", "Compute", "Network"):
+            cost = rng.gauss(100, 5)
+            if rng.random() < 0.05:
+                cost *= rng.choice([0.2, 3.0])
+            rows.append((date_key(day), group, round(cost, 2)))
+        if rng.random() < 0.1:
+            rows.append((date_key(day), "Backup", round(rng.uniform(10, 400), 2)))
+        day += _dt.timedelta(days=1)
+    store.replace(_SCOPE, _GROUPING, start, end, rows)
+
+
+def _detector():
+    return AnomalyDetector(_WINDOW, threshold=3.0, min_delta=1.0, max_states=4)
+
+
+def _key(anomaly):
+    return anomaly["date"], anomaly["group"]
+
+
+def test_scope_with_nothing_stored_has_no_anomalies(store):
+    assert _detector().detect(_SCOPE, _GROUPING, _FIRST, _FIRST + _dt.timedelta(days=29)) == []
+
+
+def test_incremental_scores_match_a_full_rescore(store):
+    rng = random.Random(4)
+    _fill(store, rng, _FIRST, _FIRST + _dt.timedelta(days=199))
+    incremental = _detector()
+
+    # Ranges slide, grow and shrink; stored days are rewritten between calls,
+    # some before the range (shifting its baselines) and some inside it
+    for step in range(40):
+        start = _FIRST + _dt.timedelta(days=_WINDOW + rng.randrange(120))
+        end = start + _dt.timedelta(days=rng.randrange(10, 60))
+        if step % 3 == 1:
+            lo = start - _dt.timedelta(days=rng.randrange(_WINDOW)) + _dt.timedelta(days=rng.randrange(30))
+            _fill(store, rng, lo, lo + _dt.timedelta(days=rng.randrange(5)))
+
+        found = incremental.detect(_SCOPE, _GROUPING, start, end)
+        expected = _detector().detect(_SCOPE, _GROUPING, start, end)
+
+        assert expected, "the data should contain anomalies"
+        assert sorted(found, key=_key) == sorted(expected, key=_key)
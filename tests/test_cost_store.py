@@ -0,0 +1,74 @@
+import datetime as _dt
+
+import pytest
+
+from backend.azure import store as store_module
+from backend.azure.store import CostStore, date_key
+
+_SCOPE = "subscriptions/sub-a"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [_dt.datetime(2024, 6, 15, 12, tzinfo=_dt.timezone.utc).timestamp()]
+    monkeypatch.setattr(store_module.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return CostStore(str(tmp_path / "store.sqlite3"), settle_days=3, tail_refresh=3600)
+
+
+def _day(text):
+    return _dt.date.fromisoformat(text)
+
+
+def test_missing_days_are_grouped_into_ranges(store):
+    store.replace(_SCOPE, "", _day("2024-05-10"), _day("2024-05-12"), [(20240511, "", 4.0)])
+    store.replace(_SCOPE, "", _day("2024-05-20"), _day("2024-05-20"), [])
+
+    assert store.stale_ranges(_SCOPE, "", _day("2024-05-01"), _day("2024-05-31")) == [
+        (_day("2024-05-01"), _day("2024-05-09")),
+        (_day("2024-05-13"), _day("2024-05-19")),
+        (_day("2024-05-21"), _day("2024-05-31")),
+    ]
+    # Other groupings and scopes are tracked separately
+    assert store.stale_ranges(_SCOPE, "ServiceName", _day("2024-05-10"), _day("2024-05-12")) == [
+        (_day("2024-05-10"), _day("2024-05-12"))
+    ]
+    assert store.rows(_SCOPE, "", _day("2024-05-01"), _day("2024-05-31")) == [(20240511, "", 4.0)]
+
+
+def test_unsettled_days_go_stale_after_the_tail_refresh(store, clock):
+    start, end = _day("2024-06-08"), _day("2024-06-15")
+    store.replace(_SCOPE, "", start, end, [])
+    assert store.stale_ranges(_SCOPE, "", start, end) == []
+
+    clock[0] += 3601
+    # Settled (three days past) before they were fetched: 06-08 .. 06-12 stay fresh
+    assert store.stale_ranges(_SCOPE, "", start, end) == [(_day("2024-06-13"), end)]
+
+    store.replace(_SCOPE, "", _day("2024-06-13"), end, [])
+    assert store.stale_ranges(_SCOPE, "", start, end) == []
+
+
+def test_replace_overwrites_the_days_it_covers(store):
+    store.replace(_SCOPE, "ServiceName", _day("2024-05-01"), _day("2024-05-02"), [
+        (20240501, "Storage", 1.0),
+        (20240502, "Storage", 2.0),
+        (20240502, "Compute", 3.0),
+    ])
+    store.replace(_SCOPE, "ServiceName", _day("2024-05-02"), _day("2024-05-02"), [
+        (20240502, "Storage", 5.0),
+        # Outside the replaced range: ignored
+        (20240503, "Storage", 9.0),
+    ])
+
+    assert store.rows(_SCOPE, "ServiceName", _day("2024-05-01"), _day("2024-05-31")) == [
+        (20240501, "Storage", 1.0),
+        (20240502, "Storage", 5.0),
+    ]
+    assert date_key(_day("2024-05-03")) not in store.fetched_days(
+        _SCOPE, "ServiceName", _day("2024-05-01"), _day("2024-05-31")
+    )
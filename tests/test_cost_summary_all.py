@@ -0,0 +1,25 @@
+import threading
+
+from backend.azure.cost import CostAnalyzer
+
+
+def test_summaries_run_concurrently_and_fail_per_subscription(client, monkeypatch):
+    # Every summary waits until all three are in flight, so they are known to overlap
+    both_running = threading.Barrier(3, timeout=5)
+
+    def cost_summary(self):
+        both_running.wait()
+        if self._subscription_id == "sub-bad":
+            raise RuntimeError("no access")
+        return {"total_cost": 10.0 if self._subscription_id == "sub-a" else 2.5}
+
+    monkeypatch.setattr(CostAnalyzer, "cost_summary", cost_summary)
+    monkeypatch.setattr("backend.api.routes.COST_FANOUT_CONCURRENCY", 4)
+
+    response = client.get("/api/costs/summary/all?subscription_ids=sub-a,sub-b,sub-bad,sub-a")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["by_subscription"] == {"sub-a": 10.0, "sub-b": 2.5}
+    assert body["total_cost"] == 12.5
+    assert body["errors"] == {"sub-bad": "no access"}
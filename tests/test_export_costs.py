@@ -0,0 +1,39 @@
+import numpy as np
+
+from backend.azure.cost import CostAnalyzer
+from backend.azure.frame import CostFrame
+
+
+def _stub(monkeypatch, denied):
+    def check_access(self):
+        if self._subscription_id in denied:
+            raise RuntimeError("no access")
+
+    def iter_export_frames(self, start, end, granularity, group_by, batch_rows):
+        if self._subscription_id in denied:
+            raise AssertionError("denied subscription was exported")
+        yield CostFrame(np.array([20240301]), np.array([1.5]), {})
+
+    monkeypatch.setattr(CostAnalyzer, "check_access", check_access)
+    monkeypatch.setattr(CostAnalyzer, "iter_export_frames", iter_export_frames)
+
+
+def test_unreadable_subscriptions_are_skipped_and_listed(client, monkeypatch):
+    _stub(monkeypatch, {"sub-b", "sub-c"})
+
+    response = client.get("/api/costs/export?format=ndjson&subscription_ids=sub-b,sub-a,sub-c")
+    body = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.headers["X-Skipped-Subscriptions"] == "sub-b,sub-c"
+    assert "sub-a" in body
+    assert "sub-b" not in body and "error" not in body
+
+
+def test_export_fails_when_no_subscription_is_readable(client, monkeypatch):
+    _stub(monkeypatch, {"sub-a"})
+
+    response = client.get("/api/costs/export?format=csv&subscription_ids=sub-a")
+
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "no access"}
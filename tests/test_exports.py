@@ -0,0 +1,123 @@
+import csv
+import gzip
+import io
+import json
+import random
+from collections import defaultdict
+
+import pytest
+
+from backend.azure import exports
+from backend.azure.exports import ExportTotals, parse_export_date, parse_tags, read_export
+
+_SUBSCRIPTIONS = ["AAAA0000-0000-4000-8000-000000000001", "/subscriptions/bbbb0000-0000-4000-8000-000000000002"]
+_GROUPS = ["rg-Web", "RG-web", "rg-données", "", "rg-批处理"]
+_SERVICES = ["Storage", "Virtual\nMachines", "", "Azure \"Front\" Door"]
+
+
+def _export_text(rows=300, seed=7):
+    """Return a BOM-prefixed export with quoted newlines, multi-byte names and both date formats."""
+
+    rng = random.Random(seed)
+    out = io.StringIO(newline="")
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(["SubscriptionId", "Date", "CostInBillingCurrency", "ResourceGroup", "ServiceName", "Tags"])
+    for i in range(rows):
+        day = rng.randint(1, 28)
+        date = f"03/{day:02d}/2024" if i % 2 else f"2024-03-{day:02d}T00:00:00Z"
+        tags = {}
+        if rng.random() < 0.6:
+            tags["Env"] = rng.choice(["prod", "dev", "ünïcode"])
+        if rng.random() < 0.3:
+            tags["team"] = rng.choice(["a", "b"])
+        cell = json.dumps(tags, ensure_ascii=False)
+        if i % 3 == 0:
+            cell = cell[1:-1]
+        writer.writerow([
+            rng.choice(_SUBSCRIPTIONS),
+            date,
+            f"{rng.uniform(-1, 50):.6f}",
+            rng.choice(_GROUPS),
+            rng.choice(_SERVICES),
+            cell,
+        ])
+        if i % 50 == 0:
+            out.write("\n")
+    return "\ufeff" + out.getvalue()
+
+
+def _naive_rows(text):
+    """Sum the export row by row into ``{(scope, grouping): {(day, value): cost}}``."""
+
+    expected = defaultdict(lambda: defaultdict(float))
+    for row in csv.DictReader(io.StringIO(text.lstrip("\ufeff"), newline="")):
+        scope = f"subscriptions/{row['SubscriptionId'].rsplit('/', 1)[-1].lower()}"
+        day = parse_export_date(row["Date"])
+        cost = float(row["CostInBillingCurrency"])
+        expected[(scope, "")][(day, "")] += cost
+        expected[(scope, "ResourceGroupName")][(day, row["ResourceGroup"].lower() or "Unknown")] += cost
+        expected[(scope, "ServiceName")][(day, row["ServiceName"] or "Unknown")] += cost
+        tags = {k.lower(): v for k, v in parse_tags(row["Tags"]).items()}
+        for key in ("env", "team"):
+            expected[(scope, f"tag:{key}")][(day, tags.get(key) or "Unknown")] += cost
+    return expected
+
+
+def _assert_matches(totals, expected):
+    for (scope, grouping), sums in expected.items():
+        stored = {(day, value): cost for day, value, cost in totals.stored_rows(scope, grouping)}
+        assert stored.keys() == sums.keys(), (scope, grouping)
+        for key, cost in sums.items():
+            assert stored[key] == pytest.approx(cost, abs=1e-6), (scope, grouping, key)
+
+
+@pytest.mark.parametrize("block_bytes", [7, 64, 4096])
+@pytest.mark.parametrize("chunk_rows", [1, 17, 10_000])
+def test_plain_export_matches_naive_sums_across_blocks_and_chunks(tmp_path, monkeypatch, block_bytes, chunk_rows):
+    text = _export_text()
+    path = tmp_path / "export.csv"
+    path.write_bytes(text.encode("utf-8"))
+    monkeypatch.setattr(exports, "_BLOCK_BYTES", block_bytes)
+
+    totals = ExportTotals()
+    with exports._local_file(str(path)).open() as lines:
+        rows = read_export(lines, totals, chunk_rows)
+
+    assert rows == 300
+    assert totals.rows == 300
+    _assert_matches(totals, _naive_rows(text))
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 10_000])
+def test_gzip_export_matches_naive_sums(tmp_path, chunk_rows):
+    text = _export_text(seed=11)
+    path = tmp_path / "export.csv.gz"
+    with gzip.open(path, "wb") as handle:
+        handle.write(text.encode("utf-8"))
+
+    totals = ExportTotals()
+    with exports._local_file(str(path)).open() as lines:
+        read_export(lines, totals, chunk_rows)
+
+    _assert_matches(totals, _naive_rows(text))
+
+
+def test_text_blocks_reassemble_split_multibyte_characters():
+    data = _export_text(rows=40).encode("utf-8")
+    chunks = [data[i:i + 3] for i in range(0, len(data), 3)]
+
+    text = "".join(block.getvalue() for block in exports._text_blocks(chunks))
+
+    assert text == data.decode("utf-8-sig")
+
+
+def test_configured_tags_keep_their_spelling():
+    text = _export_text(seed=3)
+    totals = ExportTotals(["ENV"])
+    read_export(io.StringIO(text.lstrip("\ufeff"), newline=""), totals, 25)
+
+    expected = _naive_rows(text)
+    for scope in totals.scopes():
+        assert [g for g in totals.groupings(scope) if g.startswith("tag:")] == ["tag:ENV"]
+        stored = {(day, value): cost for day, value, cost in totals.stored_rows(scope, "tag:ENV")}
+        assert stored == pytest.approx(dict(expected[(scope, "tag:env")]), abs=1e-6)
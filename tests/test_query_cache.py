@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+
+from backend.azure.cache import QueryCache
+
+
+def test_concurrent_lookups_share_one_call():
+    cache = QueryCache(ttl=60, max_entries=8)
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {"rows": 3}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{"rows": 3}] * 8
+    assert cache.get_or_compute("k", compute) == {"rows": 3}
+    assert len(calls) == 1
+
+
+def test_failures_reach_every_waiter_and_are_not_cached():
+    cache = QueryCache(ttl=60, max_entries=8)
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("throttled")
+
+    errors = []
+
+    def lookup():
+        try:
+            cache.get_or_compute("k", fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=lookup) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert errors == ["throttled"] * 4
+    assert cache.get_or_compute("k", lambda: "ok") == "ok"
+
+
+def test_async_lookups_coalesce_with_a_thread():
+    cache = QueryCache(ttl=60, max_entries=8)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    owner = threading.Thread(target=cache.get_or_compute, args=("k", compute))
+    owner.start()
+    started.wait(5)
+
+    async def never():
+        raise AssertionError("coalesced lookup computed again")
+
+    async def waiters():
+        lookups = asyncio.gather(*(cache.aget_or_compute("k", never) for _ in range(3)))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await lookups
+
+    assert asyncio.run(waiters()) == ["value"] * 3
+    owner.join(5)
+    assert len(calls) == 1
+
+
+def test_entries_expire_and_least_recently_used_are_evicted(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("backend.azure.cache.time.monotonic", lambda: clock[0])
+    cache = QueryCache(ttl=60, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.peek("a") == 1
+    cache.put("c", 3)
+
+    assert cache.peek("b") is None
+    assert cache.peek("a") == 1
+    clock[0] += 61
+    assert cache.peek("a") is None
+    assert cache.get_or_compute("c", lambda: "fresh") == "fresh"
+
+
+def test_keys_separate_users_and_ignore_query_key_order():
+    key = QueryCache.make_key("alice", "Subscriptions/ABC", {"b": 1, "a": [1, 2]})
+
+    assert key == QueryCache.make_key("alice", "subscriptions/abc", {"a": [1, 2], "b": 1})
+    assert key != QueryCache.make_key("bob", "subscriptions/abc", {"a": [1, 2], "b": 1})
@@ -0,0 +1,34 @@
+import json
+
+import numpy as np
+
+from backend.azure.cost import CostAnalyzer
+from backend.azure.frame import CostFrame
+
+
+def test_ndjson_first_page_failure_is_a_json_error(client, monkeypatch):
+    def iter_query_frames(self, start, end, granularity, group_by):
+        raise RuntimeError("no access")
+        yield
+
+    monkeypatch.setattr(CostAnalyzer, "iter_query_frames", iter_query_frames)
+
+    response = client.get("/api/costs/query?subscription_id=sub-a&format=ndjson")
+
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "no access"}
+
+
+def test_ndjson_later_failure_is_reported_in_band(client, monkeypatch):
+    def iter_query_frames(self, start, end, granularity, group_by):
+        yield CostFrame(np.array([20240301]), np.array([1.5]), {})
+        raise RuntimeError("page 2 failed")
+
+    monkeypatch.setattr(CostAnalyzer, "iter_query_frames", iter_query_frames)
+
+    response = client.get("/api/costs/query?subscription_id=sub-a&format=ndjson")
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[-1] == {"error": "page 2 failed"}
+    assert len(lines) == 2
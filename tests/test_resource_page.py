@@ -0,0 +1,20 @@
+import numpy as np
+
+from backend.azure.cost import CostAnalyzer
+from backend.azure.inventory import ResourceIndex
+
+
+def test_pages_match_a_full_stable_sort():
+    rng = np.random.default_rng(5)
+    ids = np.asarray([f"/subscriptions/s/resourcegroups/rg{i % 3}/providers/p/r{i}" for i in range(200)])
+    # Few distinct costs, so ties straddle page boundaries
+    costs = rng.integers(0, 8, len(ids)).astype(float)
+    index = ResourceIndex([])
+    expected = ids[np.argsort(-costs, kind="stable")].tolist()
+
+    for limit in (1, 7, 50):
+        pages = []
+        for offset in range(0, len(ids) + limit, limit):
+            page = CostAnalyzer.resource_page(ids, costs, index, offset=offset, limit=limit)
+            pages.extend(r["id"] for r in page["resources"])
+        assert pages == expected
@@ -0,0 +1,85 @@
+import datetime as _dt
+import random
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from backend.azure import rollup
+from backend.azure.rollup import RollupCube
+from backend.azure.store import CostStore, date_key
+
+_SCOPE = "subscriptions/sub-a"
+_GROUPING = "ResourceGroupName"
+_FIRST = _dt.date(2023, 1, 1)
+_DAYS = 730
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = CostStore(str(tmp_path / "store.sqlite3"), settle_days=3, tail_refresh=3600)
+    monkeypatch.setattr(rollup, "cost_store", store)
+    return store
+
+
+def _fill(store, rng, start, end):
+    rows = []
+    day = start
+    while day <= end:
+        for group in rng.sample(["rg-a", "rg-b", "rg-c", "rg-d", "rg-e"], rng.randint(0, 3)):
+            rows.append((date_key(day), group, round(rng.uniform(0, 100), 2)))
+        day += _dt.timedelta(days=1)
+    store.replace(_SCOPE, _GROUPING, start, end, rows)
+
+
+def _naive(store, start, end):
+    totals = defaultdict(float)
+    daily = defaultdict(float)
+    for day, group, cost in store.rows(_SCOPE, _GROUPING, start, end):
+        totals[group] += cost
+        daily[day] += cost
+    return totals, daily
+
+
+def test_rollup_matches_naive_sums_as_the_axis_grows_and_is_rebuilt(store):
+    rng = random.Random(3)
+    _fill(store, rng, _FIRST, _FIRST + _dt.timedelta(days=_DAYS - 1))
+    cube = RollupCube(max_cubes=4, max_days=200)
+
+    # Windows wander back and forth, so the axis grows on both sides and is
+    # rebuilt once it would pass max_days; stored days are rewritten between
+    for step in range(60):
+        start = _FIRST + _dt.timedelta(days=rng.randrange(_DAYS - 120))
+        end = start + _dt.timedelta(days=rng.randrange(120))
+        if step % 7 == 3:
+            lo = start + _dt.timedelta(days=rng.randrange((end - start).days + 1))
+            _fill(store, rng, lo, lo + _dt.timedelta(days=rng.randrange(10)))
+
+        totals, daily = _naive(store, start, end)
+        assert cube.totals(_SCOPE, _GROUPING, start, end) == pytest.approx(dict(sorted(totals.items())))
+
+        top = cube.top(_SCOPE, _GROUPING, start, end, 2)
+        expected_top = sorted(totals.items(), key=lambda item: -item[1])[:2]
+        assert [g for g, _ in top["groups"]] == [g for g, _ in expected_top]
+        assert top["total"] == pytest.approx(sum(totals.values()))
+
+        days, costs = cube.daily(_SCOPE, _GROUPING, start, end)
+        assert len(days) == (end - start).days + 1
+        expected_daily = [daily.get(d, 0.0) for d in rollup.analytics.from_days(days).tolist()]
+        assert costs.tolist() == pytest.approx(expected_daily)
+
+        axis = cube._cubes[(_SCOPE, _GROUPING)].days
+        assert len(axis) <= 200 + rollup._PAD_DAYS
+
+
+def test_axis_is_rebuilt_around_a_distant_range(store):
+    rng = random.Random(8)
+    _fill(store, rng, _FIRST, _FIRST + _dt.timedelta(days=_DAYS - 1))
+    cube = RollupCube(max_cubes=4, max_days=200)
+
+    cube.totals(_SCOPE, _GROUPING, _FIRST, _FIRST + _dt.timedelta(days=30))
+    late = _FIRST + _dt.timedelta(days=600)
+    cube.totals(_SCOPE, _GROUPING, late, late + _dt.timedelta(days=30))
+
+    axis = cube._cubes[(_SCOPE, _GROUPING)].days
+    assert axis[0] == np.datetime64(late, "D")
@@ -0,0 +1,30 @@
+from flask import Flask
+
+from backend.auth.session_store import MemorySessionStore, ServerSideSessionInterface
+
+
+def _session_cookie(client, app: Flask) -> str:
+    return client.get_cookie(app.config["SESSION_COOKIE_NAME"]).value
+
+
+def test_sign_in_moves_the_session_to_a_new_id():
+    from app import app
+
+    store = MemorySessionStore()
+    interface = ServerSideSessionInterface(store, 3600)
+    original, app.session_interface = app.session_interface, interface
+    try:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["planted"] = True
+        planted_sid = interface._signer(app).unsign(_session_cookie(client, app)).decode()
+
+        assert client.get("/auth/login").status_code == 302
+
+        signed_in_sid = interface._signer(app).unsign(_session_cookie(client, app)).decode()
+        assert signed_in_sid != planted_sid
+        assert store.load(planted_sid) is None
+        assert "access_token" in store.load(signed_in_sid)
+        assert "planted" not in store.load(signed_in_sid)
+    finally:
+        app.session_interface = original
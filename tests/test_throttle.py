@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from azure.core.pipeline import PipelineContext, PipelineRequest, PipelineResponse
+from azure.core.rest import HttpRequest
+from azure.core.utils import CaseInsensitiveDict
+
+from backend.azure import throttle
+from backend.azure.cost import CostAnalyzer
+from backend.azure.throttle import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    AsyncThrottlePolicy,
+    RateLimiter,
+    ThrottleBudgetExceeded,
+    ThrottlePolicy,
+)
+
+_URL = "https://management.azure.com/subscriptions/sub-a/providers/Microsoft.CostManagement/query"
+
+
+class _FakeResponse:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class _Next:
+    """Answers every request with 429 and ``Retry-After: 60``."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def _respond(self, request):
+        self.calls += 1
+        return PipelineResponse(request.http_request, _FakeResponse(429, CaseInsensitiveDict({"Retry-After": "60"})), request.context)
+
+    def send(self, request):
+        return self._respond(request)
+
+
+class _AsyncNext(_Next):
+    async def send(self, request):
+        return self._respond(request)
+
+
+def _request(priority):
+    return PipelineRequest(HttpRequest("POST", _URL), PipelineContext(None, priority=priority))
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(throttle, "rate_limiter", RateLimiter())
+    monkeypatch.setattr(throttle, "AZURE_INTERACTIVE_WAIT_SECONDS", 15.0)
+    monkeypatch.setattr(throttle.time, "sleep", slept.append)
+    return slept
+
+
+def test_interactive_request_returns_a_429_it_cannot_wait_out(sleeps):
+    policy = ThrottlePolicy()
+    policy.next = _Next()
+
+    response = policy.send(_request(PRIORITY_INTERACTIVE))
+
+    assert response.http_response.status_code == 429
+    assert policy.next.calls == 1
+    assert sleeps == []
+
+
+def test_background_request_keeps_retrying(sleeps, monkeypatch):
+    monkeypatch.setattr(throttle, "AZURE_MAX_RETRIES", 2)
+    monkeypatch.setattr(throttle.TokenBucket, "reserve", lambda self, floor=0.0: 0.0)
+    policy = ThrottlePolicy()
+    policy.next = _Next()
+
+    policy.send(_request(PRIORITY_BACKGROUND))
+
+    assert policy.next.calls == 3
+    assert len(sleeps) == 2 and all(s >= 60 for s in sleeps)
+
+
+def test_interactive_request_gives_up_on_a_long_limiter_wait(sleeps):
+    bucket = throttle.rate_limiter.bucket_for(_URL)
+    bucket.pause(40)
+    policy = ThrottlePolicy()
+    policy.next = _Next()
+
+    with pytest.raises(ThrottleBudgetExceeded) as raised:
+        policy.send(_request(PRIORITY_INTERACTIVE))
+
+    assert raised.value.status_code == 429
+    assert 39 <= raised.value.retry_after <= 40
+    assert policy.next.calls == 0
+    # The unused reservation went back to the bucket
+    assert bucket._tokens == throttle.AZURE_RATE_BURST
+
+
+def test_async_policy_applies_the_same_budget(monkeypatch):
+    monkeypatch.setattr(throttle, "rate_limiter", RateLimiter())
+    monkeypatch.setattr(throttle, "AZURE_INTERACTIVE_WAIT_SECONDS", 15.0)
+    policy = AsyncThrottlePolicy()
+    policy.next = _AsyncNext()
+
+    response = asyncio.run(policy.send(_request(PRIORITY_INTERACTIVE)))
+
+    assert response.http_response.status_code == 429
+    assert policy.next.calls == 1
+
+
+def test_budget_error_passes_retry_after_through(client, monkeypatch):
+    def query_costs(self, start, end, granularity, group_by):
+        raise ThrottleBudgetExceeded(41.2)
+
+    monkeypatch.setattr(CostAnalyzer, "query_costs", query_costs)
+
+    response = client.get("/api/costs/query?subscription_id=sub-a")
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "42"
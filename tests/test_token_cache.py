@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+
+import msal
+
+from backend.auth import token_cache
+from config import AUTHORITY, CLIENT_ID, CLIENT_SECRET
+
+
+class _Response:
+    def __init__(self, payload: dict) -> None:
+        self.status_code = 200
+        self.text = json.dumps(payload)
+        self.headers = {}
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class FakeEntra:
+    """Answers discovery and refresh-token grants, counting what reaches the network."""
+
+    def __init__(self, token_delay: float = 0.0) -> None:
+        self.gets = 0
+        self.posts = 0
+        self._token_delay = token_delay
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.gets += 1
+        if "discovery/instance" in url:
+            return _Response({"tenant_discovery_endpoint": f"{AUTHORITY}/v2.0/.well-known/openid-configuration"})
+        return _Response({
+            "authorization_endpoint": f"{AUTHORITY}/oauth2/v2.0/authorize",
+            "token_endpoint": f"{AUTHORITY}/oauth2/v2.0/token",
+            "issuer": f"{AUTHORITY}/v2.0",
+        })
+
+    def post(self, url, **kwargs):
+        with self._lock:
+            self.posts += 1
+        time.sleep(self._token_delay)
+        return _Response({"access_token": "fresh", "token_type": "Bearer", "expires_in": 3600, "refresh_token": "rt2"})
+
+    def close(self):
+        pass
+
+
+def _seed_account(account_id: str) -> None:
+    cache = msal.SerializableTokenCache()
+    uid, utid = account_id.split(".")
+    cache.deserialize(json.dumps({
+        "Account": {f"{account_id}-login.microsoftonline.com-dummy": {
+            "home_account_id": account_id, "environment": "login.microsoftonline.com",
+            "realm": "dummy", "local_account_id": uid, "username": f"{uid}@example.com",
+            "authority_type": "MSSTS",
+        }},
+        "RefreshToken": {f"{account_id}-login.microsoftonline.com-refreshtoken-{CLIENT_ID}--": {
+            "home_account_id": account_id, "environment": "login.microsoftonline.com",
+            "credential_type": "RefreshToken", "client_id": CLIENT_ID, "secret": "rt",
+        }},
+    }))
+    cache.has_state_changed = True
+    token_cache.token_cache_store.save(account_id, cache)
+
+
+def test_silent_refreshes_share_discovery_and_run_concurrently(monkeypatch):
+    entra = FakeEntra(token_delay=0.3)
+    shared = msal.ConfidentialClientApplication(
+        CLIENT_ID, authority=AUTHORITY, client_credential=CLIENT_SECRET, http_client=entra
+    )
+    monkeypatch.setattr(token_cache, "_app", shared)
+    discovery = entra.gets
+    accounts = [f"user{i}.tenant" for i in range(4)]
+    for account_id in accounts:
+        _seed_account(account_id)
+
+    results = {}
+    threads = [
+        threading.Thread(target=lambda a=a: results.__setitem__(a, token_cache.acquire_token_silent(a)))
+        for a in accounts
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert time.perf_counter() - started < 0.3 * len(accounts)
+    assert all(result["access_token"] == "fresh" for result in results.values())
+    assert entra.gets == discovery
+    assert entra.posts == len(accounts)